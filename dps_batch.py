@@ -0,0 +1,326 @@
+"""This module contains the batch reconciliation of many properties.
+
+ - Every property is a folder holding its own dps_in tree, as dps_1_0 reads
+ it, and receiving its own dps_out tree. A const.json in the folder
+ overrides the constants of dps_1_0 for that property only.
+
+ - The properties are reconciled in parallel on a pool of worker processes,
+ one property per worker at a time, the pool being bounded by the number of
+ workers given. Each property runs dps_1_0.main in the worker, its output
+ going to dps_out/batch.log, so the properties share no state but the
+ imported modules.
+
+ - A property failing, its inputs missing or a step raising, is reported
+ with its error and does not stop the others.
+
+ - The run report of every property gives the consolidated summary: its
+ status, wall time, peak memory and match counts, written as
+ batch_summary.json and printed as a table.
+"""
+## inbuilt module
+import contextlib
+import glob
+import json
+import multiprocessing as mp
+import os
+import shlex
+import sys
+import time
+import traceback
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+## user-defined modules
+import dps_1_0 as dps
+
+# Command line arguments of dps_1_0 giving the folder of every source
+Sources = {
+    '-f': 'FRONT_PATH',
+    '-ps': 'PTM_SET_PATH',
+    '-pt': 'PTM_TRANS_PATH',
+    '-b': 'BNK_PATH',
+    '-bk': 'BK_COM_PATH',
+    '-om': 'INGO_PATH',
+}
+
+# Files of a property: its constants and, below dps_out, its run report and
+# the log of its run
+CONST = "const.json"
+REPORT = "run_report.json"
+LOG = "batch.log"
+
+# Matching steps summed in the summary
+MATCH_STEPS = ["upi_match", "bcom_match", "mmt_match", "bank_match"]
+
+# Bytes in a MB
+MB = 1 << 20
+
+
+def property_argv(root, extra=()):
+    """
+    Build the command line of dps_1_0 for one property.
+
+    Parameters:
+    ----------
+    root: str
+        The folder of the property, holding dps_in.
+
+    extra: list, optional
+        Further arguments of dps_1_0 given to every property.
+
+    Returns:
+    -------
+    list
+        The arguments of dps_1_0.main.
+
+    Examples:
+    --------
+    >>> property_argv('hotels/goa')[:3]
+    ['-d', '-f', 'hotels/goa/./dps_in/Front-Desk/']
+    """
+    out_dir = os.path.join(root, "dps_out")
+    argv = ["-d"]
+    for flag, key in Sources.items():
+        argv += [flag, os.path.join(root, dps.dir_paths_default[key])]
+    argv += ["-o", out_dir, "-rp", os.path.join(out_dir, REPORT)]
+    if os.path.exists(os.path.join(root, CONST)):
+        argv += ["-c", os.path.join(root, CONST)]
+    return argv + list(extra)
+
+
+def reconcile(root, extra=()):
+    """
+    Reconcile one property, catching whatever stops its run.
+
+    ...
+
+    Runs in a worker of the batch. The output of dps_1_0 goes to the log of
+    the property, the run report of the property is read back for the
+    summary.
+
+    Parameters:
+    ----------
+    root: str
+        The folder of the property, holding dps_in.
+
+    extra: list, optional
+        Further arguments of dps_1_0.
+
+    Returns:
+    -------
+    dict
+        The root, "ok" or "failed", the error and its traceback when failed,
+        the wall seconds, the peak memory of the run in MB, the rows and
+        match counts of the run report.
+    """
+    started = time.perf_counter()
+    result = {"root": root, "status": "ok", "error": None}
+    out_dir = os.path.join(root, "dps_out")
+    report = os.path.join(out_dir, REPORT)
+    try:
+        if os.path.exists(report):
+            os.remove(report)
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, LOG), "w", encoding="utf-8") as log, \
+                contextlib.redirect_stdout(log), \
+                contextlib.redirect_stderr(log):
+            dps.main(property_argv(root, extra))
+        if not os.path.exists(report):
+            raise RuntimeError("No run report written, see "
+                               + os.path.join(out_dir, LOG))
+    # dps_1_0 exits when the inputs of the property are missing, the reason
+    # being the last line of its log
+    except (Exception, SystemExit) as err:
+        error = f"{type(err).__name__}: {err}"
+        if isinstance(err, SystemExit):
+            error = log_tail(os.path.join(out_dir, LOG)) or error
+        result.update(status="failed", error=error,
+                      traceback=traceback.format_exc())
+    result["wall"] = time.perf_counter() - started
+    result.update(report_counts(report))
+    return result
+
+
+def log_tail(path):
+    """Return the last line written to a log, None when there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as in_file:
+        lines = [line.strip() for line in in_file if line.strip()]
+    return lines[-1] if lines else None
+
+
+def report_counts(path):
+    """
+    Read the figures of the summary from a run report.
+
+    Returns:
+    -------
+    dict
+        The peak memory in MB, the bookings of the front desk, the matched
+        and unmatched counts of every matching step; empty when the run
+        wrote no report.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as in_file:
+        report = json.load(in_file)
+    counts = {"peak_mb": report["peak_rss"] / MB, "bookings": None,
+              "matches": {}}
+
+    # The monthly mode records the steps once per month
+    for record in report["steps"]:
+        if record["step"] == "load":
+            counts["bookings"] = (counts["bookings"] or 0) \
+                + record["rows_out"].get("front_desk", 0)
+        if record["step"] in MATCH_STEPS and "matches" in record:
+            entry = counts["matches"].setdefault(record["step"], {})
+            for key, value in record["matches"].items():
+                entry[key] = entry.get(key, 0) + value
+    return counts
+
+
+def batch(roots, workers=None, extra=()):
+    """
+    Reconcile many properties in parallel.
+
+    ...
+
+    The pool has at most one worker per property. Worker processes are
+    forked where the platform allows it, so they start with the modules
+    already imported. A worker dying takes the properties it had not
+    finished with it, they are reported as failed.
+
+    Parameters:
+    ----------
+    roots: list
+        The folders of the properties, each holding dps_in.
+
+    workers: int, optional
+        The properties reconciled at once, None for the number of CPUs.
+
+    extra: list, optional
+        Further arguments of dps_1_0 given to every property.
+
+    Returns:
+    -------
+    dict
+        The wall seconds, the workers, the properties ok and failed, and
+        the result of every property in the order of roots, see reconcile.
+
+    Examples:
+    --------
+    >>> summary = batch(glob.glob('hotels/*'), workers=4)
+    >>> summary['ok'], summary['failed']
+    (11, 1)
+    """
+    started = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(roots) or 1))
+    context = mp.get_context("fork") \
+        if "fork" in mp.get_all_start_methods() else None
+    results = {}
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = {pool.submit(reconcile, root, list(extra)): root
+                   for root in roots}
+        for future in as_completed(futures):
+            root = futures[future]
+            try:
+                results[root] = future.result()
+            except BrokenProcessPool as err:
+                results[root] = {"root": root, "status": "failed",
+                                 "error": f"{type(err).__name__}: {err}"}
+
+    properties = [results[root] for root in roots]
+    return {
+        "wall": time.perf_counter() - started,
+        "workers": workers,
+        "ok": sum(result["status"] == "ok" for result in properties),
+        "failed": sum(result["status"] != "ok" for result in properties),
+        "properties": properties,
+    }
+
+
+def table(summary):
+    """
+    Format the summary of a batch as a table, one line per property.
+
+    Examples:
+    --------
+    >>> print(table(summary))
+    property          status    wall s   peak MB  bookings  upi  bcom ...
+    """
+    width = max([len(result["root"]) for result in summary["properties"]]
+                + [len("property")]) + 2
+    lines = [f"{'property':<{width}}{'status':<8}{'wall s':>8}"
+             f"{'peak MB':>9}{'bookings':>10}"
+             + "".join(f"{step.split('_')[0]:>10}" for step in MATCH_STEPS)]
+    for result in summary["properties"]:
+        peak = result.get("peak_mb")
+        bookings = result.get("bookings")
+        line = (f"{result['root']:<{width}}{result['status']:<8}"
+                f"{result.get('wall', 0.0):>8.2f}"
+                + (f"{peak:>9.0f}" if peak is not None else f"{'-':>9}")
+                + f"{'-' if bookings is None else bookings:>10}")
+        matches = result.get("matches", {})
+        for step in MATCH_STEPS:
+            counts = matches.get(step)
+            cell = f"{counts['matched']}/{counts['unmatched']}" \
+                if counts else "-"
+            line += f"{cell:>10}"
+        lines.append(line)
+        if result["error"]:
+            lines.append(f"    {result['error']}")
+    lines.append("")
+    lines.append(f"{summary['ok']} ok, {summary['failed']} failed in "
+                 f"{summary['wall']:.2f} s on {summary['workers']} workers")
+    return "\n".join(lines)
+
+
+### Parsing command line arguments passed while running script
+args = ArgumentParser(description="Reconcile many properties in parallel, "
+                                  "each folder holding its own dps_in")
+args.add_argument('roots', type=str, nargs='+',
+                  help='Folders of the properties, glob patterns allowed')
+args.add_argument('-w', '--workers', type=int, dest='workers', default=None,
+                  help='Properties reconciled at once, defaults to CPUs')
+args.add_argument('-x', '--extra', type=str, dest='extra', default='',
+                  help='Further arguments of dps_1_0 for every property, '
+                       'e.g. -x="-kk 2 -pa"')
+args.add_argument('-o', '--output', type=str, dest='output',
+                  default='batch_summary.json',
+                  help='Path of the json summary')
+
+
+def main(argv=None):
+    """
+    Reconcile the properties given on the command line.
+
+    Returns:
+    -------
+    int
+        1 when a property failed, else 0.
+    """
+    PARSER = args.parse_args(argv)
+    roots = []
+    for pattern in PARSER.roots:
+        found = sorted(path for path in glob.glob(pattern)
+                       if os.path.isdir(path))
+        roots += [path for path in found or [pattern] if path not in roots]
+
+    # Every property reads its files on one worker unless told otherwise,
+    # the batch already keeping the CPUs busy
+    extra = shlex.split(PARSER.extra)
+    if "-j" not in extra and "--jobs" not in extra:
+        extra = ["-j", "1"] + extra
+
+    summary = batch(roots, PARSER.workers, extra)
+    print(table(summary))
+    with open(PARSER.output, "w", encoding="utf-8") as out_file:
+        json.dump(summary, out_file, indent=1)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
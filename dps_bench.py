@@ -0,0 +1,373 @@
+"""This module contains the benchmark of the DPS at growing input sizes.
+
+ - Inputs of every size are generated by dps_synth and the DPS runs on them
+ in a process of its own, so the memory of one size does not leak into the
+ next. Each run writes its report through dps_instrument, the benchmark
+ reading the wall time and the peak memory of every step from it.
+
+ - Steps are grouped as the stages of the DPS are known: the loading of the
+ sources through create_frame, the cleaning, the UPI, Booking.com and
+ InGo-MMT matching, the joins on the bank reference numbers, the ledger of
+ paid(), the building of the outputs and their writing, plus the whole run.
+
+ - The scaling exponent of every group is the slope of its time against the
+ number of bookings on log scales: 1 for a linear step, 2 for a quadratic
+ one.
+
+ - The results can be saved as a baseline. Later runs on the same sizes are
+ compared with it and fail when a group got slower, grew its memory or its
+ scaling exponent beyond the tolerances.
+"""
+##  third party module
+import numpy as np
+
+## inbuilt module
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+
+## user-defined modules
+import dps_synth as synth
+
+# Script of the DPS run at every size
+DPS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dps_1_0.py")
+
+# Steps of the run report making every group. The steps written to a file
+# form the "write" group and the whole run the "total" group.
+Groups = {
+    'create_frame': ["load"],
+    'clean': ["clean_front_desk", "clean_paytm", "clean_bank", "clean_bcom",
+              "compact"],
+    'upi_match': ["upi_match"],
+    'bcom_match': ["bcom_match"],
+    'mmt_match': ["mmt_match"],
+    'ref_joins': ["bank_index", "settle_upi", "bank_match"],
+    'paid': ["ledger"],
+    'build': ["combine", "office_match", "residues", "front_office"],
+}
+
+# Regressions tolerated against the baseline: the scaling exponent may grow
+# by 'exponent', the time at the largest size by the 'wall' fraction and the
+# memory by the 'peak' fraction
+Tolerance = {'exponent': 0.3, 'wall': 0.5, 'peak': 0.25}
+
+# Groups faster than this many seconds at the largest size are timer noise,
+# their time and exponent are not compared
+MIN_WALL = 0.05
+
+# Groups allocating less than this many MB are not compared for memory
+MIN_PEAK = 8
+
+# Bytes in a MB
+MB = 1 << 20
+
+
+def group_steps(report):
+    """
+    Gather the steps of a run report into the benchmark groups.
+
+    Parameters:
+    ----------
+    report: dict
+        The run report written by dps_instrument.Recorder.
+
+    Returns:
+    -------
+    dict
+        The wall seconds and the peak MB allocated above the start of the
+        group, for every group and "total", whose peak is the peak of the
+        process.
+
+    Examples:
+    --------
+    >>> group_steps(json.load(open('./dps_out/run_report.json')))['paid']
+    {'wall': 0.012, 'peak_mb': 1.5}
+    """
+    members = {step: group for group, steps in Groups.items()
+               for step in steps}
+    groups = {}
+    for record in report["steps"]:
+        group = "write" if record["kind"] == "write" \
+            else members.get(record["step"])
+        if group is None:
+            continue
+        entry = groups.setdefault(group, {"wall": 0.0, "peak_mb": 0.0})
+        entry["wall"] += record["wall"]
+        entry["peak_mb"] = max(entry["peak_mb"], (
+            record["peak_rss"] - record["rss_start"]) / MB)
+    groups["total"] = {"wall": report["wall"],
+                       "peak_mb": report["peak_rss"] / MB}
+    return groups
+
+
+def run_dps(root, jobs=1):
+    """
+    Run the DPS on the inputs below root in a process of its own.
+
+    Parameters:
+    ----------
+    root: str
+        The folder holding the dps_in tree, receiving dps_out.
+
+    jobs: int, optional
+        The workers reading the input files.
+
+    Returns:
+    -------
+    dict
+        The run report.
+    """
+    report = os.path.join("dps_out", "bench_report.json")
+    subprocess.run([sys.executable, "-W", "ignore", DPS, "-d", "-j",
+                    str(jobs), "-rp", report], cwd=root, check=True,
+                   stdout=subprocess.DEVNULL)
+    with open(os.path.join(root, report), encoding="utf-8") as in_file:
+        return json.load(in_file)
+
+
+def fit_exponent(sizes, values):
+    """
+    Fit the exponent k of values = c * sizes ** k.
+
+    Parameters:
+    ----------
+    sizes: list
+        The input sizes.
+
+    values: list
+        The time or memory measured at every size.
+
+    Returns:
+    -------
+    float or None
+        The slope of log(values) against log(sizes), None when fewer than
+        two sizes have a positive value.
+
+    Examples:
+    --------
+    >>> round(fit_exponent([1000, 2000, 4000], [1.0, 4.0, 16.0]), 2)
+    2.0
+    """
+    sizes, values = np.asarray(sizes, float), np.asarray(values, float)
+    keep = values > 0
+    if keep.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[keep]), np.log(values[keep]), 1)[0])
+
+
+def bench(sizes, months=1, repeats=1, seed=0, work=None, jobs=1):
+    """
+    Benchmark the DPS at every size.
+
+    ...
+
+    The inputs of a size are generated once and the DPS runs repeats times
+    on them, the fastest time and the smallest memory of every group being
+    kept as the least disturbed by the rest of the machine.
+
+    Parameters:
+    ----------
+    sizes: list
+        The bookings per month of every size.
+
+    months: int, optional
+        The months of every size.
+
+    repeats: int, optional
+        The runs per size.
+
+    seed: int, optional
+        The seed of the generated inputs.
+
+    work: str, optional
+        The folder receiving the inputs of every size, a temporary folder
+        removed at the end when None.
+
+    jobs: int, optional
+        The workers reading the input files.
+
+    Returns:
+    -------
+    dict
+        The settings, the number of bookings of every size and, for every
+        group, the wall seconds and peak MB at every size with their
+        scaling exponents.
+
+    Examples:
+    --------
+    >>> results = bench([500, 1000, 2000], months=2)
+    >>> results['groups']['upi_match']['exponent']
+    1.04
+    """
+    temporary = work is None
+    work = tempfile.mkdtemp(prefix="dps_bench_") if temporary else work
+    groups = {}
+    try:
+        for size in sizes:
+            root = os.path.join(work, f"size_{size}")
+            shutil.rmtree(root, ignore_errors=True)
+            synth.generate(root, months, size, seed=seed)
+            runs = [group_steps(run_dps(root, jobs)) for _ in range(repeats)]
+            for group in runs[0]:
+                entry = groups.setdefault(group, {"wall": [], "peak_mb": []})
+                for key in entry:
+                    entry[key].append(min(run[group][key] for run in runs))
+    finally:
+        if temporary:
+            shutil.rmtree(work, ignore_errors=True)
+
+    bookings = [size * months for size in sizes]
+    for entry in groups.values():
+        entry["exponent"] = fit_exponent(bookings, entry["wall"])
+        entry["peak_exponent"] = fit_exponent(bookings, entry["peak_mb"])
+    return {"sizes": list(sizes), "months": months, "seed": seed,
+            "bookings": bookings, "groups": groups}
+
+
+def compare(results, baseline, tolerance=Tolerance):
+    """
+    Find the groups regressing against a baseline.
+
+    ...
+
+    Results and baseline must share their sizes, months and seed, a
+    ValueError is raised otherwise.
+
+    Parameters:
+    ----------
+    results: dict
+        The results of bench.
+
+    baseline: dict
+        The results of bench saved as the baseline.
+
+    tolerance: dict, optional
+        The regressions tolerated, see Tolerance.
+
+    Returns:
+    -------
+    list
+        One message per regression, empty when none regressed.
+
+    Examples:
+    --------
+    >>> compare(results, baseline)
+    ['combine: exponent 2.01 above baseline 1.02 + 0.3']
+    """
+    for key in ["sizes", "months", "seed"]:
+        if results[key] != baseline[key]:
+            raise ValueError(f"The baseline was measured with {key} "
+                             f"{baseline[key]}, not {results[key]}")
+
+    failures = []
+    for group, entry in results["groups"].items():
+        base = baseline["groups"].get(group)
+        if base is None:
+            continue
+        if max(entry["wall"][-1], base["wall"][-1]) >= MIN_WALL:
+            if None not in (entry["exponent"], base["exponent"]) and \
+                    entry["exponent"] > base["exponent"] \
+                    + tolerance['exponent']:
+                failures.append(
+                    f"{group}: exponent {entry['exponent']:.2f} above "
+                    f"baseline {base['exponent']:.2f} + "
+                    f"{tolerance['exponent']}")
+            if entry["wall"][-1] > base["wall"][-1] * (1 + tolerance['wall']):
+                failures.append(
+                    f"{group}: {entry['wall'][-1]:.2f} s above baseline "
+                    f"{base['wall'][-1]:.2f} s + {tolerance['wall']:.0%}")
+        if max(entry["peak_mb"][-1], base["peak_mb"][-1]) >= MIN_PEAK and \
+                entry["peak_mb"][-1] > base["peak_mb"][-1] \
+                * (1 + tolerance['peak']):
+            failures.append(
+                f"{group}: {entry['peak_mb'][-1]:.0f} MB above baseline "
+                f"{base['peak_mb'][-1]:.0f} MB + {tolerance['peak']:.0%}")
+    return failures
+
+
+def table(results):
+    """
+    Format the results as a table, one line per group.
+
+    Examples:
+    --------
+    >>> print(table(results))
+    group         exp  mem exp    s@500   s@1000   MB@500  MB@1000
+    """
+    width = max(len(group) for group in results["groups"]) + 2
+    lines = [f"{'group':<{width}}{'exp':>6}{'mem exp':>9}"
+             + "".join(f"{'s@' + str(size):>10}" for size in results["sizes"])
+             + "".join(f"{'MB@' + str(size):>10}"
+                       for size in results["sizes"])]
+    for group, entry in results["groups"].items():
+        exponents = [f"{value:.2f}" if value is not None else "-"
+                     for value in (entry["exponent"],
+                                   entry["peak_exponent"])]
+        lines.append(f"{group:<{width}}{exponents[0]:>6}{exponents[1]:>9}"
+                     + "".join(f"{value:>10.3f}" for value in entry["wall"])
+                     + "".join(f"{value:>10.1f}"
+                               for value in entry["peak_mb"]))
+    return "\n".join(lines)
+
+
+### Parsing command line arguments passed while running script
+args = ArgumentParser(description="Benchmark the DPS at growing sizes")
+args.add_argument('-s', '--sizes', type=int, nargs='+', dest='sizes',
+                  default=[250, 500, 1000, 2000],
+                  help='Bookings per month of every size')
+args.add_argument('-m', '--months', type=int, dest='months', default=1,
+                  help='Months of every size')
+args.add_argument('-r', '--repeats', type=int, dest='repeats', default=3,
+                  help='Runs per size, the fastest is kept')
+args.add_argument('-sd', '--seed', type=int, dest='seed', default=0,
+                  help='Seed of the generated inputs')
+args.add_argument('-w', '--work', type=str, dest='work', default=None,
+                  help='Folder keeping the generated inputs')
+args.add_argument('-j', '--jobs', type=int, dest='jobs', default=1,
+                  help='Workers reading the input files')
+args.add_argument('-o', '--output', type=str, dest='output', default=None,
+                  help='Path of the json results')
+args.add_argument('-b', '--baseline', type=str, dest='baseline',
+                  default=None, help='Path of the baseline compared with')
+args.add_argument('-sb', '--save_baseline', dest='save_baseline',
+                  action='store_true', default=False,
+                  help='Save the results as the baseline instead')
+
+
+def main(argv=None):
+    """
+    Benchmark the DPS and compare with the baseline.
+
+    Returns:
+    -------
+    int
+        1 when a group regressed against the baseline, else 0.
+    """
+    PARSER = args.parse_args(argv)
+    results = bench(PARSER.sizes, PARSER.months, PARSER.repeats,
+                    PARSER.seed, PARSER.work, PARSER.jobs)
+    print(table(results))
+
+    outputs = [PARSER.output] if PARSER.output else []
+    if PARSER.baseline and PARSER.save_baseline:
+        outputs.append(PARSER.baseline)
+    for path in outputs:
+        with open(path, "w", encoding="utf-8") as out_file:
+            json.dump(results, out_file, indent=1)
+
+    if not PARSER.baseline or PARSER.save_baseline:
+        return 0
+    with open(PARSER.baseline, encoding="utf-8") as in_file:
+        failures = compare(results, json.load(in_file))
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
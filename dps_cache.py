@@ -0,0 +1,199 @@
+"""This module contains the content addressed cache of the parsed input files.
+
+ - Every csv or excel file parsed by the loader is stored as a binary pickle
+ named after the hash of the file content, the schema version and the reader
+ options, so an unchanged export is loaded without being parsed again and a
+ changed export, or changed parsing rules, miss the cache by construction.
+ The versions of pandas and numpy are part of the key, so an upgrade misses
+ the cache instead of loading pickles it may not read.
+
+ - The cache folder has a size limit: the entries used least recently are
+ evicted first, the last use of an entry being its modification time.
+
+ - Pickle is used since the parsed frames hold list columns, which the
+ columnar formats of pandas would need pyarrow for.
+"""
+##  third party module
+import numpy as np
+import pandas as pd
+
+## inbuilt module
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+# Default size limit of the cache folder
+MAX_BYTES = 1 << 30
+
+
+def file_digest(path, chunk=1 << 20):
+    """
+    Hash the content of a file.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the file.
+
+    chunk: int, optional
+        The number of bytes read at once.
+
+    Returns:
+    -------
+    str
+        The sha256 hex digest of the file content.
+
+    Examples:
+    --------
+    >>> file_digest('path_to_file.csv')
+    '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        for block in iter(lambda: in_file.read(chunk), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def options_token(options):
+    """
+    Serialize reader options in a stable way.
+
+    ...
+
+    Converter functions are replaced by their qualified names so that the
+    token does not depend on the memory address of the functions.
+
+    Parameters:
+    ----------
+    options: dict
+        The keyword arguments of the reader.
+
+    Returns:
+    -------
+    str
+        The options as sorted json.
+
+    Examples:
+    --------
+    >>> options_token({"skphead": 16, "conv": {"Price": conv_price}})
+    '{"conv": {"Price": "dps_utils.conv_price"}, "skphead": 16}'
+    """
+    def name(obj):
+        return f"{getattr(obj, '__module__', '')}.{obj.__qualname__}" \
+            if hasattr(obj, "__qualname__") else repr(obj)
+
+    return json.dumps(options, sort_keys=True, default=name)
+
+
+class FrameCache:
+    """
+    Folder of parsed dataframes keyed by file content.
+
+    ...
+
+    The cache only holds a folder path and a size limit, so it can be sent
+    to the worker processes of the loader: entries are written to a temporary
+    file and renamed, which keeps concurrent writers from exposing partial
+    files.
+
+    Parameters:
+    ----------
+    folder: str
+        The folder holding the cache entries, created if missing.
+
+    max_bytes: int, optional
+        The size limit of the folder enforced by evict.
+
+    Examples:
+    --------
+    >>> cache = FrameCache('dps_cache', max_bytes=1 << 28)
+    >>> key = cache.key('path_to_file.csv', options, version=1)
+    >>> cache.get(key) is None
+    True
+    """
+
+    def __init__(self, folder, max_bytes=MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, path, options, version):
+        """
+        Build the key of a file from its content, version, options and the
+        versions of pandas and numpy.
+        """
+        token = (f"{file_digest(path)}:{version}:{options_token(options)}:"
+                 f"{pd.__version__}:{np.__version__}")
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def entry(self, key):
+        """Path of the entry of a key."""
+        return os.path.join(self.folder, f"{key}.pkl")
+
+    def get(self, key):
+        """
+        Load the frame of a key and mark it as used, None on a miss.
+
+        An entry that cannot be loaded, truncated, corrupted or pickled by
+        other versions of pandas and numpy, is removed and counts as a miss
+        so that it gets rebuilt.
+        """
+        path = self.entry(key)
+        try:
+            frame = pd.read_pickle(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        return frame
+
+    def put(self, key, frame):
+        """Store the frame, or any picklable object, of a key."""
+        handle, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        os.close(handle)
+        try:
+            pd.to_pickle(frame, tmp_path)
+            os.replace(tmp_path, self.entry(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def entries(self):
+        """List the entries as (last use, size, path), oldest first."""
+        listing = []
+        for path in glob.glob(os.path.join(self.folder, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            listing.append((stat.st_mtime, stat.st_size, path))
+        return sorted(listing)
+
+    def evict(self):
+        """Remove the entries used least recently beyond the size limit."""
+        listing = self.entries()
+        total = sum(size for _, size, _ in listing)
+        removed = 0
+        for _, size, path in listing:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        """Number of entries and bytes held by the folder."""
+        listing = self.entries()
+        return {"entries": len(listing),
+                "bytes": sum(size for _, size, _ in listing),
+                "max_bytes": self.max_bytes}
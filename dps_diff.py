@@ -0,0 +1,741 @@
+"""This module contains the differential runner of the DPS engines.
+
+ - The reference is dps_1_0.py as it was before the engines replaced its
+ nested loops, run with its own dps_utils, loaders and cleaning in a
+ process of its own on the dps_in tree of a folder and writing its own
+ dps_out. Nothing is shared with the DPS under test but the inputs.
+
+ - Deltas lists the output changes documented along with the engines, as
+ edits of the reference source. The reference runs a second time with them
+ applied, as "documented". The reference against documented reports what
+ the documented deltas change; documented against the current dps_1_0.py,
+ run in a process of its own too, reports the changes nothing documents,
+ which must be none.
+
+ - Every output is compared row by row and cell by cell from the csv files
+ written. Rows are paired on the key of the output (the booking or bank
+ transaction id, the position for the residue and cash files) and the rank
+ of the row within its key; cells are compared by value, so 2300 and
+ 2300.0 are the same cell while a missing and a filled cell are not.
+
+ - The reference may fail on inputs a documented delta fixes, e.g. when no
+ Booking.com booking matches; the failure is reported and the documented
+ run compared all the same.
+
+ - The documented run is timed in the sections of Sections, the engine run
+ by the steps of its run report, giving the speedup per stage.
+"""
+##  third party module
+import pandas as pd
+
+## inbuilt module
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+
+## user-defined modules
+import dps_pipeline as pipeline
+
+# Folder of this module, the git work tree holding the reference, and the
+# script of the DPS under test
+HERE = os.path.dirname(os.path.abspath(__file__))
+DPS = os.path.join(HERE, "dps_1_0.py")
+
+# Revision of the reference: the last one running the nested loops, before
+# the engines of dps_engine replaced them
+REFERENCE = "80afbebce1052df3e5adf02b9efdebcfd09163ec"
+
+# Files making the reference script
+REFERENCE_FILES = ["dps_1_0.py", "dps_utils.py"]
+
+# Output changes documented along with the engines, as the edits bringing
+# them to the source of the reference
+Deltas = {
+    'sorted_files': {
+        'note': "the files of every source are read in sorted order, "
+                "glob gave the order of the folder",
+        'edits': [
+            ("dps_utils.py",
+             'file_list = glob.glob(os.path.join(folder_path, "*"))',
+             'file_list = sorted(glob.glob(os.path.join(folder_path, "*")))'),
+        ],
+    },
+    'paytm_row_0': {
+        'note': "the PayTM scan starts at the first transaction, the loop "
+                "started at the second one",
+        'edits': [
+            ("dps_1_0.py",
+             'for j in range(1, len(ptm_data_consi["ptm_trans_date"])):',
+             'for j in range(0, len(ptm_data_consi["ptm_trans_date"])):'),
+        ],
+    },
+    'match_columns': {
+        'note': "the Booking.com, Tran_Id and trans_id columns exist when "
+                "nothing matches, the loops created them on a first match",
+        'edits': [
+            ("dps_1_0.py", "for p in fd_comp_idx:",
+             'for col in ["Booking_Id", "price_gst", '
+             '"ota_commission_amount"]:\n'
+             '    fr_dataset[col] = np.nan\n'
+             'for p in fd_comp_idx:'),
+            ("dps_1_0.py", "for i in fr_bnk_dataset.index:",
+             'fr_dataset["Tran_Id"] = np.nan\n'
+             'for i in fr_bnk_dataset.index:'),
+            ("dps_1_0.py", "for i in fr_mmt_comb.index:",
+             'fr_mmt_comb["trans_id"] = np.nan\n'
+             'for i in fr_mmt_comb.index:'),
+        ],
+    },
+    'paid_at_upi': {
+        'note': "paid_at_UPI is set once per booking row, a booking "
+                "matching UPI and InGo-MMT raised a length error",
+        'edits': [
+            ("dps_1_0.py", "for i in fo_comp.Row_Id:",
+             'fo_comp["paid_at_UPI"] = np.nan\n'
+             'for i in fo_comp.Row_Id:'),
+            ("dps_1_0.py", "['Amount'].values",
+             "['Amount'].values[0]"),
+        ],
+    },
+    'ledger_columns': {
+        'note': "front_office_full keeps the paid_cash, paid_act and "
+                "paid_card columns, .iloc[:, -1] took paid_ota instead",
+        'edits': [
+            ("dps_1_0.py", 'cash = paid("CASH", "paid_cash").iloc[:, -1]',
+             'cash = paid("CASH", "paid_cash")["paid_cash"]'),
+            ("dps_1_0.py", 'acc = paid("A/C", "paid_act").iloc[:, -1]',
+             'acc = paid("A/C", "paid_act")["paid_act"]'),
+            ("dps_1_0.py", 'card = paid("CARD", "paid_card").iloc[:, -1]',
+             'card = paid("CARD", "paid_card")["paid_card"]'),
+        ],
+    },
+    'front_office_cash_columns': {
+        'note': "front_office_cash drops the padded upi_transaction_date "
+                "and upi_trans_amt columns, its UPI Details being the "
+                "text read, empty for cash bookings",
+        'edits': [
+            ("dps_1_0.py", 'fo_cash_.to_csv(',
+             'fo_cash_ = fo_cash_.drop(columns=["upi_transaction_date", '
+             '"upi_trans_amt"]).assign(**{"UPI Details": ""})\n'
+             'fo_cash_.to_csv('),
+        ],
+    },
+}
+
+# Sections the reference script is cut into, each starting at the first
+# line beginning with its anchor, with the steps of the engine run report
+# doing the same work. The lines above the first anchor, the imports and
+# the parsing of the arguments, run untimed.
+Sections = {
+    'load': {'anchor': "#### Logic to input the default path",
+             'steps': ["load"]},
+    'clean': {'anchor': '# Split the column "Date"',
+              'steps': ["clean_front_desk", "clean_paytm", "clean_bank",
+                        "clean_bcom", "compact"]},
+    'upi_match': {'anchor': "# Match front_desk_data with paytm dataset",
+                  'steps': ["upi_match"]},
+    'bcom_match': {'anchor': '# extract only row which status "ok"',
+                   'steps': ["bcom_match"]},
+    'settle_upi': {'anchor': "# Extract the paytm data if elements in",
+                   'steps': ["bank_index", "settle_upi"]},
+    'mmt_match': {'anchor': "# Combines the front-desk data, OTA:InGo-MMT",
+                  'steps': ["mmt_match"]},
+    'combine': {'anchor': "# Calculate the commission amount",
+                'steps': ["combine", "office_match"]},
+    'residues': {'anchor': "# fetch unmatched front-desk data",
+                 'steps': ["residues"]},
+    'ledger': {'anchor': "def paid(method, col):", 'steps': ["ledger"]},
+    'front_office': {'anchor': "### Generates the front-office dataset.",
+                     'steps': ["front_office"]},
+    'bank_match': {'anchor': "# Unmatched bank statement transactions",
+                   'steps': ["bank_match"]},
+    'write': {'anchor': "### Create csv file for front-office",
+              'steps': list(pipeline.Outputs.values())},
+}
+
+# Script running the reference section by section in its own process, as
+# `python -c RUNNER script sections walls *argv`, its folder first on the
+# path so that it imports its own dps_utils
+RUNNER = """
+import json, os, sys, time
+script, sections, walls = sys.argv[1:4]
+sys.argv = [script] + sys.argv[4:]
+sys.path.insert(0, os.path.dirname(script))
+with open(script, encoding="utf-8") as in_file:
+    lines = in_file.readlines()
+with open(sections, encoding="utf-8") as in_file:
+    starts = json.load(in_file)
+namespace, timed = {"__name__": "__main__", "__file__": script}, {}
+for pos, (name, start) in enumerate(starts):
+    stop = starts[pos + 1][1] if pos + 1 < len(starts) else len(lines)
+    code = compile("\\n" * start + "".join(lines[start:stop]), script, "exec")
+    started = time.perf_counter()
+    exec(code, namespace)
+    timed[name] = time.perf_counter() - started
+with open(walls, "w", encoding="utf-8") as out_file:
+    json.dump(timed, out_file)
+"""
+
+# Columns pairing the rows of every output, None for the position
+Keys = {
+    'fin_data': 'Tran_Id',
+    'bank_residue': 'Trans.Id',
+    'fo_comp': 'Row_Id',
+    'fo_resi': None,
+    'fo_cash': None,
+    'df_join': 'row_id',
+    'fr_office': 'Row_Id',
+    'bank_table': 'Tran_Id',
+}
+
+# Differing cells listed per output in the report
+EXAMPLES = 10
+
+
+## Running the reference and the engines
+
+def reference_sources(reference=REFERENCE):
+    """
+    Read the source of the reference script.
+
+    Parameters:
+    ----------
+    reference: str, optional
+        A folder holding the files of the reference, else a git revision of
+        the work tree of this module.
+
+    Returns:
+    -------
+    dict
+        The text of every file of REFERENCE_FILES.
+
+    Examples:
+    --------
+    >>> list(reference_sources())
+    ['dps_1_0.py', 'dps_utils.py']
+    """
+    sources = {}
+    for name in REFERENCE_FILES:
+        if os.path.isdir(reference):
+            with open(os.path.join(reference, name),
+                      encoding="utf-8") as in_file:
+                sources[name] = in_file.read()
+        else:
+            sources[name] = subprocess.run(
+                ["git", "-C", HERE, "show", f"{reference}:{name}"],
+                check=True, capture_output=True, text=True).stdout
+    return sources
+
+
+def apply_deltas(sources, deltas=Deltas):
+    """
+    Bring the documented deltas to the source of the reference.
+
+    ...
+
+    Every edit replaces the one occurrence of its text, a ValueError is
+    raised when the text is not found once, the reference being of another
+    revision.
+
+    Parameters:
+    ----------
+    sources: dict
+        The text of every file of the reference.
+
+    deltas: dict, optional
+        The deltas, see Deltas.
+
+    Returns:
+    -------
+    dict
+        The text of every file with the deltas applied.
+    """
+    sources = dict(sources)
+    for name, delta in deltas.items():
+        for file_name, old, new in delta["edits"]:
+            if sources[file_name].count(old) != 1:
+                raise ValueError(f"Delta {name}: {old!r} is not found once "
+                                 f"in the {file_name} of the reference")
+            sources[file_name] = sources[file_name].replace(old, new)
+    return sources
+
+
+def section_starts(source, sections=Sections):
+    """
+    Find the first line of every section of the reference script.
+
+    Returns:
+    -------
+    list
+        The name and first line of every section, in the order of the
+        script, led by the untimed "setup" section starting at line 0.
+    """
+    lines = source.splitlines()
+    starts = [["setup", 0]]
+    for name, section in sections.items():
+        found = [pos for pos, line in enumerate(lines)
+                 if line.startswith(section["anchor"])]
+        if not found:
+            raise ValueError(f"Section {name}: no line starts with "
+                             f"{section['anchor']!r} in the reference")
+        starts.append([name, found[0]])
+    return sorted(starts, key=lambda start: start[1])
+
+
+def prepare(run_dir, root):
+    """
+    Make the folder of one run: dps_in linked to the inputs of root and an
+    empty dps_out.
+    """
+    shutil.rmtree(run_dir, ignore_errors=True)
+    for folder in ["AFS", "VRS"]:
+        os.makedirs(os.path.join(run_dir, "dps_out", folder))
+    os.symlink(os.path.abspath(os.path.join(root, "dps_in")),
+               os.path.join(run_dir, "dps_in"))
+
+
+def run_logged(command, run_dir):
+    """
+    Run a command in the folder of a run, its output going to run.log.
+
+    ...
+
+    A RuntimeError giving the last line of the log is raised when the run
+    fails or leaves an output unwritten.
+    """
+    log_path = os.path.join(run_dir, "run.log")
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    with open(log_path, "w", encoding="utf-8") as log:
+        status = subprocess.run(command, cwd=run_dir, env=env,
+                                stdin=subprocess.DEVNULL, stdout=log,
+                                stderr=subprocess.STDOUT).returncode
+    if status:
+        with open(log_path, encoding="utf-8") as in_file:
+            lines = [line.strip() for line in in_file if line.strip()]
+        raise RuntimeError(f"{lines[-1] if lines else 'No output'} "
+                           f"(exit status {status}, see {log_path})")
+    for file_name in pipeline.Outputs.values():
+        if not os.path.exists(os.path.join(run_dir, "dps_out", file_name)):
+            raise RuntimeError(f"No {file_name} written, see {log_path}")
+
+
+def run_reference(run_dir, root, sources, file_no=None):
+    """
+    Run the reference script on the inputs of root.
+
+    Parameters:
+    ----------
+    run_dir: str
+        The folder of the run, receiving the script and dps_out.
+
+    root: str
+        The folder holding the dps_in tree.
+
+    sources: dict
+        The text of every file of the reference.
+
+    file_no: int, optional
+        The number of files processed per source.
+
+    Returns:
+    -------
+    dict
+        The wall seconds of every section.
+    """
+    prepare(run_dir, root)
+    code_dir = os.path.join(run_dir, "code")
+    os.makedirs(code_dir)
+    for name, text in sources.items():
+        with open(os.path.join(code_dir, name), "w",
+                  encoding="utf-8") as out_file:
+            out_file.write(text)
+
+    script = os.path.join(code_dir, "dps_1_0.py")
+    starts = os.path.join(run_dir, "sections.json")
+    walls = os.path.join(run_dir, "walls.json")
+    with open(starts, "w", encoding="utf-8") as out_file:
+        json.dump(section_starts(sources["dps_1_0.py"]), out_file)
+    argv = ["-d"] + (["-kk", str(file_no)] if file_no is not None else [])
+    run_logged([sys.executable, "-W", "ignore", "-c", RUNNER, script, starts,
+                walls] + argv, run_dir)
+    with open(walls, encoding="utf-8") as in_file:
+        return json.load(in_file)
+
+
+def run_engine(run_dir, root, file_no=None, jobs=None):
+    """
+    Run the current dps_1_0.py on the inputs of root.
+
+    Returns:
+    -------
+    dict
+        The wall seconds of every step of the run report.
+    """
+    prepare(run_dir, root)
+    report = os.path.join("dps_out", "run_report.json")
+    argv = ["-d", "-rp", report]
+    argv += ["-kk", str(file_no)] if file_no is not None else []
+    argv += ["-j", str(jobs)] if jobs is not None else []
+    run_logged([sys.executable, "-W", "ignore", DPS] + argv, run_dir)
+    with open(os.path.join(run_dir, report), encoding="utf-8") as in_file:
+        return {record["step"]: record["wall"]
+                for record in json.load(in_file)["steps"]}
+
+
+def read_outputs(run_dir):
+    """Read the outputs written by a run, by their artifact names."""
+    return {name: pd.read_csv(os.path.join(run_dir, "dps_out", file_name))
+            for name, file_name in pipeline.Outputs.items()}
+
+
+## Comparing the outputs
+
+def cell_text(value):
+    """
+    Format a cell so that equal values give equal texts.
+
+    ...
+
+    Missing values give "", numbers their float value rounded to six
+    places, dates their ISO form and lists their formatted items.
+
+    Examples:
+    --------
+    >>> cell_text(2300), cell_text(2300.0), cell_text(['R1', float('nan')])
+    ('2300.0', '2300.0', "['R1', '']")
+    """
+    if isinstance(value, (list, tuple)):
+        return str([cell_text(item) for item in value])
+    if value is None or value is pd.NaT:
+        return ""
+    if isinstance(value, (bool, int, float)) or hasattr(value, "dtype") \
+            and pd.api.types.is_number(value):
+        value = float(value)
+        return "" if math.isnan(value) else repr(round(value, 6))
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def keyed(frame, key):
+    """
+    Format the cells of an output, its rows indexed by (key, rank).
+
+    Parameters:
+    ----------
+    frame: pd.DataFrame
+        The output.
+
+    key: str or None
+        The column pairing the rows, None for the index.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The cells as texts, see cell_text.
+    """
+    keys = frame.index if key is None else frame[key]
+    keys = pd.Series(keys).map(cell_text).values
+
+    # Columns repeating a name are told apart by their occurrence
+    seen, names = {}, []
+    for col in frame.columns:
+        seen[col] = seen.get(col, 0) + 1
+        names.append(col if seen[col] == 1 else f"{col}#{seen[col]}")
+    texts = pd.DataFrame({name: frame.iloc[:, pos].map(cell_text).values
+                          for pos, name in enumerate(names)})
+    rank = texts.groupby(keys, sort=False).cumcount().values
+    texts.index = pd.MultiIndex.from_arrays([keys, rank],
+                                            names=["key", "rank"])
+    return texts
+
+
+def diff_frames(old, new, key=None, examples=EXAMPLES):
+    """
+    Compare two versions of an output.
+
+    Parameters:
+    ----------
+    old: pd.DataFrame
+        The output of the older run.
+
+    new: pd.DataFrame
+        The output of the newer run.
+
+    key: str, optional
+        The column pairing the rows, None for the index.
+
+    examples: int, optional
+        The number of differing cells listed.
+
+    Returns:
+    -------
+    dict
+        The row counts, the rows found in one output only, the rows paired,
+        the rows and cells differing among them, the columns found in one
+        output only, whether the shared columns are in another order and
+        the first differing cells.
+
+    Examples:
+    --------
+    >>> diff_frames(documented['fin_data'], engine['fin_data'],
+    ...             'Tran_Id')['cells_differing']
+    0
+    """
+    old_texts, new_texts = keyed(old, key), keyed(new, key)
+    columns = [col for col in old_texts.columns if col in new_texts.columns]
+    paired = old_texts.index.intersection(new_texts.index)
+
+    old_cells = old_texts.loc[paired, columns]
+    new_cells = new_texts.loc[paired, columns]
+    differ = old_cells.values != new_cells.values
+
+    listed = []
+    for row, col in zip(*differ.nonzero()):
+        if len(listed) == examples:
+            break
+        listed.append({"key": paired[row][0], "rank": int(paired[row][1]),
+                       "column": columns[col],
+                       "old": old_cells.iat[row, col],
+                       "new": new_cells.iat[row, col]})
+
+    return {
+        "rows_old": len(old),
+        "rows_new": len(new),
+        "rows_old_only": len(old_texts.index.difference(paired)),
+        "rows_new_only": len(new_texts.index.difference(paired)),
+        "rows_paired": len(paired),
+        "rows_differing": int(differ.any(axis=1).sum()),
+        "cells_compared": int(differ.size),
+        "cells_differing": int(differ.sum()),
+        "columns_old_only": [col for col in old_texts.columns
+                             if col not in new_texts.columns],
+        "columns_new_only": [col for col in new_texts.columns
+                             if col not in old_texts.columns],
+        "column_order": columns == [col for col in new_texts.columns
+                                    if col in columns],
+        "examples": listed,
+    }
+
+
+def identical(diff):
+    """Whether an output differs in no row, cell, column or column order."""
+    return not (diff["rows_old_only"] or diff["rows_new_only"]
+                or diff["cells_differing"] or diff["columns_old_only"]
+                or diff["columns_new_only"] or not diff["column_order"])
+
+
+def diff_outputs(old, new):
+    """Compare every output of two runs, see diff_frames."""
+    return {name: diff_frames(old[name], new[name], Keys[name])
+            for name in pipeline.Outputs}
+
+
+def stage_walls(reference, engine, sections=Sections):
+    """
+    Pair the wall seconds of the sections of the reference with the steps
+    of the engine run doing the same work.
+
+    Returns:
+    -------
+    list
+        The stage, the seconds of the reference and the engines and the
+        speedup of every section.
+    """
+    stages = []
+    for name, section in sections.items():
+        walls = [engine[step] for step in section["steps"] if step in engine]
+        entry = {"stage": name, "reference": reference.get(name),
+                 "engine": sum(walls) if walls else None, "speedup": None}
+        if entry["reference"] is not None and entry["engine"]:
+            entry["speedup"] = entry["reference"] / entry["engine"]
+        stages.append(entry)
+    return stages
+
+
+def differential(root, out_dir=None, reference=REFERENCE, file_no=None,
+                 jobs=None):
+    """
+    Run the reference, the reference with the documented deltas and the
+    current DPS on the inputs of root and compare their outputs.
+
+    Parameters:
+    ----------
+    root: str
+        The folder holding the dps_in tree.
+
+    out_dir: str, optional
+        The folder receiving the runs under "reference", "documented" and
+        "engine", None for a temporary folder removed afterwards.
+
+    reference: str, optional
+        The folder or git revision of the reference, see reference_sources.
+
+    file_no: int, optional
+        The number of files processed per source.
+
+    jobs: int, optional
+        The workers reading the files of the engine run.
+
+    Returns:
+    -------
+    dict
+        "identical" when the engines differ from the documented reference
+        in no output, the error of the reference when it failed, the
+        documented deltas, the comparison of every output of the reference
+        with the documented one and of the documented one with the
+        engines, and the wall seconds of every stage of the documented
+        reference and the engines with the speedup.
+
+    Examples:
+    --------
+    >>> report = differential('.')
+    >>> report['identical'], report['stages'][2]
+    (True, {'stage': 'upi_match', 'reference': 2.1, 'engine': 0.03, ...})
+    """
+    temporary = out_dir is None
+    out_dir = (tempfile.mkdtemp(prefix="dps_diff_") if temporary
+               else os.path.abspath(out_dir))
+    runs, error = {}, None
+    try:
+        sources = reference_sources(reference)
+
+        # The reference failing on inputs a documented delta fixes is a
+        # finding, not a reason to stop
+        try:
+            run_reference(os.path.join(out_dir, "reference"), root, sources,
+                          file_no)
+            runs["reference"] = None
+        except RuntimeError as err:
+            error = str(err)
+        walls = run_reference(os.path.join(out_dir, "documented"), root,
+                              apply_deltas(sources), file_no)
+        steps = run_engine(os.path.join(out_dir, "engine"), root, file_no,
+                           jobs)
+        for name in list(runs) + ["documented", "engine"]:
+            runs[name] = read_outputs(os.path.join(out_dir, name))
+    finally:
+        if temporary:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    outputs = diff_outputs(runs["documented"], runs["engine"])
+    return {"identical": all(identical(diff) for diff in outputs.values()),
+            "reference": reference,
+            "reference_error": error,
+            "deltas": {name: delta["note"] for name, delta in Deltas.items()},
+            "documented": diff_outputs(runs["reference"],
+                                       runs["documented"])
+            if error is None else {},
+            "outputs": outputs,
+            "stages": stage_walls(walls, steps)}
+
+
+def diff_table(diffs, old, new):
+    """Format the comparison of every output of two runs as a table."""
+    lines = [f"{'output':<32}{f'rows {old}/{new}':>24}{'only o/n':>12}"
+             f"{'rows diff':>11}{'cells diff':>12}  columns"]
+    for name, diff in diffs.items():
+        columns = []
+        if diff["columns_old_only"]:
+            columns.append(f"{old} only {diff['columns_old_only']}")
+        if diff["columns_new_only"]:
+            columns.append(f"{new} only {diff['columns_new_only']}")
+        if not diff["column_order"]:
+            columns.append("order differs")
+        counts = f"{diff['rows_old']}/{diff['rows_new']}"
+        only = f"{diff['rows_old_only']}/{diff['rows_new_only']}"
+        lines.append(f"{pipeline.Outputs[name]:<32}{counts:>24}{only:>12}"
+                     f"{diff['rows_differing']:>11}"
+                     f"{diff['cells_differing']:>12}  " + ", ".join(columns))
+        for example in diff["examples"]:
+            lines.append(f"    {example['key']}#{example['rank']} "
+                         f"{example['column']}: {example['old']!r} -> "
+                         f"{example['new']!r}")
+    return lines
+
+
+def summary(report):
+    """
+    Format a report of differential as tables.
+
+    Examples:
+    --------
+    >>> print(summary(report))
+    documented deltas
+      paytm_row_0: the PayTM scan starts at the first transaction, ...
+    """
+    lines = ["documented deltas"]
+    lines += [f"  {name}: {note}" for name, note in report["deltas"].items()]
+    lines.append("")
+    if report["reference_error"] is None:
+        lines += diff_table(report["documented"], "reference", "documented")
+    else:
+        lines.append(f"reference failed: {report['reference_error']}")
+    lines.append("")
+    lines += diff_table(report["outputs"], "documented", "engine")
+
+    lines.append("")
+    lines.append(f"{'stage':<20}{'reference s':>12}{'engine s':>10}"
+                 f"{'speedup':>10}")
+    for entry in report["stages"]:
+        cells = [f"{entry[key]:>{width}.3f}" if entry[key] is not None
+                 else f"{'-':>{width}}"
+                 for key, width in [("reference", 12), ("engine", 10)]]
+        speedup = f"{entry['speedup']:>9.1f}x" \
+            if entry["speedup"] is not None else f"{'-':>10}"
+        lines.append(f"{entry['stage']:<20}{cells[0]}{cells[1]}{speedup}")
+    lines.append("")
+    lines.append("IDENTICAL" if report["identical"] else "DIFFERENT")
+    return "\n".join(lines)
+
+
+### Parsing command line arguments passed while running script
+args = ArgumentParser(description="Compare the DPS with its version before "
+                                  "the engines, the nested-loop reference")
+args.add_argument('root', type=str, nargs='?', default='.',
+                  help='Folder holding the dps_in tree')
+args.add_argument('-r', '--reference', type=str, dest='reference',
+                  default=REFERENCE,
+                  help='Git revision, or folder, of the reference '
+                       'dps_1_0.py and dps_utils.py')
+args.add_argument('-kk', '--no_file', type=int, dest='file_no',
+                  help='Number of files to be processed per source')
+args.add_argument('-j', '--jobs', type=int, dest='jobs', default=None,
+                  help='Number of workers reading files, defaults to CPUs')
+args.add_argument('-o', '--out_dir', type=str, dest='out_dir', default=None,
+                  help='Folder receiving the report and the three runs')
+
+
+def main(argv=None):
+    """
+    Compare the engines with the reference on the inputs of a folder.
+
+    Returns:
+    -------
+    int
+        1 when an output differs from the documented reference, else 0.
+    """
+    PARSER = args.parse_args(argv)
+    report = differential(PARSER.root, PARSER.out_dir, PARSER.reference,
+                          PARSER.file_no, PARSER.jobs)
+    print(summary(report))
+    if PARSER.out_dir is not None:
+        with open(os.path.join(PARSER.out_dir, "diff_report.json"), "w",
+                  encoding="utf-8") as out_file:
+            json.dump(report, out_file, indent=1, default=str)
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,639 @@
+"""This module contains the matching engines used by the Data Preparation
+Sub-system to link front-desk bookings with PayTM, bank and OTA records,
+and the builder of the front-office ledger.
+
+ - Each engine works on whole columns at once: the records are reshaped into
+ long key tables and joined through pandas' hash joins instead of nested
+ loops over ``.iloc`` lookups.
+
+ - The engines return DataFrames with the same columns that the nested loops
+ in ``dps_1_0.py`` used to build, so the rest of the script is unaffected.
+ dps_diff compares the outputs with those of the script before the engines.
+"""
+##  third party module
+import numpy as np
+import pandas as pd
+
+## user-defined modules
+import dps_utils as utils
+
+
+# Columns of the front-desk dataset carried into the UPI matched dataset
+# ("fr_dataset") and the names they take there
+FR_COLUMNS = {
+    "Name": "guest_name",
+    "Phone": "ph_no",
+    "Adults": "adults",
+    "Mode of Booking": "book_mode",
+    "Rooms Booked": "room_booking",
+    "check-in": "check-in",
+    "check-out": "check-out",
+    "Room Bill (Incl. GST)": "Room_Bill",
+    "Children": "child",
+    "Paid at Check-in": "paid_checkin",
+    "Check-in Payment Method": "checkin_mtd",
+    "Paid at Check-out": "paid_checkout",
+    "Check-out Payment Method": "checkout_mtd",
+    "Total Amount Paid": "total_amt_paid",
+    "Advance Paid": "advance_paid",
+    "Advance Payment Method": "adv_pay_met",
+    "Extras Paid": "extras_paid",
+    "Extras Payment Method": "ext_pay_met",
+    "Extra Person Charges (Incl. GST)": "extra_per_chrg",
+}
+
+# Column order of the UPI matched dataset ("fr_dataset")
+FR_ORDER = ["Amount", "Amount_date", "Bank_Transaction_ID", "guest_name",
+            "ph_no", "adults", "book_mode", "room_booking", "check-in",
+            "check-out", "Room_Bill", "child", "Row_Id", "paid_checkin",
+            "checkin_mtd", "paid_checkout", "checkout_mtd", "total_amt_paid",
+            "advance_paid", "adv_pay_met", "extras_paid", "ext_pay_met",
+            "extra_per_chrg"]
+
+
+## Functions matching front-desk UPI payments with PayTM transactions
+
+def upi_long(upi, rows=None):
+    """
+    Spread the UPI payment arrays into long (booking, slot) rows
+
+    ...
+
+    This function takes the ragged payment arrays of utils.upi_payments and
+    returns one row per UPI payment, the slot being the position of the
+    payment among the payments of its booking. Payments with an invalid
+    date or without a positive amount are dropped.
+
+    Parameters:
+    ----------
+    upi: dict
+        The UPI payments of the front-desk dataset.
+
+    rows: pd.Index, optional
+        The row ids of the bookings kept, None for all of them.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The columns "Row_Id", "slot", "upi_date" and "Amount".
+
+    Examples:
+    --------
+    >>> upi_long(upi, fd_frame.index)
+    DataFrame
+    """
+    offsets = upi["offsets"]
+    counts = np.diff(offsets)
+    long = pd.DataFrame({
+        "Row_Id": np.repeat(upi["row_id"], counts),
+        "slot": np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts),
+        "upi_date": upi["date"],
+        "Amount": upi["amount"],
+    })
+
+    keep = (long["Amount"] > 0) & long["upi_date"].notna()
+    if rows is not None:
+        keep &= long["Row_Id"].isin(rows)
+    return long[keep].reset_index(drop=True)
+
+def amount_key(values):
+    """
+    Join key of amounts: exact integers when the amounts are whole numbers,
+    e.g. held in paise, float64 otherwise.
+    """
+    values = pd.to_numeric(values, errors="coerce")
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype("Int64")
+    return values.astype("float64")
+
+
+def upi_match(fd_frame, ptm_data, upi):
+    """
+    Match front-desk UPI payments with PayTM transactions
+
+    ...
+
+    This function explodes the UPI details of every booking into long
+    (booking, slot, date, amount) rows and joins them with the PayTM
+    transactions on (date, amount) through a hash join. Every booking
+    payment is paired with every PayTM transaction carrying the same date
+    and amount. The rows are ordered by slot, then booking, then PayTM
+    transaction, as the nested loops used to produce them.
+
+    Parameters:
+    ----------
+    fd_frame: pd.DataFrame
+        The front-desk dataset.
+
+    ptm_data: pd.DataFrame
+        The consistent PayTM dataset with the columns "ptm_trans_date",
+        "Amount_transaction" and "Transaction_ID_transaction".
+
+    upi: dict
+        The UPI payments of the front-desk dataset, see utils.upi_payments.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The UPI matched dataset ("fr_dataset").
+
+    Examples:
+    --------
+    >>> upi_match(fd_frame, ptm_data_consi, upi)
+    DataFrame
+    """
+    amt_key = amount_key(ptm_data["Amount_transaction"])
+    upi = upi_long(upi, fd_frame.index)
+    upi["amt_key"] = upi["Amount"].astype(amt_key.dtype)
+
+    ptm = pd.DataFrame({
+        "ptm_pos": np.arange(len(ptm_data)),
+        "upi_date": ptm_data["ptm_trans_date"].values,
+        "amt_key": amt_key.values,
+        "Bank_Transaction_ID": ptm_data["Transaction_ID_transaction"].values,
+    }).dropna(subset=["upi_date", "amt_key"])
+
+    matched = pd.merge(upi, ptm, on=["upi_date", "amt_key"], how="inner")
+    matched = matched.sort_values(by=["slot", "Row_Id", "ptm_pos"],
+                                  kind="stable").reset_index(drop=True)
+
+    fd_cols = fd_frame.loc[matched["Row_Id"], list(FR_COLUMNS)] \
+        .rename(columns=FR_COLUMNS).reset_index(drop=True)
+
+    fr_dataset = pd.concat([matched[["Amount", "Bank_Transaction_ID",
+                                     "Row_Id"]], fd_cols], axis=1)
+    fr_dataset["Amount"] = fr_dataset["Amount"].astype("int64")
+    fr_dataset["Amount_date"] = matched["upi_date"]
+
+    return fr_dataset[FR_ORDER]
+
+
+## Functions matching front-desk bookings with Booking.com reservations
+
+def bcom_match(fr_dataset, bc_df, commission, threshold=0.2, cache=None,
+               unit=1):
+    """
+    Match front-desk bookings with Booking.com reservations
+
+    ...
+
+    This function builds a blocking index of the Booking.com reservations
+    keyed on (check-in, check-out, number of rooms) and joins the
+    front-desk rows booked through Booking.com against it. The trigram
+    comparison of the guest name with "Booked by" only runs on the pairs
+    sharing a block. When a booking matches several reservations, the
+    last reservation wins. The Booking.com columns are written back in
+    bulk.
+
+    Parameters:
+    ----------
+    fr_dataset: pd.DataFrame
+        The UPI matched dataset.
+
+    bc_df: pd.DataFrame
+        The Booking.com reservations with status "ok" and the column
+        "price_gst".
+
+    commission: float
+        The Booking.com commission rate.
+
+    threshold: float, optional
+        The trigram threshold for the guest names.
+
+    cache: dps_utils.TrigramCache, optional
+        The cache of guest name trigrams and scores shared by the stages.
+
+    unit: int, optional
+        The amount of one rupee, utils.PAISE when the amounts are in paise.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The UPI matched dataset with the columns "Booking_Id",
+        "price_gst" and "ota_commission_amount".
+
+    Examples:
+    --------
+    >>> bcom_match(fr_dataset, bc_df, const['BCOM_COMMISSION'])
+    DataFrame
+    """
+    fr_dataset = fr_dataset.copy()
+    for col in ["Booking_Id", "price_gst", "ota_commission_amount"]:
+        if col not in fr_dataset:
+            fr_dataset[col] = np.nan
+
+    fd_comp = fr_dataset[fr_dataset["book_mode"] == "BOOKING.COM"]
+    fd_keys = pd.DataFrame({
+        "fr_pos": fd_comp.index,
+        "checkin": fd_comp["check-in"].values,
+        "checkout": fd_comp["check-out"].values,
+        "rooms": pd.to_numeric(fd_comp["room_booking"].str.len(),
+                               errors="coerce").astype("float64").values,
+        "guest_name": fd_comp["guest_name"].values,
+    })
+    bc_keys = pd.DataFrame({
+        "bc_pos": bc_df.index,
+        "checkin": bc_df["Check-in"].values,
+        "checkout": bc_df["Check-out"].values,
+        "rooms": pd.to_numeric(bc_df["Rooms"],
+                               errors="coerce").astype("float64").values,
+        "booked_by": bc_df["Booked by"].values,
+    })
+
+    blocks = ["checkin", "checkout", "rooms"]
+    cand = pd.merge(fd_keys.dropna(subset=blocks),
+                    bc_keys.dropna(subset=blocks), on=blocks, how="inner")
+
+    # Fuzzy comparison of names only for the pairs inside a block
+    same_name = utils.trigram_pairwise(cand["guest_name"],
+                                       cand["booked_by"], cache) > threshold
+    hits = cand[same_name] \
+        .sort_values(by=["fr_pos", "bc_pos"], kind="stable") \
+        .drop_duplicates(subset="fr_pos", keep="last")
+
+    rows, bc_rows = hits["fr_pos"].values, hits["bc_pos"].values
+    fr_dataset.loc[rows, "Booking_Id"] = bc_df.loc[bc_rows,
+                                                   "Book Number"].values
+    fr_dataset.loc[rows, "price_gst"] = bc_df.loc[bc_rows, "price_gst"].values
+    fr_dataset.loc[rows, "ota_commission_amount"] = utils.round_money(
+        bc_df.loc[bc_rows, "Price"] * commission, unit).values
+
+    return fr_dataset
+
+
+## Functions matching front-desk bookings with InGo-MMT bookings
+
+# Columns of the front-desk and InGo-MMT datasets carried into the MMT
+# matched dataset ("fr_mmt_comb") and the names they take there
+MMT_FD_COLUMNS = {
+    "Name": "cust_name",
+    "check-in": "checkin",
+    "check-out": "checkout",
+    "Rooms Booked": "room",
+    "Phone": "ph_no",
+    "Adults": "Adults",
+    "Extra Person Charges (Incl. GST)": "extra_per_charge",
+    "Total Amount Paid": "total_amt_paid",
+    "Extras Paid": "extra_paid",
+}
+MMT_OTA_COLUMNS = {
+    "Booking Amount": "ota_amount",
+    "Payments Date": "trans_dt",
+    "Booking Id": "booking_Id",
+    "Brand": "brand",
+    "Bank Ref No": "bank_ref_no",
+}
+
+# Column order of the MMT matched dataset ("fr_mmt_comb")
+MMT_ORDER = ["Row_Id", "ota_amount", "trans_dt", "booking_Id", "cust_name",
+             "checkin", "checkout", "brand", "room", "bank_ref_no", "ph_no",
+             "Adults", "extra_per_charge", "total_amt_paid", "extra_paid"]
+
+
+def day_number(dates):
+    """
+    Convert dates to the number of days since the epoch
+
+    Parameters:
+    ----------
+    dates: pd.Series
+        The dates as datetime.date, Timestamp or datetime64 values.
+
+    Returns:
+    -------
+    np.ndarray
+        The day numbers as float64, NaN for missing dates.
+
+    Examples:
+    --------
+    >>> day_number(pd.Series([datetime.date(1970, 1, 3)]))
+    array([2.])
+    """
+    days = pd.to_datetime(dates, errors="coerce").values \
+        .astype("datetime64[D]")
+    return np.where(np.isnat(days), np.nan,
+                    days.astype(np.int64).astype("float64"))
+
+def interval_join(left, right, tolerance=0):
+    """
+    Join two sets of stays on check-in and check-out dates
+
+    ...
+
+    This function sorts the right stays by check-in once and, for every
+    left stay, finds the right stays whose check-in lies within
+    ``tolerance`` days with two binary searches. The candidates are then
+    kept when their check-out also lies within ``tolerance`` days. With a
+    tolerance of 0 this is an exact join on both dates. The cost is
+    O((n + m) log m) plus the number of candidates.
+
+    Parameters:
+    ----------
+    left, right: pd.DataFrame
+        The stays with the day numbers "checkin" and "checkout".
+
+    tolerance: int, optional
+        The number of days either date may differ by.
+
+    Returns:
+    -------
+    tuple
+        The positions in ``left`` and in ``right`` of the joined stays,
+        ordered by left then right position.
+
+    Examples:
+    --------
+    >>> interval_join(left, right, tolerance=1)
+    (array([0, 0]), array([1, 3]))
+    """
+    order = np.argsort(right["checkin"].values, kind="stable")
+    r_in = right["checkin"].values[order]
+    l_in = left["checkin"].values
+
+    low = np.searchsorted(r_in, l_in - tolerance, side="left")
+    high = np.searchsorted(r_in, l_in + tolerance, side="right")
+    count = np.where(np.isnan(l_in), 0, high - low)
+
+    l_pos = np.repeat(np.arange(len(left)), count)
+    r_pos = order[np.repeat(low - (np.cumsum(count) - count), count)
+                  + np.arange(count.sum())]
+
+    near = np.abs(left["checkout"].values[l_pos]
+                  - right["checkout"].values[r_pos]) <= tolerance
+    l_pos, r_pos = l_pos[near], r_pos[near]
+
+    ordered = np.lexsort((r_pos, l_pos))
+    return l_pos[ordered], r_pos[ordered]
+
+def mmt_match(fd_frame, mmt_dataset, tolerance=0, threshold=0.05,
+              cache=None):
+    """
+    Match front-desk bookings with confirmed InGo-MMT bookings
+
+    ...
+
+    This function joins the front-desk stays with the confirmed InGo-MMT
+    stays on check-in and check-out dates, exactly or within a tolerance
+    of some days, and keeps the pairs whose guest names are similar. Only
+    the pairs that survive the date join are scored. A booking is paired
+    with every InGo-MMT booking it matches.
+
+    Parameters:
+    ----------
+    fd_frame: pd.DataFrame
+        The front-desk dataset.
+
+    mmt_dataset: pd.DataFrame
+        The InGo-MMT dataset.
+
+    tolerance: int, optional
+        The number of days the stay dates may differ by.
+
+    threshold: float, optional
+        The trigram threshold for the guest names.
+
+    cache: dps_utils.TrigramCache, optional
+        The cache of guest name trigrams and scores shared by the stages.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The MMT matched dataset ("fr_mmt_comb").
+
+    Examples:
+    --------
+    >>> mmt_match(fd_frame, mmt_dataset)
+    DataFrame
+    """
+    confirmed = mmt_dataset[mmt_dataset["Booking Status"] == "Confirmed"]
+
+    fd_stays = pd.DataFrame({"checkin": day_number(fd_frame["check-in"]),
+                             "checkout": day_number(fd_frame["check-out"])})
+    mmt_stays = pd.DataFrame({
+        "checkin": day_number(confirmed["Checkin Date"]),
+        "checkout": day_number(confirmed["Checkout Date"])})
+    mmt_stays = mmt_stays[mmt_stays["checkin"].notna()]
+
+    fd_pos, mmt_pos = interval_join(fd_stays, mmt_stays, tolerance)
+    fd_rows = fd_frame.index[fd_pos]
+    mmt_rows = confirmed.index[mmt_stays.index[mmt_pos]]
+
+    # Fuzzy comparison of names only for the stays joined on dates
+    same_name = utils.trigram_pairwise(
+        fd_frame.loc[fd_rows, "Name"], confirmed.loc[mmt_rows, "Guest Name"],
+        cache) > threshold
+    fd_rows, mmt_rows = fd_rows[same_name], mmt_rows[same_name]
+
+    fr_mmt_comb = pd.concat([
+        fd_frame.loc[fd_rows, list(MMT_FD_COLUMNS)]
+        .rename(columns=MMT_FD_COLUMNS).reset_index(drop=True),
+        confirmed.loc[mmt_rows, list(MMT_OTA_COLUMNS)]
+        .rename(columns=MMT_OTA_COLUMNS).reset_index(drop=True),
+    ], axis=1)
+    fr_mmt_comb["Row_Id"] = np.asarray(fd_rows)
+
+    return fr_mmt_comb[MMT_ORDER]
+
+
+## Functions resolving reference numbers to bank transactions
+
+def ref_index(bnk_state):
+    """
+    Index the bank statement transactions by reference number
+
+    ...
+
+    This function builds, once, the lookup from the reference number
+    extracted from "Transaction Remarks" ("ref_no") to the bank
+    transaction id ("Tran. Id"). When a reference number shows up more
+    than once, the last transaction of the statement wins.
+
+    Parameters:
+    ----------
+    bnk_state: pd.DataFrame
+        The bank statement with the columns "ref_no" and "Tran. Id".
+
+    Returns:
+    -------
+    pd.Series
+        The "Tran. Id" indexed by "ref_no".
+
+    Examples:
+    --------
+    >>> ref_index(bnk_state)
+    Series
+    """
+    refs = bnk_state[["ref_no", "Tran. Id"]].dropna(subset=["ref_no"])
+    refs = refs.drop_duplicates(subset="ref_no", keep="last")
+    return refs.set_index("ref_no")["Tran. Id"]
+
+def resolve_utr(fr_dataset, ptm_data, ref_idx):
+    """
+    Append the bank transaction id to the UPI matched dataset
+
+    ...
+
+    This function follows every matched PayTM transaction to its UTR
+    number and the UTR number to the bank transaction through the
+    reference index, in one pass each. When a PayTM transaction id
+    shows up more than once, the last one with a bank transaction wins.
+
+    Parameters:
+    ----------
+    fr_dataset: pd.DataFrame
+        The UPI matched dataset.
+
+    ptm_data: pd.DataFrame
+        The consistent PayTM dataset.
+
+    ref_idx: pd.Series
+        The reference index built by ``ref_index``.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The UPI matched dataset with the column "Tran_Id".
+
+    Examples:
+    --------
+    >>> resolve_utr(fr_dataset, ptm_data_consi, ref_index(bnk_state))
+    DataFrame
+    """
+    utr = ptm_data[["Transaction_ID_transaction", "UTR_No."]]
+    utr = utr[utr["UTR_No."].isin(ref_idx.index)]
+    utr = utr.drop_duplicates(subset="Transaction_ID_transaction",
+                              keep="last")
+    tran_ids = pd.Series(utr["UTR_No."].map(ref_idx).values,
+                         index=utr["Transaction_ID_transaction"].values)
+
+    fr_dataset = fr_dataset.copy()
+    fr_dataset["Tran_Id"] = fr_dataset["Bank_Transaction_ID"].map(tran_ids)
+    return fr_dataset
+
+def resolve_bank_ref(fr_mmt_comb, ref_idx):
+    """
+    Append the bank transaction id to the MMT matched dataset
+
+    Parameters:
+    ----------
+    fr_mmt_comb: pd.DataFrame
+        The MMT matched dataset.
+
+    ref_idx: pd.Series
+        The reference index built by ``ref_index``.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The MMT matched dataset with the column "trans_id".
+
+    Examples:
+    --------
+    >>> resolve_bank_ref(fr_mmt_comb, ref_index(bnk_state))
+    DataFrame
+    """
+    fr_mmt_comb = fr_mmt_comb.copy()
+    fr_mmt_comb["trans_id"] = fr_mmt_comb["bank_ref_no"].map(ref_idx)
+    return fr_mmt_comb
+
+
+## Functions building the front-office ledger
+
+# Payment methods of the front-desk data and the ledger column holding the
+# amount paid through each of them
+PAY_METHODS = {
+    "UPI": "paid_upi",
+    "CASH": "paid_cash",
+    "A/C": "paid_act",
+    "CARD": "paid_card",
+}
+
+# Payment method columns of the front-desk data, in the order they are
+# looked at, and the amount each of them refers to
+PAY_COLUMNS = {
+    "Check-in Payment Method": "Paid at Check-in",
+    "Check-out Payment Method": "Paid at Check-out",
+    "Advance Payment Method": "Advance Paid",
+    "Extras Payment Method": "Extras Paid",
+}
+
+# Modes of booking settled through an OTA
+OTA_MODES = ["BOOKING.COM", "MMT", "GOIBIBO"]
+
+
+def paid_ledger(fd_frame, methods=PAY_METHODS, ota_modes=OTA_MODES):
+    """
+    Breakdown of the amount paid for every booking by payment method
+
+    ...
+
+    This function forms the front-office ledger in one columnar pass.
+    For every payment method it adds the amounts paid at check-in, at
+    check-out, in advance and for extras through that method. As before,
+    a booking only counts towards a method when the first payment method
+    filled in, in the order of ``PAY_COLUMNS``, is part of the method's
+    name. Bookings made through an OTA also get the total paid in
+    "paid_ota". As in the loop, that column comes before the one of the
+    first method when the first booking is made through an OTA, and right
+    after it otherwise; it is kept, empty, when no booking is.
+
+    Parameters:
+    ----------
+    fd_frame: pd.DataFrame
+        The front-desk dataset.
+
+    methods: dict, optional
+        The payment methods and the ledger column of each of them.
+
+    ota_modes: list, optional
+        The modes of booking settled through an OTA.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The front-office ledger.
+
+    Examples:
+    --------
+    >>> paid_ledger(fd_frame)
+    DataFrame
+    """
+    ledger = pd.DataFrame({
+        "row_id": fd_frame.index,
+        "room_bill": fd_frame["Room Bill (Incl. GST)"].values,
+        "total_amount_paid": fd_frame["Total Amount Paid"].values,
+        "paid_checkin": fd_frame["Paid at Check-in"].values,
+        "paid_checkout": fd_frame["Paid at Check-out"].values,
+        "paid_inbetween": fd_frame["Extras Paid"].values,
+    }, index=fd_frame.index)
+
+    ota_paid = (fd_frame["Extra Person Charges (Incl. GST)"]
+                + fd_frame["Advance Paid"] + fd_frame["Paid at Check-in"]
+                + fd_frame["Paid at Check-out"] + fd_frame["Extras Paid"])
+    ota = fd_frame["Mode of Booking"].isin(ota_modes)
+
+    # First payment method filled in, the last one when none is
+    pay_cols = list(PAY_COLUMNS)
+    first_method = fd_frame[pay_cols[-1]].astype(object)
+    for col in reversed(pay_cols[:-1]):
+        method_col = fd_frame[col].astype(object)
+        first_method = method_col.where(method_col.astype(bool),
+                                        first_method)
+    first_values = pd.unique(first_method)
+
+    for method, col in methods.items():
+        counted = first_method.isin([value for value in first_values
+                                     if isinstance(value, str)
+                                     and value in method])
+        paid = sum(fd_frame[amount].where(fd_frame[method_col] == method, 0)
+                   for method_col, amount in PAY_COLUMNS.items())
+        ledger[col] = paid.where(counted, 0)
+
+    # "paid_ota" where paid() created it, at the first OTA booking: before
+    # the first method when that is the first booking, after it otherwise
+    first_col = ledger.columns.get_loc(next(iter(methods.values())))
+    first_ota = len(ota) > 0 and bool(ota.iloc[0])
+    ledger.insert(first_col + (0 if first_ota else 1), "paid_ota",
+                  ota_paid.where(ota))
+
+    return ledger.reset_index(drop=True)
@@ -0,0 +1,505 @@
+"""This module contains the incremental ingestion of the input files.
+
+ - A manifest records every ingested file (path, size, modification time,
+ hash and the rows it holds in the combined dataframe of its source). On the
+ next run only the files missing from the manifest are parsed, and put in
+ the listing order of their source among the ingested ones, as a full build
+ reads them. New front-desk files must come after the ingested ones, so that
+ the row ids of the bookings stay the same between runs.
+
+ - The raw dataframes of the sources and the matched datasets of the
+ previous run are kept next to the manifest. Bookings already settled in the
+ bank statement keep their matches, every other booking is matched again.
+ The Booking.com details of the settled bookings are matched again all the
+ same, their export may come later than the bank statement.
+
+ - A changed or removed file, a front-desk file listed before the ingested
+ ones, or changed constants, trigger a full build.
+"""
+##  third party module
+import numpy as np
+import pandas as pd
+
+## inbuilt module
+import json
+import os
+import pickle
+
+## user-defined modules
+import dps_utils as utils
+import dps_engine as engine
+import dps_cache
+
+# Version of the manifest and of the state files, part of the config
+MANIFEST_VERSION = 1
+
+# Files kept in the state folder
+MANIFEST = "manifest.json"
+SOURCES = "sources.pkl"
+MATCHES = "matches.pkl"
+
+
+## Functions handling the manifest of ingested files
+
+def file_entry(path, start=0, stop=0):
+    """
+    Describe an ingested file for the manifest.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the file.
+
+    start: int, optional
+        The first row of the file in the combined dataframe of its source.
+
+    stop: int, optional
+        The row after the last row of the file.
+
+    Returns:
+    -------
+    dict
+        The path, size, modification time, hash and rows of the file.
+
+    Examples:
+    --------
+    >>> file_entry('dps_in/Front-Desk/fd1.csv', 0, 80)
+    {'path': 'dps_in/Front-Desk/fd1.csv', 'size': 10240, ...}
+    """
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime,
+            "sha256": dps_cache.file_digest(path), "rows": [start, stop]}
+
+
+def unchanged(entry):
+    """
+    Check whether an ingested file is still the one in the manifest.
+
+    ...
+
+    The file is hashed again only when its modification time moved.
+    """
+    try:
+        stat = os.stat(entry["path"])
+    except FileNotFoundError:
+        return False
+    if stat.st_size != entry["size"]:
+        return False
+    return stat.st_mtime == entry["mtime"] \
+        or dps_cache.file_digest(entry["path"]) == entry["sha256"]
+
+
+def read_json(path):
+    """Read a json file, None if it is missing."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as in_file:
+        return json.load(in_file)
+
+
+def read_pickle(path):
+    """Read a pickle file, None if it is missing."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as in_file:
+        return pickle.load(in_file)
+
+
+def write_atomic(path, dump, mode="wb"):
+    """Write a file through a temporary file renamed over it."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as out_file:
+        dump(out_file)
+    os.replace(tmp_path, path)
+
+
+def run_config(const):
+    """The settings a state must have been built with to be reused."""
+    return {"manifest": MANIFEST_VERSION, "schema": utils.SCHEMA_VERSION,
+            "readers": dps_cache.options_token(utils.Readers),
+            "const": const}
+
+
+def plan(manifest, listing, config):
+    """
+    Compare the listed files with the manifest of the previous run.
+
+    Parameters:
+    ----------
+    manifest: dict or None
+        The manifest of the previous run.
+
+    listing: dict
+        The files of every source.
+
+    config: dict
+        The settings of this run, see run_config.
+
+    Returns:
+    -------
+    dict or None
+        The files of every source missing from the manifest, in listing
+        order, or None when everything has to be built again.
+
+    Examples:
+    --------
+    >>> plan(manifest, {'front_desk': ['fd1.csv', 'fd2.csv']}, config)
+    {'front_desk': ['fd2.csv']}
+    """
+    if manifest is None:
+        return None
+    if manifest["config"] != json.loads(json.dumps(config)):
+        print("Settings changed since the last run, building everything")
+        return None
+    if set(manifest["sources"]) != set(listing):
+        return None
+
+    new = {}
+    for source, paths in listing.items():
+        entries = manifest["sources"][source]
+        for entry in entries:
+            if entry["path"] not in paths or not unchanged(entry):
+                print(f"{entry['path']} changed since the last run, "
+                      "building everything")
+                return None
+        known = {entry["path"] for entry in entries}
+        new[source] = [path for path in paths if path not in known]
+
+        # The row ids of the bookings follow the front-desk files
+        if source == "front_desk" and new[source] and known and \
+                paths.index(new[source][0]) < max(map(paths.index, known)):
+            print(f"{new[source][0]} comes before the ingested front-desk "
+                  "files, building everything")
+            return None
+    return new
+
+
+## Functions loading the sources incrementally
+
+def load(folder_paths, FILE_NO, state_dir, const, workers=None, cache=None):
+    """
+    Fetch the data of the sources, parsing only the files not yet ingested.
+
+    ...
+
+    The frames of the files listed in the manifest come from the state of
+    the previous run, the new files are parsed and appended after them. The
+    raw frames are written back to the state at once, the manifest is only
+    written by save once the matches are, so an interrupted run is detected
+    by the row counts and triggers a full build.
+
+    Parameters:
+    ----------
+    folder_paths: dict
+        The containing directory of every source, keyed as dps_utils.Readers.
+
+    FILE_NO: int or None
+        The number of files to be processed per source, None for all.
+
+    state_dir: str
+        The folder holding the manifest and the state.
+
+    const: dict
+        The constants of the run, the state is dropped when they change.
+
+    workers: int, optional
+        The number of workers reading files, None for the number of CPUs.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    Returns:
+    -------
+    tuple
+        The dataframe of every source, the matched datasets of the previous
+        run (None on a full build) and the manifest of this run.
+
+    Examples:
+    --------
+    >>> sources, prior, manifest = load(folder_paths, None, 'state', const)
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    config = run_config(const)
+    listing = {source: utils.file_list(folder_path, FILE_NO)
+               for source, folder_path in folder_paths.items()}
+    manifest = read_json(os.path.join(state_dir, MANIFEST))
+    new = plan(manifest, listing, config)
+
+    frames = prior = None
+    if new is not None:
+        frames = read_pickle(os.path.join(state_dir, SOURCES))
+        prior = read_pickle(os.path.join(state_dir, MATCHES))
+        if frames is None or prior is None or any(
+                len(frames[source]) != (entries[-1]["rows"][1]
+                                        if entries else 0)
+                for source, entries in manifest["sources"].items()):
+            new = frames = prior = None
+
+    if new is None:
+        new = listing
+        manifest = {"config": config,
+                    "sources": {source: [] for source in listing}}
+        frames = {source: pd.DataFrame() for source in listing}
+
+    jobs = [(source, path) for source, paths in new.items() for path in paths]
+    for _, path in jobs:
+        print(path)
+    parsed = utils.read_files([(path, utils.Readers[source])
+                               for source, path in jobs], workers, cache)
+
+    # Every file of a source in listing order, the ingested ones sliced from
+    # the frame of the previous run by their rows
+    known = {source: {entry["path"]: entry for entry in entries}
+             for source, entries in manifest["sources"].items()}
+    pieces = {source: {path: frames[source].iloc[slice(*entry["rows"])]
+                       for path, entry in known[source].items()}
+              for source in listing}
+    for (source, path), frame in zip(jobs, parsed):
+        pieces[source][path] = frame
+        known[source][path] = file_entry(path)
+
+    for source, paths in listing.items():
+        start, source_frames = 0, []
+        for path in paths:
+            frame = pieces[source][path]
+            known[source][path]["rows"] = [start, start + len(frame)]
+            start += len(frame)
+            source_frames.append(frame)
+        manifest["sources"][source] = [known[source][path] for path in paths]
+        frames[source] = utils.concat_frames(
+            [frame for frame in source_frames if len(frame.columns)])
+
+    if jobs:
+        write_atomic(os.path.join(state_dir, SOURCES),
+                     lambda out_file: pickle.dump(
+                         frames, out_file, protocol=pickle.HIGHEST_PROTOCOL))
+    return frames, prior, manifest
+
+
+def save(state_dir, manifest, **matches):
+    """
+    Keep the matched datasets and the manifest for the next run.
+
+    Parameters:
+    ----------
+    state_dir: str
+        The folder holding the manifest and the state.
+
+    manifest: dict
+        The manifest returned by load.
+
+    matches: pd.DataFrame
+        The matched datasets, keyed by name.
+
+    Examples:
+    --------
+    >>> save('state', manifest, fr_dataset=fr_dataset,
+    ...      fr_mmt_comb=fr_mmt_comb)
+    """
+    write_atomic(os.path.join(state_dir, MATCHES),
+                 lambda out_file: pickle.dump(
+                     matches, out_file, protocol=pickle.HIGHEST_PROTOCOL))
+    write_atomic(os.path.join(state_dir, MANIFEST),
+                 lambda out_file: json.dump(manifest, out_file, indent=1),
+                 mode="w")
+
+
+## Functions keeping the matches of the settled bookings
+
+def settled_upi(fr_dataset, upi, fd_frame, ptm_data_consi):
+    """
+    Find the bookings whose UPI payments were all settled in the bank.
+
+    ...
+
+    A booking is settled when every one of its UPI payments was matched
+    with a PayTM transaction that reached the bank statement ("Tran_Id"),
+    no other PayTM transaction matched with it is still missing from the
+    bank statement, and the PayTM transactions of this run match it with
+    the same transactions, a late PayTM file bringing none.
+
+    Parameters:
+    ----------
+    fr_dataset: pd.DataFrame or None
+        The UPI matched dataset of the previous run.
+
+    upi: dict
+        The UPI payments of the front-desk dataset, see utils.upi_payments.
+
+    fd_frame: pd.DataFrame
+        The front-desk dataset of this run.
+
+    ptm_data_consi: pd.DataFrame
+        The consistent PayTM transactions of this run.
+
+    Returns:
+    -------
+    pd.Index
+        The row ids of the settled bookings.
+
+    Examples:
+    --------
+    >>> settled_upi(prior['fr_dataset'], upi, fd_frame, ptm_data_consi)
+    Index([0, 3, 4], dtype='int64')
+    """
+    if fr_dataset is None:
+        return pd.Index([], dtype="int64")
+
+    slots = upi_slots(fr_dataset[fr_dataset["Tran_Id"].notna()], upi)
+    paid = engine.upi_long(upi).groupby("Row_Id")["slot"].nunique()
+    done = slots.dropna().groupby("Row_Id")["slot"].nunique()
+    done = done.reindex(paid.index, fill_value=0)
+
+    # A payment matching several PayTM transactions waits for all of them
+    pending = fr_dataset.loc[fr_dataset["Tran_Id"].isna(), "Row_Id"]
+    settled = paid.index[(done == paid).values].difference(pending.unique())
+
+    # The matches a booking would get now, compared by transaction id
+    def matched(frame):
+        return frame.groupby("Row_Id")["Bank_Transaction_ID"] \
+                    .agg(lambda ids: tuple(sorted(ids)))
+    before = matched(fr_dataset[fr_dataset["Row_Id"].isin(settled)])
+    now = matched(engine.upi_match(fd_frame.loc[settled], ptm_data_consi,
+                                   upi))
+    return settled[[before.get(row) == now.get(row) for row in settled]]
+
+
+def settled_mmt(fr_mmt_comb):
+    """Find the bookings whose InGo-MMT payout reached the bank."""
+    if fr_mmt_comb is None:
+        return pd.Index([], dtype="int64")
+    return pd.Index(fr_mmt_comb.loc[fr_mmt_comb["trans_id"].notna(),
+                                    "Row_Id"].unique())
+
+
+def kept_upi(fr_dataset, settled):
+    """
+    Take the UPI matches of the settled bookings from the previous run, their
+    Booking.com details emptied to be matched again.
+
+    Parameters:
+    ----------
+    fr_dataset: pd.DataFrame or None
+        The UPI matched dataset of the previous run.
+
+    settled: pd.Index
+        The row ids of the settled bookings, see settled_upi.
+
+    Returns:
+    -------
+    pd.DataFrame or None
+        The matches kept, None on a full build.
+
+    Examples:
+    --------
+    >>> kept = kept_upi(prior['fr_dataset'], settled)
+    >>> engine.bcom_match(kept, bc_df, const['BCOM_COMMISSION'])
+    DataFrame
+    """
+    if fr_dataset is None:
+        return None
+    kept = fr_dataset[fr_dataset["Row_Id"].isin(settled)].copy()
+    for col in ["Booking_Id", "price_gst", "ota_commission_amount"]:
+        if col in kept:
+            kept[col] = np.nan
+    return kept
+
+
+def upi_slots(fr_dataset, upi):
+    """
+    Find the UPI payment ("slot") of the booking every matched row pays.
+
+    ...
+
+    The slot is looked up by booking, date and amount. When a booking has
+    two payments of the same amount on the same date both rows get the
+    first one.
+    """
+    upi = engine.upi_long(upi).rename(
+        columns={"upi_date": "Amount_date"})
+    upi = upi.drop_duplicates(subset=["Row_Id", "Amount_date", "Amount"])
+    keys = fr_dataset[["Row_Id", "Amount_date", "Amount"]].reset_index()
+    keys["Amount"] = keys["Amount"].astype("float64")
+    upi["Amount"] = upi["Amount"].astype("float64")
+    return pd.merge(keys, upi, on=["Row_Id", "Amount_date", "Amount"],
+                    how="left").set_index("index")[["Row_Id", "slot"]]
+
+
+def merge_upi(prior, fresh, upi, settled):
+    """
+    Combine the UPI matches kept for settled bookings with the new ones.
+
+    ...
+
+    The rows are put back in the order of a full run: by UPI payment, then
+    booking, the rows of a booking keeping their PayTM order.
+
+    Parameters:
+    ----------
+    prior: pd.DataFrame or None
+        The UPI matched dataset of the previous run, or its matches kept
+        for the settled bookings, see kept_upi.
+
+    fresh: pd.DataFrame
+        The UPI matched dataset of the bookings matched in this run.
+
+    upi: dict
+        The UPI payments of the front-desk dataset, see utils.upi_payments.
+
+    settled: pd.Index
+        The row ids of the settled bookings, see settled_upi.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The UPI matched dataset of all the bookings.
+
+    Examples:
+    --------
+    >>> merge_upi(prior['fr_dataset'], fr_dataset, upi, settled)
+    DataFrame
+    """
+    if prior is None:
+        return fresh
+
+    kept = prior[prior["Row_Id"].isin(settled)]
+    combined = pd.concat([kept, fresh], axis=0, ignore_index=True)
+    slots = upi_slots(combined, upi)
+    order = pd.DataFrame({"slot": slots["slot"].values,
+                          "Row_Id": combined["Row_Id"].values})
+    order = order.sort_values(by=["slot", "Row_Id"], kind="stable")
+    return combined.iloc[order.index].reset_index(drop=True)
+
+
+def merge_mmt(prior, fresh, settled):
+    """
+    Combine the InGo-MMT matches kept for settled bookings with the new ones.
+
+    Parameters:
+    ----------
+    prior: pd.DataFrame or None
+        The MMT matched dataset of the previous run.
+
+    fresh: pd.DataFrame
+        The MMT matched dataset of the bookings matched in this run.
+
+    settled: pd.Index
+        The row ids of the settled bookings, see settled_mmt.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The MMT matched dataset of all the bookings, by booking.
+
+    Examples:
+    --------
+    >>> merge_mmt(prior['fr_mmt_comb'], fr_mmt_comb, settled)
+    DataFrame
+    """
+    if prior is None:
+        return fresh
+
+    kept = prior[prior["Row_Id"].isin(settled)]
+    combined = pd.concat([kept, fresh], axis=0, ignore_index=True)
+    return combined.sort_values(by="Row_Id", kind="stable") \
+                   .reset_index(drop=True)
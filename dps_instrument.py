@@ -0,0 +1,215 @@
+"""This module contains the instrumentation of the DPS runs.
+
+ - Every step of a run (loading, cleaning, matching, building and writing
+ the outputs) records its wall time, CPU time, the peak resident memory of
+ the process while it ran and the rows of the artifacts it read and wrote.
+
+ - The matching steps add their matched and unmatched counts.
+
+ - The records are written as a json run report and can be printed as a
+ summary table at the end of the run.
+
+ - The resident memory is sampled by a background thread through psutil,
+ which also works on Windows.
+"""
+##  third party module
+import pandas as pd
+import numpy as np
+import psutil
+
+## inbuilt module
+import json
+import os
+import platform
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+
+# Seconds between two samples of the resident memory
+INTERVAL = 0.01
+
+# Bytes in a MB
+MB = 1 << 20
+
+
+def rows(artifact):
+    """
+    Count the rows of an artifact.
+
+    Parameters:
+    ----------
+    artifact: object
+        A dataframe, series, index, the UPI payment arrays or any sized
+        object.
+
+    Returns:
+    -------
+    int or None
+        The number of rows, None when the artifact has no rows, e.g. the
+        manifest of the incremental mode.
+
+    Examples:
+    --------
+    >>> rows(pd.DataFrame({"a": [1, 2]}))
+    2
+    >>> rows({"row_id": np.arange(3), "offsets": np.arange(4)})
+    3
+    """
+    if isinstance(artifact, (pd.DataFrame, pd.Series, pd.Index, np.ndarray,
+                             list)):
+        return len(artifact)
+    if isinstance(artifact, dict) and "row_id" in artifact:
+        return len(artifact["row_id"])
+    return None
+
+
+class Recorder:
+    """
+    Records of the steps of one run.
+
+    ...
+
+    A thread samples the resident memory of the process from the creation
+    of the recorder until close, keeping the highest value seen since the
+    start of the current step.
+
+    Parameters:
+    ----------
+    interval: float, optional
+        The seconds between two samples of the resident memory.
+
+    Examples:
+    --------
+    >>> recorder = Recorder()
+    >>> with recorder.step('clean_bank', 'clean') as record:
+    ...     record['rows_out'] = {'bank': len(bank)}
+    >>> recorder.close()
+    >>> recorder.write('./dps_out/run_report.json')
+    """
+
+    def __init__(self, interval=INTERVAL):
+        self.process = psutil.Process()
+        self.interval = interval
+        self.steps = []
+        self.started = datetime.now()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.peak = self.run_peak = self.process.memory_info().rss
+        self.running = True
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+
+    def sample(self):
+        """Keep the highest resident memory until the recorder is closed."""
+        while self.running:
+            rss = self.process.memory_info().rss
+            self.peak = max(self.peak, rss)
+            self.run_peak = max(self.run_peak, rss)
+            time.sleep(self.interval)
+
+    @contextmanager
+    def step(self, name, kind, **fields):
+        """
+        Record one step, the caller filling the yielded record.
+
+        ...
+
+        The record holds the name and kind of the step, the given fields and
+        whatever the caller adds to it, e.g. "rows_in", "rows_out" and
+        "matches". It is kept even when the step raises.
+        """
+        record = {"step": name, "kind": kind, **fields}
+        rss = self.process.memory_info().rss
+        self.peak = rss
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            end_rss = self.process.memory_info().rss
+            record.update(
+                wall=time.perf_counter() - wall,
+                cpu=time.process_time() - cpu,
+                rss_start=rss, rss_end=end_rss,
+                peak_rss=max(self.peak, end_rss))
+            self.steps.append(record)
+
+    def close(self):
+        """Stop the memory sampler."""
+        self.running = False
+        self.sampler.join()
+
+    def report(self, **fields):
+        """
+        Gather the records of the run.
+
+        Parameters:
+        ----------
+        fields: object
+            Extra entries of the report, e.g. the settings of the run.
+
+        Returns:
+        -------
+        dict
+            The run totals and the records of the steps in order.
+        """
+        return {"started": self.started.isoformat(timespec="seconds"),
+                "wall": time.perf_counter() - self.wall,
+                "cpu": time.process_time() - self.cpu,
+                "peak_rss": self.run_peak,
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                **fields,
+                "steps": self.steps}
+
+    def write(self, path, **fields):
+        """Write the report of the run as json."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as out_file:
+            json.dump(self.report(**fields), out_file, indent=2, default=str)
+
+    def summary(self):
+        """
+        Format the records as a table, one line per step.
+
+        Returns:
+        -------
+        str
+            The table with the wall and CPU seconds, the peak memory in MB,
+            the rows in and out and the matched/unmatched counts of every
+            step, followed by the run totals.
+
+        Examples:
+        --------
+        >>> print(recorder.summary())
+        step              kind    cached   wall s    cpu s  peak MB ...
+        """
+        width = max([len(record["step"]) for record in self.steps]
+                    + [len("total")]) + 2
+        lines = [f"{'step':<{width}}{'kind':<7}{'cached':>7}{'wall s':>9}"
+                 f"{'cpu s':>9}{'peak MB':>9}{'rows in':>10}{'rows out':>10}"
+                 f"  matched/unmatched"]
+        for record in self.steps:
+            matches = record.get("matches") or {}
+            counts = ", ".join(f"{key} {value}"
+                               for key, value in matches.items())
+            lines.append(
+                f"{record['step']:<{width}}{record['kind']:<7}"
+                f"{'yes' if record.get('cached') else '':>7}"
+                f"{record['wall']:>9.2f}{record['cpu']:>9.2f}"
+                f"{record['peak_rss'] / MB:>9.0f}"
+                f"{sum_rows(record.get('rows_in')):>10}"
+                f"{sum_rows(record.get('rows_out')):>10}  {counts}")
+        report = self.report()
+        lines.append(f"{'total':<{width + 14}}{report['wall']:>9.2f}"
+                     f"{report['cpu']:>9.2f}{report['peak_rss'] / MB:>9.0f}")
+        return "\n".join(lines)
+
+
+def sum_rows(counts):
+    """Total the rows of the artifacts of a step, "" when none are known."""
+    known = [count for count in (counts or {}).values() if count is not None]
+    return sum(known) if known else ""
@@ -0,0 +1,546 @@
+"""This module contains the month-partitioned mode of the DPS.
+
+ - The input files are read a few at a time and every file is split by
+ month into pieces spilled to disk: the front-desk bookings on their
+ check-in, the PayTM records on their transaction date and the OTA
+ reservations on their check-in. Records without a date are kept apart and
+ read by every month.
+
+ - The bank deposits are only looked up by reference number, the UTR of
+ PayTM or the bank reference of InGo-MMT, and their dates are not reliable
+ enough to split them: a settlement may reach the bank weeks later. They
+ are kept as a narrow table of reference numbers and transaction ids, from
+ which every month indexes the deposits its records refer to.
+
+ - The bookings of every check-in month form a partition. A partition reads
+ its bookings and the records of the other sources dated within an overlap
+ window around the month, for the advances paid before the stay, the stays
+ ending in the next month and the settlements reaching the bank later.
+ The stages of dps_pipeline match it as a whole run would.
+
+ - The matching of a booking only depends on the records it is compared
+ with, so the outputs of the bookings are the outputs of a whole run as
+ long as its records lie within the window. The partitions are matched one
+ after the other, or on a pool of processes, and their outputs appended to
+ the same csv files month by month. The rows hold the values of a whole run,
+ in the order of the months.
+
+ - The bank tables need every month: a deposit may settle bookings of two
+ months and the unmatched deposits are those no month matched. They are
+ built at the end from the bank transaction ids and the matches kept from
+ every month, the narrow columns only.
+
+ - The peak memory is then the one of the busiest month with its window,
+ plus the reference numbers of the bank and the matches of the bank tables.
+"""
+##  third party module
+import pandas as pd
+
+## inbuilt module
+import glob
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+## user-defined modules
+import dps_utils as utils
+import dps_engine as engine
+import dps_pipeline as pipeline
+import dps_instrument as instrument
+
+# Column dating the records of every source split by month
+Dates = {
+    'front_desk': 'Date',
+    'ptm_settle': 'Transaction_Date',
+    'ptm_trans': 'Transaction_Date',
+    'booking.com': 'Check-in',
+    'ingo_mmt_data': 'Checkin Date',
+}
+
+# Source kept as a table of reference numbers
+BANK = 'bank_statement'
+
+# Days of records read on both sides of the month of a partition
+OVERLAP = 15
+
+# Folder of the pieces without a date and file of the columns of a source,
+# below the folder of the source, and folder of the reference table of the
+# bank
+UNDATED = "undated"
+COLUMNS = "columns.pkl"
+REFS = "refs"
+
+# Outputs built month by month, the bank tables being built at the end
+MONTH_OUTPUTS = ['fo_comp', 'fo_resi', 'fo_cash', 'df_join', 'fr_office']
+BANK_OUTPUTS = ['fin_data', 'bank_residue', 'bank_table']
+
+# Columns of the matches ("data") kept from every month for the bank tables
+MATCH_COLUMNS = ["Row_Id", "Tran_Id", "Bank_Transaction_ID", "Booking_Id",
+                 "Mode_of_Booking"]
+
+# Declarations of the stages of a partition: the stages of dps_pipeline,
+# the loading of the sources, the cleaning and the index of the bank
+# replaced below, the bank tables built once every month is matched
+Stages = {name: spec for name, spec in pipeline.Stages.items()
+          if name != "bank_match"}
+
+
+## Functions splitting the sources by month
+
+def record_dates(source, frame):
+    """
+    Date the records of a source.
+
+    ...
+
+    The check-in of a booking is the first date of its "Date" column, the
+    PayTM dates lose their quotes and their time. Invalid dates, and the
+    records of a file without the date column, become pd.NaT.
+
+    Parameters:
+    ----------
+    source: str
+        The name of the source, as in dps_utils.Readers.
+
+    frame: pd.DataFrame
+        The records read from a file of the source.
+
+    Returns:
+    -------
+    pd.Series
+        The midnight datetime64 date of every record.
+
+    Examples:
+    --------
+    >>> record_dates('front_desk', front_desk)
+    0   2023-01-01
+    dtype: datetime64[ns]
+    """
+    if Dates[source] not in frame.columns:
+        return pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+    values = frame[Dates[source]]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    values = values.astype(str)
+    if source == 'front_desk':
+        values = values.str.split("→").str[0]
+    return utils.parse_dates(values.str.replace("'", "", regex=False)
+                             .str.strip(), errors="coerce")
+
+
+def month_keys(dates):
+    """The month of every date as "YYYY-MM", UNDATED when missing."""
+    return dates.dt.strftime("%Y-%m").fillna(UNDATED)
+
+
+def split(folder_paths, FILE_NO, spill_dir, workers=None, cache=None):
+    """
+    Split the files of every source by month into pieces on disk.
+
+    ...
+
+    The files of a source are read "workers" at a time, so only those
+    files are in memory. Every record keeps its position among the records
+    of its source as its index, the row id of the bookings in particular.
+    An empty frame keeps the columns of all the files of the source, for
+    the months it has no record in. The bank files only keep their
+    reference numbers and transaction ids, in the folder REFS.
+
+    Parameters:
+    ----------
+    folder_paths: dict
+        The containing directory of every source, keyed by the names used in
+        dps_utils.Readers.
+
+    FILE_NO: int or None
+        The number of files to be processed per source, None for all.
+
+    spill_dir: str
+        The folder receiving the pieces, <source>/<month>/<file>.pkl and
+        refs/<file>.pkl.
+
+    workers: int, optional
+        The number of workers reading files, None for the number of CPUs.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    Returns:
+    -------
+    dict
+        The number of records of every source.
+
+    Examples:
+    --------
+    >>> split(params['folder_paths'], None, './spill')
+    {'front_desk': 80, 'ptm_settle': 89, ...}
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {}
+    for source, folder_path in folder_paths.items():
+        paths = utils.file_list(folder_path, FILE_NO)
+        for path in paths:
+            print(path)
+
+        folder = os.path.join(spill_dir, source)
+        os.makedirs(folder, exist_ok=True)
+        os.makedirs(os.path.join(spill_dir, REFS), exist_ok=True)
+        offset, columns = 0, []
+        for first in range(0, len(paths), workers):
+            frames = utils.read_files(
+                [(path, utils.Readers[source])
+                 for path in paths[first:first + workers]], workers, cache)
+            for number, frame in enumerate(frames, first):
+                columns.append(frame.iloc[:0])
+                frame.index = pd.RangeIndex(offset, offset + len(frame))
+                offset += len(frame)
+                if source == BANK:
+                    pd.DataFrame({
+                        "ref_no": utils.bank_refs(
+                            frame["Transaction Remarks"]),
+                        "Tran. Id": frame["Tran. Id"],
+                    }).to_pickle(os.path.join(spill_dir, REFS,
+                                              f"{number:05d}.pkl"))
+                    continue
+                keys = month_keys(record_dates(source, frame))
+                for month, piece in frame.groupby(keys, sort=False):
+                    os.makedirs(os.path.join(folder, month), exist_ok=True)
+                    piece.to_pickle(os.path.join(folder, month,
+                                                 f"{number:05d}.pkl"))
+        if columns:
+            utils.concat_frames(columns).to_pickle(os.path.join(folder,
+                                                                COLUMNS))
+        counts[source] = offset
+    return counts
+
+
+def months(spill_dir):
+    """The check-in months of the bookings, in order."""
+    return sorted(month for month in os.listdir(
+        os.path.join(spill_dir, 'front_desk'))
+        if month not in (UNDATED, COLUMNS))
+
+
+def window(month, overlap=OVERLAP):
+    """
+    The first and last dates read for a month.
+
+    Examples:
+    --------
+    >>> window('2023-02', 15)
+    (Timestamp('2023-01-17 00:00:00'), Timestamp('2023-03-15 00:00:00'))
+    """
+    period = pd.Period(month, "M")
+    return (period.start_time - pd.Timedelta(days=overlap),
+            period.end_time.normalize() + pd.Timedelta(days=overlap))
+
+
+def read_pieces(spill_dir, source, months, start=None, end=None):
+    """
+    Read the pieces of a source for some months, back in the file order.
+
+    Parameters:
+    ----------
+    spill_dir: str
+        The folder of the pieces written by split.
+
+    source: str
+        The name of the source.
+
+    months: list
+        The months read, UNDATED for the records without a date.
+
+    start, end: pd.Timestamp, optional
+        The first and last dates kept, None to keep the whole months.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The records, indexed by their position in the source.
+    """
+    folder = os.path.join(spill_dir, source)
+    pieces = []
+    if os.path.exists(os.path.join(folder, COLUMNS)):
+        pieces.append(pd.read_pickle(os.path.join(folder, COLUMNS)))
+    for month in months:
+        for path in sorted(glob.glob(os.path.join(folder, month, "*.pkl"))):
+            piece = pd.read_pickle(path)
+            if start is not None and month != UNDATED:
+                dates = record_dates(source, piece)
+                piece = piece[(dates >= start) & (dates <= end)]
+            pieces.append(piece)
+    if not pieces:
+        return pd.DataFrame()
+    return pd.concat(pieces, axis=0).sort_index(kind="stable")
+
+
+def read_month(spill_dir, month, overlap=OVERLAP, undated=False):
+    """
+    Read the sources of the partition of a month.
+
+    Parameters:
+    ----------
+    spill_dir: str
+        The folder of the pieces written by split.
+
+    month: str
+        The check-in month of the bookings, "YYYY-MM".
+
+    overlap: int, optional
+        The days of records read on both sides of the month.
+
+    undated: bool, optional
+        Whether the bookings without a check-in join the partition.
+
+    Returns:
+    -------
+    dict
+        The dataframe of every source, keyed as dps_utils.load_sources
+        returns them, the bank without rows. The bookings keep their row ids
+        as index.
+    """
+    start, end = window(month, overlap)
+    spanned = [str(period) for period in pd.period_range(start, end,
+                                                         freq="M")]
+    sources = {'front_desk': read_pieces(
+        spill_dir, 'front_desk', [month] + ([UNDATED] if undated else []))}
+    for source in Dates:
+        if source != 'front_desk':
+            sources[source] = read_pieces(spill_dir, source,
+                                          spanned + [UNDATED], start, end) \
+                .reset_index(drop=True)
+    sources[BANK] = read_pieces(spill_dir, BANK, [])
+    return sources
+
+
+def read_refs(spill_dir):
+    """The reference numbers and ids of the bank transactions, in order."""
+    paths = sorted(glob.glob(os.path.join(spill_dir, REFS, "*.pkl")))
+    if not paths:
+        return pd.DataFrame(columns=["ref_no", "Tran. Id"])
+    return pd.concat([pd.read_pickle(path) for path in paths], axis=0,
+                     ignore_index=True)
+
+
+## Stages of a partition
+
+@pipeline.stage(outputs=list(pipeline.SOURCES) + ["prior", "manifest"],
+                params=["spill_dir", "month", "overlap", "undated", "unit"],
+                kind="load", registry=Stages)
+def load(spill_dir, month, overlap, undated, unit):
+    """
+    Read the sources of a month from the pieces, the amounts in paise when
+    unit is PAISE. A partition has no incremental state.
+    """
+    sources = read_month(spill_dir, month, overlap, undated)
+    if unit != 1:
+        sources = utils.paise_frames(sources)
+
+    artifacts = {name: sources[source]
+                 for name, source in pipeline.SOURCES.items()}
+    artifacts.update(prior={}, manifest=None)
+    return artifacts
+
+
+@pipeline.stage(inputs=["bank_statement"], outputs=["bank"], kind="clean",
+                registry=Stages)
+def clean_bank(bank_statement):
+    """The bank of a month has no rows, see bank_index."""
+    return {"bank": bank_statement}
+
+
+@pipeline.stage(inputs=["ptm_data_consi", "mmt_dataset"],
+                outputs=["ref_idx"], params=["spill_dir"], kind="clean",
+                registry=Stages)
+def bank_index(ptm_data_consi, mmt_dataset, spill_dir):
+    """
+    Index the bank transactions by reference number, those the PayTM and
+    InGo-MMT records of the month refer to.
+    """
+    refs = read_refs(spill_dir)
+    refs = refs[refs["ref_no"].isin(ptm_data_consi["UTR_No."])
+                | refs["ref_no"].isin(mmt_dataset["Bank Ref No"])]
+    return {"ref_idx": engine.ref_index(refs)}
+
+
+## Runner
+
+def run_month(params, resources, month, recorder=None, profiler=None):
+    """
+    Match the partition of a month.
+
+    Parameters:
+    ----------
+    params: dict
+        The settings of the run with "spill_dir", "overlap" and the first
+        month as "first".
+
+    resources: dict
+        The shared objects passed to the stages.
+
+    month: str
+        The check-in month of the partition.
+
+    recorder: dps_instrument.Recorder, optional
+        Records the stages of the month, a recorder of its own when None.
+
+    profiler: dps_profile.StageProfiler, optional
+        Profiles every stage of the month.
+
+    Returns:
+    -------
+    tuple
+        The outputs of the month with its matches as "data", and the
+        records of its stages marked with the month.
+    """
+    own = recorder is None
+    recorder = instrument.Recorder() if own else recorder
+    done = len(recorder.steps)
+    try:
+        artifacts = pipeline.run(
+            dict(params, month=month, undated=month == params["first"]),
+            resources, targets=MONTH_OUTPUTS + ["data"], stages=Stages,
+            recorder=recorder, profiler=profiler)
+    finally:
+        if own:
+            recorder.close()
+    steps = recorder.steps[done:]
+    for record in steps:
+        record["partition"] = month
+
+    outputs = {name: artifacts[name] for name in MONTH_OUTPUTS}
+    outputs["data"] = artifacts["data"][MATCH_COLUMNS]
+    return outputs, steps
+
+
+def align(frame, columns):
+    """The columns of a frame in the order of the first month written."""
+    if columns is None or list(frame.columns) == columns:
+        return frame
+    return frame.reindex(columns=columns)
+
+
+def run_months(params, resources=None, out_dir="./dps_out",
+               overlap=OVERLAP, workers=1, recorder=None, profiler=None,
+               spill_dir=None):
+    """
+    Run the DPS month by month and write its outputs.
+
+    ...
+
+    With one worker the months are matched one after the other in this
+    process. With more, they are matched on a pool of processes, forked
+    where the platform allows it, and written in month order as they come;
+    the stages of every month are then recorded in its worker and added to
+    the records of the run.
+
+    Parameters:
+    ----------
+    params: dict
+        The settings of the run, as dps_1_0 builds them, without the
+        incremental mode.
+
+    resources: dict, optional
+        The shared objects of the stages.
+
+    out_dir: str, optional
+        The folder receiving the AFS and VRS outputs.
+
+    overlap: int, optional
+        The days of records read on both sides of a month.
+
+    workers: int, optional
+        The months matched at once.
+
+    recorder: dps_instrument.Recorder, optional
+        Records the split, the stages of every month, the bank tables and
+        the files written.
+
+    profiler: dps_profile.StageProfiler, optional
+        Profiles the stages of the months matched in this process.
+
+    spill_dir: str, optional
+        The folder receiving the pieces, a temporary folder removed at the
+        end when None.
+
+    Returns:
+    -------
+    list
+        The months matched.
+
+    Examples:
+    --------
+    >>> run_months(params, resources, './dps_out', overlap=10, workers=4)
+    ['2023-01', '2023-02', '2023-03']
+    """
+    resources = resources or {}
+    temporary = spill_dir is None
+    spill_dir = tempfile.mkdtemp(prefix="dps_months_") if temporary \
+        else spill_dir
+    try:
+        with pipeline.record_step(recorder, "split", "load") as record:
+            record["rows_out"] = split(
+                params["folder_paths"], params["FILE_NO"], spill_dir,
+                resources.get('workers'), resources.get('cache'))
+        partitions = months(spill_dir)
+
+        # Only the resources of the stages of a month go to the workers
+        shared = {key: resources.get(key) for spec in Stages.values()
+                  for key in spec["resources"]}
+        params = dict(params, spill_dir=spill_dir, overlap=overlap,
+                      first=partitions[0] if partitions else None)
+
+        if workers > 1 and len(partitions) > 1:
+            context = mp.get_context("fork") \
+                if "fork" in mp.get_all_start_methods() else None
+            pool = ProcessPoolExecutor(workers, mp_context=context)
+            results = pool.map(run_month, [params] * len(partitions),
+                               [shared] * len(partitions), partitions)
+        else:
+            pool = None
+            results = (run_month(params, shared, month, recorder,
+                                 profiler) for month in partitions)
+
+        matches, columns = [], {}
+        try:
+            for month, (outputs, steps) in zip(partitions, results):
+                if pool is not None and recorder is not None:
+                    recorder.steps.extend(steps)
+                for name in MONTH_OUTPUTS:
+                    outputs[name] = align(outputs[name], columns.get(name))
+                    columns.setdefault(name, list(outputs[name].columns))
+                pipeline.write(outputs, out_dir, params["unit"],
+                               {name: pipeline.Outputs[name]
+                                for name in MONTH_OUTPUTS},
+                               recorder, profiler,
+                               append=month != partitions[0])
+                matches.append(outputs["data"])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # The bank tables from the matches of every month, in the order of
+        # the bookings as a whole run sorts them
+        with pipeline.record_step(recorder, "bank_match", "match") as record:
+            data = pd.concat(matches, axis=0) if matches \
+                else pd.DataFrame(columns=MATCH_COLUMNS)
+            data = data.sort_values(by=["Row_Id"], kind="stable") \
+                .reset_index(drop=True)
+            bnk_state = read_refs(spill_dir)[["Tran. Id"]]
+            tables = pipeline.bank_match(data, bnk_state)
+            record["matches"] = {"matched": len(tables["fin_data"]),
+                                 "unmatched": len(tables["bank_residue"])}
+            record["rows_in"] = {"data": len(data),
+                                 "bnk_state": len(bnk_state)}
+            record["rows_out"] = {name: len(frame)
+                                  for name, frame in tables.items()}
+        pipeline.write(tables, out_dir, params["unit"],
+                       {name: pipeline.Outputs[name]
+                        for name in BANK_OUTPUTS}, recorder, profiler)
+    finally:
+        if temporary:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+    return partitions
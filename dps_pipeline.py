@@ -0,0 +1,897 @@
+"""This module contains the stages of the DPS and the runner memoizing them.
+
+ - Every stage is a function declared with the artifacts it reads
+ ("inputs"), the artifacts it returns ("outputs"), the settings its result
+ depends on ("params") and the shared objects that only make it faster
+ ("resources"), e.g. the cache of guest name trigrams.
+
+ - The fingerprint of a stage hashes its code, the code of the modules the
+ stages call, its params and the fingerprints of its inputs, the load stage
+ adding the content of the source files. The outputs of a stage are stored
+ on disk under its fingerprint, so a rerun recomputes only the stages whose
+ inputs, settings or code changed: changing the InGo-MMT tolerance in const
+ reruns the InGo-MMT match and the stages reading its result, the loading
+ and the cleaning come from the store.
+
+ - The runner walks the stages back from the requested artifacts, so the
+ outputs of stages no longer needed are not even read from the store.
+"""
+##  third party module
+import pandas as pd
+import numpy as np
+
+## inbuilt module
+import glob
+import hashlib
+import inspect
+import os
+
+from contextlib import nullcontext
+
+## user-defined modules
+import dps_utils as utils
+import dps_engine as engine
+import dps_cache
+import dps_ingest as ingest
+import dps_instrument as instrument
+import dps_profile as profile
+
+# Modules whose code is part of the fingerprint of every stage
+CODE_MODULES = [utils, engine, ingest]
+
+# Names of the source artifacts and the keys of their readers
+SOURCES = {
+    'front_desk': 'front_desk',
+    'ptm_settle': 'ptm_settle',
+    'ptm_trans': 'ptm_trans',
+    'booking_com': 'booking.com',
+    'ingo_mmt_data': 'ingo_mmt_data',
+    'bank_statement': 'bank_statement',
+}
+
+# Csv file written for every output artifact, relative to the output folder
+Outputs = {
+    'fin_data': 'AFS/bank_deposits_matched.csv',
+    'bank_residue': 'AFS/bank_deposits_residue.csv',
+    'fo_comp': 'AFS/front_office_match.csv',
+    'fo_resi': 'AFS/front_office_residue.csv',
+    'fo_cash': 'AFS/front_office_cash.csv',
+    'df_join': 'VRS/front_office_full.csv',
+    'fr_office': 'VRS/front_office.csv',
+    'bank_table': 'AFS/bs_fd.csv',
+}
+
+# This dictonary holds the declaration of every stage in execution order,
+# filled by the stage decorator
+Stages = {}
+
+
+def stage(inputs=(), outputs=(), params=(), resources=(), watch=None,
+          kind="build", counts=None, registry=None):
+    """
+    Declare a function as a stage of the pipeline.
+
+    ...
+
+    The function is called with its inputs, params and resources as keyword
+    arguments and returns a dictionary holding its outputs.
+
+    Parameters:
+    ----------
+    inputs: list, optional
+        The artifacts read by the stage.
+
+    outputs: list, optional
+        The artifacts returned by the stage.
+
+    params: list, optional
+        The settings the outputs depend on.
+
+    resources: list, optional
+        The shared objects passed to the stage, left out of its fingerprint.
+
+    watch: function, optional
+        A function of the params returning a token of the external data the
+        stage reads, e.g. the content of the source files.
+
+    kind: str, optional
+        The kind of step recorded by the instrumentation: "load", "clean",
+        "match" or "build".
+
+    counts: function, optional
+        A function of the inputs and outputs of a matching stage returning
+        its matched and unmatched counts.
+
+    registry: dict, optional
+        The declarations receiving the stage, Stages by default.
+
+    Returns:
+    -------
+    function
+        The decorator registering the stage in the registry.
+
+    Examples:
+    --------
+    >>> @stage(inputs=["fd_frame"], outputs=["df_join"])
+    ... def ledger(fd_frame):
+    ...     return {"df_join": engine.paid_ledger(fd_frame)}
+    """
+    def register(func):
+        stages = Stages if registry is None else registry
+        stages[func.__name__] = {"func": func, "inputs": list(inputs),
+                                 "outputs": list(outputs),
+                                 "params": list(params),
+                                 "resources": list(resources),
+                                 "watch": watch, "kind": kind,
+                                 "counts": counts}
+        return func
+    return register
+
+
+## Fingerprints of the stages
+
+def code_token():
+    """Hash the code of the modules called by the stages."""
+    return ":".join(dps_cache.file_digest(module.__file__)
+                    for module in CODE_MODULES)
+
+
+def files_token(params):
+    """
+    Hash the content of the source files read by the load stage.
+
+    ...
+
+    The files are listed as the loader lists them, without asking about
+    missing files, and the incremental state is part of the token since
+    the load stage reads it.
+    """
+    digests = {}
+    for name, folder_path in sorted(params["folder_paths"].items()):
+        paths = sorted(glob.glob(os.path.join(folder_path, "*")))
+        if params["FILE_NO"] is not None:
+            paths = paths[:params["FILE_NO"]]
+        digests[name] = [(path, dps_cache.file_digest(path))
+                         for path in paths if os.path.isfile(path)]
+    if params["incremental"]:
+        digests["state"] = [
+            (path, dps_cache.file_digest(path))
+            for path in sorted(glob.glob(os.path.join(params["state_dir"],
+                                                      "*")))]
+    return dps_cache.options_token(digests)
+
+
+def fingerprint(name, spec, params, prints, code):
+    """
+    Hash everything the outputs of a stage depend on.
+
+    Parameters:
+    ----------
+    name: str
+        The name of the stage.
+
+    spec: dict
+        The declaration of the stage.
+
+    params: dict
+        The settings of the run.
+
+    prints: dict
+        The fingerprints of the artifacts produced by the previous stages.
+
+    code: str
+        The token of the code of the modules called by the stages.
+
+    Returns:
+    -------
+    str
+        The sha256 hex digest identifying the outputs.
+
+    Examples:
+    --------
+    >>> fingerprint('ledger', Stages['ledger'], params, prints, code_token())
+    '3c5d...'
+    """
+    token = {"stage": name, "code": code,
+             "source": inspect.getsource(spec["func"]),
+             "params": {key: params[key] for key in spec["params"]},
+             "inputs": {key: prints[key] for key in spec["inputs"]},
+             "versions": [pd.__version__, np.__version__]}
+    if spec["watch"] is not None:
+        token["watch"] = spec["watch"](params)
+    token = dps_cache.options_token(token)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+## Runner
+
+def record_step(recorder, name, kind, **fields):
+    """Record a step when a recorder is given, else yield a throwaway."""
+    if recorder is None:
+        return nullcontext({})
+    return recorder.step(name, kind, **fields)
+
+
+def run(params, resources=None, store=None, targets=None, stages=None,
+        log=None, recorder=None, profiler=None):
+    """
+    Run the stages producing the requested artifacts.
+
+    ...
+
+    The fingerprints are computed forwards, then the stages are walked back
+    from the targets: a stage found in the store is loaded from it, the
+    others run and make their inputs needed. Stages whose outputs are not
+    needed are skipped altogether.
+
+    Parameters:
+    ----------
+    params: dict
+        The settings of the run, see the params of the stages.
+
+    resources: dict, optional
+        The shared objects passed to the stages.
+
+    store: dps_cache.FrameCache, optional
+        The folder keeping the outputs of the stages, None to run every
+        needed stage.
+
+    targets: list, optional
+        The artifacts requested, None for the outputs of every stage.
+
+    stages: dict, optional
+        The declaration of the stages in execution order, Stages by default.
+
+    log: list, optional
+        Receives one {"stage", "fingerprint", "cached"} entry per stage
+        run or loaded, in execution order.
+
+    recorder: dps_instrument.Recorder, optional
+        Records the time, memory and rows of every stage run or loaded, and
+        the counts of the matching stages that ran.
+
+    profiler: dps_profile.StageProfiler, optional
+        Profiles every stage that runs, stages loaded from the store are
+        not profiled.
+
+    Returns:
+    -------
+    dict
+        The artifacts produced or loaded, keyed by name.
+
+    Examples:
+    --------
+    >>> artifacts = run(params, resources, store, targets=list(Outputs))
+    >>> artifacts['fo_comp']
+    DataFrame
+    """
+    stages = Stages if stages is None else stages
+    resources = resources or {}
+    code = code_token()
+
+    prints, plan = {}, []
+    for name, spec in stages.items():
+        digest = fingerprint(name, spec, params, prints, code)
+        prints.update({output: f"{digest}:{output}"
+                       for output in spec["outputs"]})
+        plan.append((name, spec, digest))
+
+    needed = set(targets) if targets is not None \
+        else set(prints)
+    loaded, actions = {}, {}
+    for name, spec, digest in reversed(plan):
+        if not needed.intersection(spec["outputs"]):
+            continue
+        outputs = store.get(digest) if store is not None else None
+        if outputs is not None:
+            loaded[name] = outputs
+            actions[name] = True
+        else:
+            actions[name] = False
+            needed.update(spec["inputs"])
+
+    artifacts = {}
+    for name, spec, digest in plan:
+        if name not in actions:
+            continue
+        with record_step(recorder, name, spec["kind"],
+                         cached=actions[name]) as record:
+            inputs = {key: artifacts[key] for key in spec["inputs"]
+                      if key in artifacts}
+            if actions[name]:
+                outputs = loaded.pop(name)
+            else:
+                with profile.profile_step(profiler, name):
+                    outputs = spec["func"](
+                        **inputs,
+                        **{key: params[key] for key in spec["params"]},
+                        **{key: resources.get(key)
+                           for key in spec["resources"]})
+                if store is not None:
+                    store.put(digest, outputs)
+                if spec["counts"] is not None and recorder is not None:
+                    record["matches"] = spec["counts"](inputs, outputs)
+            record["rows_in"] = {key: instrument.rows(value)
+                                 for key, value in inputs.items()}
+            record["rows_out"] = {key: instrument.rows(value)
+                                  for key, value in outputs.items()}
+        artifacts.update(outputs)
+        if log is not None:
+            log.append({"stage": name, "fingerprint": digest,
+                        "cached": actions[name]})
+
+    if store is not None:
+        store.evict()
+    return artifacts
+
+
+def write(artifacts, out_dir="./dps_out", unit=1, outputs=Outputs,
+          recorder=None, profiler=None, append=False):
+    """
+    Write the output artifacts as csv files, the amounts in rupees.
+
+    Parameters:
+    ----------
+    artifacts: dict
+        The artifacts returned by run.
+
+    out_dir: str, optional
+        The folder receiving the AFS and VRS outputs.
+
+    unit: int, optional
+        The amount of one rupee in the artifacts, utils.PAISE for paise.
+
+    outputs: dict, optional
+        The csv file of every output artifact.
+
+    recorder: dps_instrument.Recorder, optional
+        Records the time, memory and rows of every file written.
+
+    profiler: dps_profile.StageProfiler, optional
+        Profiles the writing of every file as "write_<artifact>".
+
+    append: bool, optional
+        Append the rows to the files written before, without their header,
+        e.g. for the months of dps_partition.
+
+    Examples:
+    --------
+    >>> write(artifacts, './dps_out')
+    """
+    for name, path in outputs.items():
+        with record_step(recorder, path, "write") as record, \
+                profile.profile_step(profiler, f"write_{name}"):
+            frame = artifacts[name]
+            if unit != 1:
+                frame = utils.rupee_frame(frame)
+            path = os.path.join(out_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            exists = append and os.path.exists(path)
+            frame.to_csv(path, index=False, mode="a" if exists else "w",
+                         header=not exists)
+            record["rows_in"] = {name: len(frame)}
+
+
+## Loading and cleaning stages
+
+@stage(outputs=list(SOURCES) + ["prior", "manifest"],
+       params=["folder_paths", "FILE_NO", "unit", "incremental",
+               "state_dir"],
+       resources=["workers", "cache", "const"], watch=files_token,
+       kind="load")
+def load(folder_paths, FILE_NO, unit, incremental, state_dir, workers=None,
+         cache=None, const=None):
+    """
+    Fetch the data of every source, the amounts in paise when unit is PAISE.
+
+    ...
+
+    In the incremental mode the frames and the matches of the previous run
+    come from the state, which only holds rupees, so the constants and the
+    money unit are part of its settings.
+    """
+    prior, manifest = {}, None
+    if incremental:
+        sources, prior, manifest = ingest.load(
+            folder_paths, FILE_NO, state_dir,
+            dict(const or {}, MONEY_UNIT=unit), workers=workers,
+            cache=cache)
+        prior = prior or {}
+    else:
+        sources = utils.load_sources(folder_paths, FILE_NO,
+                                     workers=workers, cache=cache)
+
+    # Money columns as whole paise
+    if unit != 1:
+        sources = utils.paise_frames(sources)
+
+    artifacts = {name: sources[source] for name, source in SOURCES.items()}
+    artifacts.update(prior=prior, manifest=manifest)
+    return artifacts
+
+
+@stage(inputs=["front_desk"], outputs=["fd_clean", "upi"], params=["unit"],
+       kind="clean")
+def clean_front_desk(front_desk, unit):
+    """Split the stay dates and extract the UPI payments of the bookings."""
+    fd_frame = front_desk.copy()
+
+    # Split the column "Date" into two columns "check-in" and "check-out"
+    fd_frame[["check-in", "check-out"]] \
+        = fd_frame["Date"].str.split("→", expand=True).fillna(0)
+
+    # Cnvert the column "check-in" and "check-out" into datetime64 format,
+    # the missing dates filled with 0 falling on the epoch
+    fd_frame["check-in"] = utils.parse_dates(fd_frame["check-in"])
+    fd_frame["check-out"] = utils.parse_dates(fd_frame["check-out"])
+
+    # Find the difference between "check-in" and "check-out"
+    diff_date = fd_frame["check-out"] - fd_frame["check-in"]
+
+    # Fetch the number of days from the difference of "check-in" and
+    # "check-out"
+    fd_frame["Nights"] = diff_date.dt.days.astype("int32")
+
+    # Capitalize all text in the DataFrame
+    text_cols = fd_frame.columns[fd_frame.dtypes == object]
+    fd_frame[text_cols] = fd_frame[text_cols].applymap(
+        lambda x: x.upper() if isinstance(x, str) else x)
+
+    # From UPI Details column, extract the UPI transaction dates and amounts
+    # of every booking into flat arrays delimited by offsets
+    upi = utils.upi_payments(fd_frame["UPI Details"], unit)
+
+    # Drop the column "Date" from the front-desk dataset
+    fd_frame = fd_frame.drop(columns="Date")
+
+    return {"fd_clean": fd_frame, "upi": upi}
+
+
+@stage(inputs=["ptm_settle", "ptm_trans"], outputs=["paytm"], kind="clean")
+def clean_paytm(ptm_settle, ptm_trans):
+    """Merge the PayTM settlements and transactions found in both."""
+    # Drop columns with all null values
+    ptm_trans_dp = ptm_trans.dropna(axis=1)
+
+    # Remove " ' " from the column "ptm_trans" dataframe
+    ptm_trans_dp = ptm_trans_dp.replace("'", "", regex=True)
+
+    # Drop columns with all null columns from paytm settlement dataset, the
+    # loader only reads the columns shared with the transactions
+    ptm_settle = ptm_settle.dropna(axis=1)
+
+    # Remove " ' " from the column "ptm_settle" dataframe
+    ptm_settle = ptm_settle.replace("'", "", regex=True)
+
+    # Merging paytm Transaction and settlement data
+    ptm_dataset = pd.merge(ptm_settle, ptm_trans_dp, on="UTR_No.",
+                           how="outer",
+                           suffixes=("_settlement", "_transaction"))
+
+    # Convert the column "Transaction_Date_transaction" into a datetime64
+    # date
+    ptm_dataset["ptm_trans_date"] = pd.to_datetime(
+        ptm_dataset["Transaction_Date_transaction"]).dt.normalize()
+
+    # Inconsistent paytm dataset not matched with paytm settlement dataset
+    incon_settle_data = ptm_dataset[
+        ptm_dataset["UTR_No."].isin(ptm_settle["UTR_No."])]
+
+    # Paytm dataset clean of unmatched or inconsistent data points
+    ptm_data_consi = incon_settle_data[incon_settle_data["UTR_No."]
+                                       .isin(ptm_trans_dp["UTR_No."])] \
+        .reset_index(drop=True)
+
+    return {"paytm": ptm_data_consi}
+
+
+@stage(inputs=["bank_statement"], outputs=["bank"], kind="clean")
+def clean_bank(bank_statement):
+    """Parse the bank dates and extract the reference numbers."""
+    # Drop columns with all null values
+    bnk_state = bank_statement.dropna(axis=1, how="all")
+
+    # Reset the index of the bnk_state dataframe
+    bnk_state = bnk_state.reset_index().drop(columns="index")
+
+    # Convert the column "Value Date" into datetime format and rename it to
+    # "trans_posval_date"
+    bnk_state["trans_posval_date"] = pd.to_datetime(bnk_state["Value Date"])
+
+    # Drop the column "Value Date"
+    bnk_state = bnk_state.drop(columns=["Value Date"], axis=0)
+
+    # Convert datetime only to time format
+    bnk_state["trans_post_time"] = pd.to_datetime(bnk_state[
+        "Transaction Posted Date"], format="%d-%m-%Y %I:%M:%S %p",).dt.time
+
+    # Drop the column "Transaction Posted Date"
+    bnk_state = bnk_state.drop(columns=["Transaction Posted Date"])
+
+    # Extract reference number from the column "Transaction Remarks"
+    bnk_state["ref_no"] = utils.bank_refs(bnk_state["Transaction Remarks"])
+
+    return {"bank": bnk_state}
+
+@stage(inputs=["booking_com"], outputs=["bcom"], params=["BCOM_GST", "unit"],
+       kind="clean")
+def clean_bcom(booking_com, BCOM_GST, unit):
+    """Keep the confirmed Booking.com reservations and add their GST."""
+    # Group only records with status as "ok"
+    bc_df = booking_com[booking_com["Status"] == "ok"] \
+        .reset_index(drop="index")
+
+    # Calculate the price with GST
+    bc_df["price_gst"] = utils.round_money(bc_df["Price"] * BCOM_GST, unit)
+
+    return {"bcom": bc_df}
+
+
+@stage(inputs=["fd_clean", "bcom", "ingo_mmt_data", "paytm", "bank"],
+       outputs=["fd_frame", "bc_df", "mmt_dataset", "ptm_data_consi",
+                "bnk_state"],
+       resources=["memory_report"], kind="clean")
+def compact(fd_clean, bcom, ingo_mmt_data, paytm, bank, memory_report=False):
+    """
+    Hold low-cardinality text as categoricals sharing one dictionary and
+    counts in narrow dtypes for the matching stages.
+    """
+    compacted = utils.compact_frames({'front_desk': fd_clean,
+                                      'booking.com': bcom,
+                                      'ingo_mmt_data': ingo_mmt_data,
+                                      'paytm': paytm,
+                                      'bank_statement': bank},
+                                     report=memory_report)
+    return {"fd_frame": compacted['front_desk'],
+            "bc_df": compacted['booking.com'],
+            "mmt_dataset": compacted['ingo_mmt_data'],
+            "ptm_data_consi": compacted['paytm'],
+            "bnk_state": compacted['bank_statement']}
+
+
+## Matching stages: the counts of a matcher are recorded by the
+## instrumentation when it runs
+
+def upi_counts(upi, fd_frame, fr_upi, upi_settled):
+    """Bookings paying through UPI matched, not matched and settled before."""
+    paying = engine.upi_long(upi, fd_frame.index)["Row_Id"].unique()
+    matched = fr_upi["Row_Id"].nunique()
+    settled = len(upi_settled)
+    return {"matched": matched, "unmatched": len(paying) - matched - settled,
+            "settled": settled}
+
+
+def bcom_counts(fr_bcom):
+    """UPI matches booked through Booking.com with and without reservation."""
+    booked = fr_bcom["book_mode"] == "BOOKING.COM"
+    found = fr_bcom["Booking_Id"].notna()
+    return {"matched": int((booked & found).sum()),
+            "unmatched": int((booked & ~found).sum())}
+
+
+def settled_counts(matches, column):
+    """Matches found and not found in the bank statement."""
+    found = int(matches[column].notna().sum())
+    return {"matched": found, "unmatched": len(matches) - found}
+
+
+def mmt_counts(mmt_dataset, fr_mmt_comb):
+    """Confirmed InGo-MMT bookings matched, not matched and in the bank."""
+    confirmed = int((mmt_dataset["Booking Status"] == "Confirmed").sum())
+    matched = fr_mmt_comb["booking_Id"].nunique()
+    return {"matched": matched, "unmatched": max(confirmed - matched, 0),
+            "in_bank": int(fr_mmt_comb["trans_id"].notna().sum())}
+
+
+@stage(inputs=["bnk_state"], outputs=["ref_idx"], kind="clean")
+def bank_index(bnk_state):
+    """
+    Index the bank statement by reference number once for the UTR and the
+    InGo-MMT bank reference lookups.
+    """
+    return {"ref_idx": engine.ref_index(bnk_state)}
+
+
+@stage(inputs=["fd_frame", "ptm_data_consi", "upi", "prior"],
+       outputs=["fr_upi", "upi_settled"], kind="match",
+       counts=lambda inputs, outputs: upi_counts(
+           inputs["upi"], inputs["fd_frame"], **outputs))
+def upi_match(fd_frame, ptm_data_consi, upi, prior):
+    """
+    Match the UPI payments of the bookings not yet settled with the PayTM
+    transactions on (date, amount).
+    """
+    # Bookings settled in the bank by the previous run keep their matches,
+    # the others are matched again
+    upi_settled = ingest.settled_upi(prior.get('fr_dataset'), upi, fd_frame,
+                                     ptm_data_consi)
+    fr_upi = engine.upi_match(fd_frame.drop(index=upi_settled),
+                              ptm_data_consi, upi)
+    return {"fr_upi": fr_upi, "upi_settled": upi_settled}
+
+
+@stage(inputs=["fr_upi", "bc_df", "prior", "upi_settled"],
+       outputs=["fr_bcom", "fr_kept"],
+       params=["BCOM_COMMISSION", "unit"], resources=["name_cache"],
+       kind="match",
+       counts=lambda inputs, outputs: bcom_counts(outputs["fr_bcom"]))
+def bcom_match(fr_upi, bc_df, prior, upi_settled, BCOM_COMMISSION, unit,
+               name_cache=None):
+    """
+    Match the front-desk data with booking.com data on (check-in, check-out,
+    rooms) blocks and append the booking.com details.
+    """
+    fr_bcom = engine.bcom_match(fr_upi, bc_df, BCOM_COMMISSION,
+                                cache=name_cache, unit=unit)
+
+    # The matches kept for the settled bookings are matched again, their
+    # Booking.com export may come after their UPI payments reached the bank
+    fr_kept = ingest.kept_upi(prior.get('fr_dataset'), upi_settled)
+    if fr_kept is not None:
+        fr_kept = engine.bcom_match(fr_kept, bc_df, BCOM_COMMISSION,
+                                    cache=name_cache, unit=unit)
+    return {"fr_bcom": fr_bcom, "fr_kept": fr_kept}
+
+
+@stage(inputs=["fr_bcom", "fr_kept", "ptm_data_consi", "ref_idx", "upi",
+               "upi_settled"],
+       outputs=["fr_dataset"], kind="match",
+       counts=lambda inputs, outputs: settled_counts(
+           outputs["fr_dataset"], "Tran_Id"))
+def settle_upi(fr_bcom, fr_kept, ptm_data_consi, ref_idx, upi, upi_settled):
+    """
+    Append the bank transaction id through the UTR number of the matched
+    paytm transactions and add back the matches of the settled bookings.
+    """
+    fr_dataset = engine.resolve_utr(fr_bcom, ptm_data_consi, ref_idx)
+    fr_dataset = ingest.merge_upi(fr_kept, fr_dataset, upi, upi_settled)
+    return {"fr_dataset": fr_dataset}
+
+
+@stage(inputs=["fd_frame", "mmt_dataset", "ref_idx", "prior"],
+       outputs=["fr_mmt_comb"],
+       params=["MMT_DATE_TOLERANCE", "MMT_COMMISSION", "unit"],
+       resources=["name_cache"], kind="match",
+       counts=lambda inputs, outputs: mmt_counts(inputs["mmt_dataset"],
+                                                 outputs["fr_mmt_comb"]))
+def mmt_match(fd_frame, mmt_dataset, ref_idx, prior, MMT_DATE_TOLERANCE,
+              MMT_COMMISSION, unit, name_cache=None):
+    """
+    Match the bookings not yet settled with the confirmed OTA:InGo-MMT
+    bookings on "check-in", "check-out" and "Name" and append the bank
+    transaction id.
+    """
+    mmt_settled = ingest.settled_mmt(prior.get('fr_mmt_comb'))
+    fr_mmt_comb = engine.mmt_match(fd_frame.drop(index=mmt_settled),
+                                   mmt_dataset, tolerance=MMT_DATE_TOLERANCE,
+                                   cache=name_cache)
+
+    # Appends the bank transaction id to the front_desk dataset
+    fr_mmt_comb = engine.resolve_bank_ref(fr_mmt_comb, ref_idx)
+    fr_mmt_comb = ingest.merge_mmt(prior.get('fr_mmt_comb'), fr_mmt_comb,
+                                   mmt_settled)
+
+    # Calculate the commission amount for the OTA:InGo-MMT
+    fr_mmt_comb['ota_commission_amount'] = utils.round_money(
+        fr_mmt_comb['ota_amount']
+        - fr_mmt_comb['ota_amount'] * MMT_COMMISSION, unit)
+    return {"fr_mmt_comb": fr_mmt_comb}
+
+
+## Stages building the outputs
+
+@stage(inputs=["fr_dataset", "fr_mmt_comb"], outputs=["data", "ls_dt_a"])
+def combine(fr_dataset, fr_mmt_comb):
+    """
+    Stack the UPI and the InGo-MMT matches and group them by booking.
+
+    ...
+
+    The InGo-MMT columns are appended to the UPI columns by position.
+    """
+    ls_data = []
+
+    column = ["Row_Id", "Room_Bill", "Amount_date", "Booking_Id",
+              "guest_name", "check-in", "check-out", "book_mode",
+              "room_booking", "ph_no", "adults", "extra_per_chrg",
+              "total_amt_paid", "extras_paid", "Tran_Id",
+              "ota_commission_amount"]
+
+    # Appends "columns" list series element to ls_data list
+    for i in column:
+        ls_data.append(fr_dataset[i].tolist())
+
+    # Loop to get all the columns from the front-office dataset
+    # except the bank_ref_no
+    mmt_list = [fr_mmt_comb[i].tolist() for i in fr_mmt_comb.columns if
+                i != "bank_ref_no"]
+
+    # Convert seperate lists into a single list which
+    # contains sublist
+    for i, _ in enumerate(ls_data):
+        for j, _ in enumerate(mmt_list):
+            if i == j:
+                ls_data[i].extend(mmt_list[j])
+
+    # Convert the list into DataFrame
+    data_ls = pd.DataFrame(list(zip(*ls_data)), columns=column)
+
+    ptm_trans = fr_dataset["Bank_Transaction_ID"].tolist()
+
+    # Convert "ptm_trans", "ph_no" into equal length
+    ex_len_diff = len(data_ls) - len(fr_dataset)
+    ptm_trans += [np.nan] * ex_len_diff
+
+    # Combine list to for "Data" DataFrame
+    data = pd.DataFrame(list(zip(*ls_data, ptm_trans)),
+        columns=["Row_Id", "Room_Bill", "Amount_date", "Booking_Id",
+                 "guest_name", "checkin", "checkout", "Mode_of_Booking",
+                 "room_booking", "ph_no", "Adults", "extra_per_charge",
+                 "total_amt_paid", "extras_paid", 'Tran_Id',
+                 "ota_commission_amount", "Bank_Transaction_ID"])
+
+    # Sort the DataFrame by "Row_Id"
+    data = data.sort_values(by=["Row_Id"]).reset_index(drop=True)
+
+    col_list = ['Row_Id', 'guest_name', 'Room_Bill', 'checkin', 'checkout',
+                'ph_no', 'Adults', 'Mode_of_Booking', 'total_amt_paid']
+
+    # aggregate the element in column names in col_list
+    ls_dt_a = data.groupby(col_list).agg(list).reset_index()
+
+    # Create a copy of the column "room_booking"
+    room = ls_dt_a.room_booking.copy()
+
+    # Create the subset of the ls_dt_a DataFrame
+    ls_dt_a = ls_dt_a[col_list]
+
+    # Group 'Tran_Id', 'Booking_Id', 'Bank_Transaction_ID' in to sublist
+    for iter_col in ['Tran_Id', 'Booking_Id', 'Bank_Transaction_ID',
+                     'extras_paid', "ota_commission_amount",
+                     'extra_per_charge']:
+        temp = data.groupby(col_list)[iter_col].agg(list).reset_index()
+        ls_dt_a = pd.merge(ls_dt_a, temp, on=col_list, how='left')
+
+    # concatinate "ls_dt_a" and "room" to for front_office_complete
+    ls_dt_a = pd.concat([ls_dt_a, room], axis=1)
+
+    # Merge and remove the duplicates from the series in the column
+    # "room_booking"
+    ls_dt_a.room_booking = ls_dt_a.room_booking.apply(utils.merge_list)
+
+    return {"data": data, "ls_dt_a": ls_dt_a}
+
+
+@stage(inputs=["ls_dt_a", "fr_dataset"], outputs=["fo_comp"])
+def office_match(ls_dt_a, fr_dataset):
+    """
+    Build the matched front-office dataset with the amount every booking
+    paid through UPI.
+
+    ...
+
+    The UPI amount of a booking is the sum of its matched UPI payments,
+    looked up for every row of the booking.
+    """
+    ls_dt_a_fin = ls_dt_a[['Row_Id', 'guest_name', 'Room_Bill', 'checkin',
+                           'checkout', 'ph_no', 'Adults', 'Mode_of_Booking',
+                           'Tran_Id', 'Booking_Id', 'Bank_Transaction_ID',
+                           'room_booking']]
+
+    # Sort the DataFrame by "checkin"
+    fo_comp = ls_dt_a_fin.sort_values(by=["checkin"]).reset_index(drop=True)
+
+    paid_upi = fr_dataset.groupby("Row_Id")["Amount"].sum()
+    fo_comp["paid_at_UPI"] = fo_comp["Row_Id"].map(paid_upi) \
+        .astype("float64")
+    return {"fo_comp": fo_comp}
+
+
+@stage(inputs=["fd_frame", "ls_dt_a"], outputs=["fo_resi", "fo_cash"])
+def residues(fd_frame, ls_dt_a):
+    """Split the unmatched bookings into cash bookings and residues."""
+    # fetch unmatched front-desk data
+    fr_mani = fd_frame[~fd_frame.index.isin(ls_dt_a["Row_Id"])]
+
+    # Bookings with at least one entry in their UPI details
+    upi_listed = fr_mani["UPI Details"].str.contains(r"[^ ,;]", regex=True)
+
+    # Extract only cash transaction from the front-desk data
+    fo_cash = fr_mani[~upi_listed]
+
+    # Remove the rows if it containing 'MMT', 'A/C', 'UPI', 'GOIBIBO'
+    online = fo_cash.isin(['MMT', 'A/C', 'UPI', 'GOIBIBO']).any(axis=1)
+    fo_cash_ = fo_cash[~online]
+
+    # Extract only unmatched UPI transaction from the front-desk data
+    fo_resi = fr_mani[upi_listed]
+
+    # Fetches row only contain 'MMT', 'A/C', 'UPI', 'GOIBIBO'
+    fo_resi_a = fo_cash[online]
+
+    # concatinate "fo_resi" and "fo_resi_a" to for
+    # front_office_complete_residue
+    fo_resi = pd.concat([fo_resi, fo_resi_a], axis=0)
+
+    # Select specific columns from the fo_resi DataFrame
+    fo_resi = fo_resi[['Name', 'Room Bill (Incl. GST)', 'check-in',
+                       'check-out', 'Phone', 'Adults', 'Mode of Booking',
+                       'Children', 'Rooms Booked']]
+
+    return {"fo_resi": fo_resi, "fo_cash": fo_cash_}
+
+
+@stage(inputs=["data", "bnk_state"],
+       outputs=["fin_data", "bank_residue", "bank_table"], kind="match",
+       counts=lambda inputs, outputs: {
+           "matched": len(outputs["fin_data"]),
+           "unmatched": len(outputs["bank_residue"])})
+def bank_match(data, bnk_state):
+    """Build the matched and the unmatched bank deposits."""
+    # Reset the index of the DataFrame
+    fin_data = data.reset_index(level=0)
+
+    # Rename the column "index" to "front_office_index"
+    fin_data = fin_data.rename({"index": "Row_Id"}, axis="columns")
+
+    # Select specific columns from the financial_data DataFrame
+    fin_data = fin_data[["Tran_Id", "Bank_Transaction_ID",
+                         "Booking_Id", "Mode_of_Booking",
+                         "Row_Id"]]
+
+    fin_data_ = fin_data[fin_data.Tran_Id.isnull()==False] \
+        .reset_index(drop=True)
+
+    fin_data_ = fin_data_.groupby(['Tran_Id']).agg(list).reset_index()
+
+    # Unmatched bank statement transactions
+    bnk_resi = bnk_state[~bnk_state['Tran. Id'].isin(fin_data_['Tran_Id'])]
+
+    # Combine bank transaction ID and front-desk index
+    bnk_match = fin_data[['Tran_Id', 'Row_Id']].copy()
+
+    # Concate Tran_Id and Tran_Id from bnk_match, bnk_resi respectively
+    bnk_match = pd.concat([bnk_match['Tran_Id'], bnk_resi['Tran. Id']],
+                          axis=0).reset_index(drop=True)
+
+    # Rename 0 to Tran_Id
+    bnk_match = bnk_match.to_frame().rename(columns={0: 'Tran_Id'})
+
+    # Concate bnk_match and 'Row_Id' from financial_data to form
+    # bs_matching_table
+    bnk_match = pd.concat([bnk_match, fin_data['Row_Id']], axis=1)
+    bnk_match = bnk_match.groupby(['Tran_Id']).agg(list).reset_index()
+
+    bnk = pd.DataFrame(columns=['Bank_Transaction_ID', 'Row_ID',
+                                'Booking_ID'])
+    bnk['Trans.Id'] = bnk_resi['Tran. Id']
+    bnk = bnk[['Trans.Id', 'Bank_Transaction_ID', 'Row_ID', 'Booking_ID']]
+
+    return {"fin_data": fin_data_, "bank_residue": bnk,
+            "bank_table": bnk_match}
+
+
+@stage(inputs=["fd_frame"], outputs=["df_join"])
+def ledger(fd_frame):
+    """
+    Breakdown of the amount paid for every booking through "UPI", "CASH",
+    "A/C", "CARD" and OTAs.
+    """
+    return {"df_join": engine.paid_ledger(fd_frame)}
+
+
+@stage(inputs=["fd_frame"], outputs=["fr_office"])
+def front_office(fd_frame):
+    """Generate the front-office dataset, one row per booking."""
+    fr_office = pd.DataFrame({
+        "Row_Id": fd_frame.index,
+        "guest_name": fd_frame["Name"].values,
+        "ph_no": fd_frame["Phone"].values,
+        "adults": fd_frame["Adults"].values,
+        "child": fd_frame["Children"].values,
+        "mode_of_booking": fd_frame["Mode of Booking"].values,
+        "checkin": fd_frame["check-in"].values,
+        "checkout": fd_frame["check-out"].values,
+        "rooms": fd_frame["Rooms Booked"].values,
+    })
+    return {"fr_office": fr_office}
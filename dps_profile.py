@@ -0,0 +1,250 @@
+"""This module contains the profiler capturing the stages of a DPS run.
+
+ - It is off unless a folder is given with --profile or the environment
+ variable DPS_PROFILE, a disabled profiler costing one empty context per
+ stage.
+
+ - Every stage gets a profile of its own: in the "sample" mode a thread
+ samples the stack of the stage every few milliseconds and writes the
+ samples as folded stacks ("<stage>.folded", one "frame;frame;... count"
+ line per stack), the input of flamegraph.pl, speedscope or inferno. Frames
+ carry their line numbers, so the hot line of a matching loop shows up in
+ the graph. The "cprofile" mode runs the deterministic profiler instead
+ and writes "<stage>.prof" for pstats or snakeviz and "<stage>.txt" with
+ the functions sorted by cumulative time.
+
+ - tracemalloc snapshots are taken before and after every stage, the lines
+ allocating the most memory in between being written to
+ "<stage>.alloc.txt".
+
+ - Files parsed on the process pool of the loader are not seen by the
+ profiler, only the wait for their results: run the loader with -j 1 to
+ profile the parsing itself.
+"""
+## inbuilt module
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Environment variables enabling the profiler and choosing its mode
+ENV_FOLDER = "DPS_PROFILE"
+ENV_MODE = "DPS_PROFILE_MODE"
+
+# Profiling modes
+MODES = ["sample", "cprofile"]
+
+# Seconds between two stack samples
+INTERVAL = 0.005
+
+# Allocation lines kept in the reports
+TOP = 25
+
+
+
+def frame_label(frame):
+    """Name a stack frame as "function (file:line)"."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:" \
+           f"{frame.f_lineno})"
+
+
+class Sampler:
+    """
+    Sampling profiler of one thread.
+
+    ...
+
+    A daemon thread reads the stack of the profiled thread at a fixed
+    interval and counts the stacks seen, root first. The profiled thread is
+    never interrupted, so the cost is the sampling thread alone.
+
+    Parameters:
+    ----------
+    ident: int
+        The id of the thread profiled.
+
+    interval: float, optional
+        The seconds between two samples.
+
+    Examples:
+    --------
+    >>> sampler = Sampler(threading.get_ident())
+    >>> sampler.start()
+    >>> ...
+    >>> sampler.stop()
+    >>> sampler.write('upi_match.folded')
+    """
+
+    def __init__(self, ident, interval=INTERVAL):
+        self.ident = ident
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = False
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        """Start sampling."""
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampling thread."""
+        self.running = False
+        self.thread.join()
+
+    def sample(self):
+        """Count the stacks of the profiled thread until stopped."""
+        while self.running:
+            frame = sys._current_frames().get(self.ident)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+            time.sleep(self.interval)
+
+    def write(self, path):
+        """Write the stacks in the folded format, the most seen first."""
+        with open(path, "w", encoding="utf-8") as out_file:
+            for stack, count in self.stacks.most_common():
+                out_file.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+    """
+    Profiler writing one set of files per stage of a run.
+
+    Parameters:
+    ----------
+    folder: str
+        The folder receiving the profiles, created if missing.
+
+    mode: str, optional
+        "sample" for folded stacks or "cprofile" for pstats files.
+
+    interval: float, optional
+        The seconds between two stack samples in the "sample" mode.
+
+    top: int, optional
+        The number of allocation lines written per stage.
+
+    Examples:
+    --------
+    >>> profiler = StageProfiler('./dps_out/profile')
+    >>> with profiler.stage('upi_match'):
+    ...     fr_dataset = engine.upi_match(fd_frame, ptm_data_consi, upi)
+    >>> profiler.close()
+    """
+
+    def __init__(self, folder, mode="sample", interval=INTERVAL, top=TOP):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode}, expected one of "
+                             f"{MODES}")
+        self.folder = folder
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        os.makedirs(folder, exist_ok=True)
+        self.tracing = not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start()
+
+    def path(self, name, suffix):
+        """Path of a profile file of a stage, its name made file safe."""
+        return os.path.join(self.folder,
+                            re.sub(r"[^\w.-]", "_", name) + suffix)
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the code run inside the context as the stage name."""
+        before = tracemalloc.take_snapshot()
+        if self.mode == "sample":
+            profile = Sampler(threading.get_ident(), self.interval)
+            profile.start()
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if self.mode == "sample":
+                profile.stop()
+                profile.write(self.path(name, ".folded"))
+            else:
+                profile.disable()
+                self.write_pstats(profile, name)
+            self.write_allocations(before, tracemalloc.take_snapshot(), name)
+
+    def write_pstats(self, profile, name):
+        """Write the deterministic profile of a stage and its summary."""
+        profile.dump_stats(self.path(name, ".prof"))
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative") \
+            .print_stats(self.top * 2)
+        with open(self.path(name, ".txt"), "w", encoding="utf-8") as out:
+            out.write(text.getvalue())
+
+    def write_allocations(self, before, after, name):
+        """Write the lines allocating the most memory during a stage."""
+        # The samples kept by the profiler are not part of the stage
+        own = [tracemalloc.Filter(False, __file__),
+               tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(own).compare_to(
+            before.filter_traces(own), "lineno")
+        with open(self.path(name, ".alloc.txt"), "w",
+                  encoding="utf-8") as out_file:
+            out_file.write(f"Top {self.top} lines by memory allocated "
+                           f"during {name}\n")
+            for stat in stats[:self.top]:
+                out_file.write(f"{stat}\n")
+
+    def close(self):
+        """Stop tracemalloc if this profiler started it."""
+        if self.tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def from_settings(folder=None, mode=None):
+    """
+    Create the profiler asked for on the command line or in the environment.
+
+    Parameters:
+    ----------
+    folder: str, optional
+        The folder given on the command line, DPS_PROFILE when None.
+
+    mode: str, optional
+        The mode given on the command line, DPS_PROFILE_MODE or "sample"
+        when None.
+
+    Returns:
+    -------
+    StageProfiler or None
+        None when profiling is not asked for.
+
+    Examples:
+    --------
+    >>> from_settings(None, None) is None  # DPS_PROFILE not set
+    True
+    """
+    folder = folder or os.environ.get(ENV_FOLDER)
+    if not folder:
+        return None
+    return StageProfiler(folder, mode or os.environ.get(ENV_MODE, "sample"))
+
+
+def profile_step(profiler, name):
+    """Profile a step when a profiler is given, else do nothing."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
@@ -0,0 +1,629 @@
+"""This module contains the generator of synthetic inputs for the DPS.
+
+ - Every source is written in the layout dps_utils reads: the Notion
+ front-desk export with its "Date" ranges and "UPI Details" strings, the
+ ICICI bank statement between its 16-line header and 38-line footer, the
+ PayTM settlements and transactions sharing their UTR numbers, and the
+ Booking.com and InGo-MMT exports.
+
+ - Matches are planted: the UPI payments of the bookings show up in PayTM and
+ most of them in the bank, the Booking.com and InGo-MMT bookings get their
+ reservation and the InGo-MMT payouts reach the bank. Unrelated PayTM and
+ bank rows are added as noise. The planted counts are written next to the
+ inputs in "synth_truth.json"; a noise payment can share the date and amount
+ of a booking payment, so a run finds at least the planted matches.
+
+ - Every month of every property is generated from its own seeded random
+ generator and written as one file per source, so the memory held is one
+ month and the same seed always gives the same files.
+
+ - Dates the schema parses without a format are written in ISO form, the
+ only form the mixed date parser never reads month first.
+"""
+##  third party module
+import numpy as np
+import pandas as pd
+
+## inbuilt module
+import json
+import os
+
+from argparse import ArgumentParser
+
+## user-defined modules
+import dps_utils as utils
+
+# Folder of every source below the root of a property, as dir_paths_default
+Layout = {
+    'front_desk': "dps_in/Front-Desk",
+    'ptm_settle': "dps_in/PayTM/settlements",
+    'ptm_trans': "dps_in/PayTM/transactions",
+    'bank_statement': "dps_in/Bank-Statement",
+    'booking.com': "dps_in/OTA/Booking-com",
+    'ingo_mmt_data': "dps_in/OTA/InGo-MMT",
+}
+
+# Output folders created below the root of a property
+OUT_DIRS = ["dps_out/AFS", "dps_out/VRS"]
+
+# File of the planted counts, below the root of a property
+TRUTH = "synth_truth.json"
+
+# Names the guests are drawn from
+FIRST_NAMES = ["Aarav", "Aditi", "Akash", "Ananya", "Arjun", "Bhavna",
+               "Chetan", "Deepa", "Dev", "Divya", "Farhan", "Gaurav", "Gita",
+               "Hari", "Isha", "Jay", "Kavya", "Kiran", "Lakshmi", "Manoj",
+               "Meera", "Nikhil", "Nisha", "Pooja", "Pranav", "Priya",
+               "Rahul", "Ravi", "Rohan", "Sanjay", "Shreya", "Sneha",
+               "Suresh", "Tanvi", "Uday", "Varun", "Vidya", "Vikram",
+               "Yash", "Zoya"]
+LAST_NAMES = ["Acharya", "Bhat", "Desai", "D'Souza", "Gupta", "Hegde",
+              "Iyer", "Jain", "Kamath", "Kulkarni", "Menon", "Nair",
+              "Pai", "Patil", "Prabhu", "Rao", "Reddy", "Shenoy", "Sharma",
+              "Shetty"]
+
+# Modes of booking and their share of the bookings
+MODES = {"UPI": 0.3, "CASH": 0.2, "WALK-IN": 0.15, "BOOKING.COM": 0.15,
+         "MMT": 0.12, "GOIBIBO": 0.08}
+
+# Payment methods at the front desk and their share of the payments
+METHODS = {"UPI": 0.45, "CASH": 0.3, "CARD": 0.15, "A/C": 0.1}
+
+# Front-desk payments: amount column, method column and the day of the
+# payment relative to the check-in ("in"), the check-out ("out") or before
+# the check-in ("advance")
+PAYMENTS = [("Advance Paid", "Advance Payment Method", "advance"),
+            ("Paid at Check-in", "Check-in Payment Method", "in"),
+            ("Paid at Check-out", "Check-out Payment Method", "out"),
+            ("Extras Paid", "Extras Payment Method", "out")]
+
+# Probabilities shaping the planted matches and the noise
+Rates = {
+    # A UPI payment of the front desk is found in PayTM
+    'paytm': 0.9,
+    # A PayTM transaction is settled in the bank
+    'settled': 0.95,
+    # An OTA booking of the front desk has its reservation
+    'ota': 0.95,
+    # Unrelated PayTM payments and bank transactions per booking
+    'noise': 0.1,
+}
+
+# Commission withheld by Booking.com and InGo-MMT
+OTA_COMMISSION = 0.15
+
+# Lines around the transactions table of the bank statement
+BANK_HEAD = ["", "DETAILED STATEMENT", "",
+             "Transactions List - SUGAMYA CORNER (INR) - 000401512345", "",
+             "Transaction Date from,{start},to,{end}", "",
+             "Amount from,,to,", "", "Cheque number from,,to,", "",
+             "Transaction remarks,", "", "Transaction type,All", "",
+             "Transaction mode,All"]
+BANK_FOOT = (["", "Legends Used in Account Statement", ""]
+             + [f"{code},{text}" for code, text in [
+                 ("VAT/MAT/NFS", "Cash withdrawal at other bank ATM"),
+                 ("INF", "Internet fund transfer in linked accounts"),
+                 ("NEFT", "National electronic fund transfer"),
+                 ("RTGS", "Real time gross settlement"),
+                 ("UPI", "Unified payment interface"),
+                 ("CLG", "Cheque clearing transaction"),
+                 ("BIL", "Internet bill payment"),
+                 ("MMT", "Mobile money transfer")]]
+             + [""] * (utils.SKIPFOOT - 13)
+             + ["Sincerely,", "Team ICICI Bank"])
+BANK_COLUMNS = ["No.", "Tran. Id", "Value Date", "Transaction Date",
+                "Transaction Posted Date", "Cheque. No./Ref. No.",
+                "Transaction Remarks", "Withdrawal Amt (INR)",
+                "Deposit Amt (INR)", "Balance (INR)"]
+
+
+## Functions formatting columns of generated values
+
+def date_text(days, fmt):
+    """
+    Format dates through their unique values.
+
+    Parameters:
+    ----------
+    days: np.ndarray
+        The datetime64[D] dates.
+
+    fmt: str
+        The strftime format.
+
+    Returns:
+    -------
+    np.ndarray
+        The formatted dates as objects.
+
+    Examples:
+    --------
+    >>> date_text(np.array(['2023-01-05'], dtype='datetime64[D]'), '%d%m%Y')
+    array(['05012023'], dtype=object)
+    """
+    uniques, codes = np.unique(days, return_inverse=True)
+    text = pd.DatetimeIndex(uniques).strftime(fmt).to_numpy(object)
+    return text[codes]
+
+
+def money_text(values):
+    """Format amounts as the bank statement does, e.g. "1,550.00"."""
+    return pd.Series(values, dtype="float64").map("{:,.2f}".format) \
+        .to_numpy(object)
+
+
+def pick(rng, shares, size):
+    """Draw labels with the given shares."""
+    return rng.choice(np.array(list(shares), dtype=object), size=size,
+                      p=np.array(list(shares.values())) / sum(shares.values()))
+
+
+## Functions generating the records of one month
+
+def bookings(rng, month, count, first_phone, rooms=12):
+    """
+    Generate the front-desk bookings checking in during a month.
+
+    ...
+
+    The bill is the nightly rate of the rooms times the nights. The
+    bookings of an OTA are paid to the OTA, the others pay the bill and the
+    extras in up to four front-desk payments.
+
+    Parameters:
+    ----------
+    rng: np.random.Generator
+        The generator of the month.
+
+    month: np.datetime64
+        The first day of the month.
+
+    count: int
+        The number of bookings.
+
+    first_phone: int
+        The phone number of the first booking, phones are unique.
+
+    rooms: int, optional
+        The number of rooms of the property.
+
+    Returns:
+    -------
+    pd.DataFrame
+        One row per booking with the front-desk columns as values, plus
+        "first", "initial", "rooms", "check-in" and "check-out" used by
+        the other sources.
+    """
+    days = ((month + np.timedelta64(32, "D")).astype("datetime64[M]")
+            - month).astype(int)
+    check_in = month + rng.integers(0, days, count).astype("timedelta64[D]")
+    nights = rng.integers(1, 5, count)
+    check_out = check_in + nights.astype("timedelta64[D]")
+
+    first = rng.choice(np.array(FIRST_NAMES, dtype=object), count)
+    last = rng.integers(0, len(LAST_NAMES), count)
+    name = first + " " + np.array(LAST_NAMES, dtype=object)[last]
+    mode = pick(rng, MODES, count)
+    n_rooms = rng.choice([1, 2, 3], count, p=[0.75, 0.2, 0.05])
+    room = rng.integers(1, rooms + 1, count)
+    room_text = "R" + room.astype(str).astype(object)
+    for extra in (1, 2):
+        other = "R" + ((room + extra - 1) % rooms + 1).astype(str) \
+            .astype(object)
+        room_text = np.where(n_rooms > extra, room_text + "," + other,
+                             room_text)
+
+    adults = rng.integers(1, 4, count)
+    bill = rng.integers(12, 40, count) * 100 * nights * n_rooms
+    extra_person = np.where(adults > 2, 500 * nights, 0)
+    ota = np.isin(mode, ["BOOKING.COM", "MMT", "GOIBIBO"])
+    due = np.where(ota, 0, bill + extra_person)
+
+    advance = np.where(rng.random(count) < 0.4, due * 3 // 1000 * 100, 0)
+    at_check_in = np.where(rng.random(count) < 0.6, due - advance, 0)
+    at_check_out = due - advance - at_check_in
+    extras = rng.choice([0, 0, 150, 300], count)
+
+    frame = pd.DataFrame({
+        "Name": name,
+        "Phone": (first_phone + np.arange(count)).astype(str),
+        "Nights": nights,
+        "Adults": adults,
+        "Children": rng.choice([0, 0, 1, 2], count),
+        "Mode of Booking": mode,
+        "Rooms Booked": room_text,
+        "Room Bill (Incl. GST)": bill.astype("float64"),
+        "Extra Person Charges (Incl. GST)": extra_person.astype("float64"),
+    })
+    for (amount, method, _), paid in zip(PAYMENTS, [advance, at_check_in,
+                                                    at_check_out, extras]):
+        frame[amount] = paid.astype("float64")
+        drawn = np.where(mode == "UPI", "UPI", pick(rng, METHODS, count))
+        frame[method] = np.where(paid > 0, drawn, "")
+    frame["Total Amount Paid"] = np.where(
+        ota, bill, advance + at_check_in + at_check_out) + extras
+    frame["Status"] = "Checked-out"
+    frame["first"] = first
+    frame["initial"] = np.array([text[0] for text in LAST_NAMES],
+                                dtype=object)[last]
+    frame["rooms"] = n_rooms
+    frame["check-in"] = check_in
+    frame["check-out"] = check_out
+    return frame
+
+
+def upi_long(rng, frame):
+    """
+    Collect the UPI payments of the bookings, one row per payment.
+
+    ...
+
+    Advances are paid one to ten days before the check-in, the other
+    payments on the day of the check-in or check-out.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The booking ("row"), the payment ("part"), date and whole rupee
+        amount of every UPI payment.
+    """
+    parts = []
+    for part, (amount, method, day) in enumerate(PAYMENTS):
+        rows = np.flatnonzero((frame[method] == "UPI").values
+                              & (frame[amount] > 0).values)
+        date = frame["check-out" if day == "out" else "check-in"] \
+            .values[rows].astype("datetime64[D]")
+        if day == "advance":
+            date = date - rng.integers(1, 11, len(rows)) \
+                .astype("timedelta64[D]")
+        parts.append(pd.DataFrame({"row": rows, "part": part, "date": date,
+                                   "amount": frame[amount].values[rows]
+                                   .astype("int64")}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def upi_details(frame, upi):
+    """
+    Write the UPI payments of every booking as the front desk does.
+
+    ...
+
+    Every payment is written "ddmmyyyy, First name;amount," in the order
+    of the payments of the booking.
+    """
+    details = np.full(len(frame), "", dtype=object)
+    text = (date_text(upi["date"].values, "%d%m%Y") + ", "
+            + frame["first"].values[upi["row"].values] + ";"
+            + upi["amount"].values.astype(str).astype(object) + ",")
+    for part in range(len(PAYMENTS)):
+        mask = (upi["part"] == part).values
+        rows = upi["row"].values[mask]
+        details[rows] = details[rows] + text[mask]
+    return details
+
+
+def month_sources(rng, month, count, serial, rates=Rates, rooms=12):
+    """
+    Generate the records of every source for one month of a property.
+
+    Parameters:
+    ----------
+    rng: np.random.Generator
+        The generator of the month.
+
+    month: np.datetime64
+        The first day of the month.
+
+    count: int
+        The number of bookings checking in during the month.
+
+    serial: dict
+        The next phone, UTR, PayTM id, bank id and OTA booking id of the
+        property, advanced by the records generated.
+
+    rates: dict, optional
+        The probabilities of the planted matches and the noise, see Rates.
+
+    rooms: int, optional
+        The number of rooms of the property.
+
+    Returns:
+    -------
+    tuple
+        The dataframe of every source, keyed as Layout, and the counts
+        planted.
+
+    Examples:
+    --------
+    >>> serial = dict(phone=9000000000, utr=300000000000, tid=1, bank=1,
+    ...               ota=1)
+    >>> frames, truth = month_sources(np.random.default_rng(0),
+    ...                               np.datetime64('2023-01-01'), 100,
+    ...                               serial)
+    >>> truth['bookings']
+    100
+    """
+    fd = bookings(rng, month, count, serial["phone"], rooms)
+    serial["phone"] += count
+    upi = upi_long(rng, fd)
+    fd["UPI Details"] = upi_details(fd, upi)
+    fd["Date"] = (date_text(fd["check-in"].values, "%B %d, %Y") + " → "
+                  + date_text(fd["check-out"].values, "%B %d, %Y"))
+
+    ## PayTM: the planted UPI payments and unrelated payments
+    in_paytm = upi[rng.random(len(upi)) < rates['paytm']]
+    n_noise = int(count * rates['noise'])
+    days = np.unique(fd["check-in"].values)
+    paytm = pd.DataFrame({
+        "date": np.concatenate([in_paytm["date"].values,
+                                rng.choice(days, n_noise)]),
+        "amount": np.concatenate([in_paytm["amount"].values,
+                                  rng.integers(1, 100, n_noise) * 50]),
+    })
+    paytm["utr"] = serial["utr"] + np.arange(len(paytm))
+    paytm["tid"] = serial["tid"] + np.arange(len(paytm))
+    serial["utr"] += len(paytm)
+    serial["tid"] += len(paytm)
+    seconds = rng.integers(8 * 3600, 22 * 3600, len(paytm))
+    stamp = (paytm["date"].values.astype("datetime64[s]")
+             + seconds.astype("timedelta64[s]"))
+    settled = rng.random(len(paytm)) < rates['settled']
+
+    utr_text = "'" + paytm["utr"].astype(str).values.astype(object)
+    tid_text = "'T" + paytm["tid"].astype(str).values.astype(object)
+    date_col = "'" + pd.DatetimeIndex(stamp).strftime("%Y-%m-%d %H:%M:%S") \
+        .to_numpy(object)
+    ptm_trans = pd.DataFrame({"Transaction_ID": tid_text,
+                              "Transaction_Date": date_col,
+                              "Amount": paytm["amount"].values,
+                              "UTR_No.": utr_text, "Status": "SUCCESS"})
+    ptm_settle = pd.DataFrame({
+        "MID": "SUGAMY12345678901234", "Transaction_ID": tid_text,
+        "Transaction_Date": date_col, "Amount": paytm["amount"].values,
+        "UTR_No.": utr_text, "Response_code": "01",
+        "Response_message": "Txn Success", "Prepaid_Card": "N",
+        "Bank/Gateway": "UPI", "Product_Code": "DYNAMIC_QR",
+        "Bank_Transaction_ID": paytm["utr"].astype(str).values,
+        "Channel": "UPI", "Transaction_Type": "ACQUIRING",
+        "Settled_Date": "'" + date_text(paytm["date"].values
+                                        + np.timedelta64(1, "D"),
+                                        "%Y-%m-%d")})[settled]
+
+    ## OTA reservations of the OTA bookings
+    has_ota = rng.random(count) < rates['ota']
+    bc_rows = np.flatnonzero(has_ota
+                             & (fd["Mode of Booking"] == "BOOKING.COM").values)
+    bill = fd["Room Bill (Incl. GST)"].values
+    bcom = pd.DataFrame({
+        "Book Number": (serial["ota"] + np.arange(len(bc_rows)))
+        .astype(str),
+        "Booked by": fd["first"].values[bc_rows] + " "
+        + fd["initial"].values[bc_rows],
+        "Guest Name(s)": fd["Name"].values[bc_rows],
+        "Check-in": date_text(fd["check-in"].values[bc_rows], "%Y-%m-%d"),
+        "Check-out": date_text(fd["check-out"].values[bc_rows], "%Y-%m-%d"),
+        "Rooms": fd["rooms"].values[bc_rows],
+        "Status": "ok",
+        "Price": np.char.mod("%.2f INR", bill[bc_rows] / 1.12).astype(object),
+        "Commission Amount": np.char.mod(
+            "%.2f", bill[bc_rows] * OTA_COMMISSION).astype(object),
+        "Booker group": "Family", "Payment Method": "Online"})
+    serial["ota"] += len(bc_rows)
+
+    mmt_rows = np.flatnonzero(has_ota
+                              & (fd["Mode of Booking"] == "MMT").values)
+    ref = "N" + (serial["ota"] + np.arange(len(mmt_rows))).astype(str) \
+        .astype(object)
+    serial["ota"] += len(mmt_rows)
+    paid_on = fd["check-out"].values[mmt_rows].astype("datetime64[D]") \
+        + rng.integers(1, 8, len(mmt_rows)).astype("timedelta64[D]")
+    commission = np.round(bill[mmt_rows] * OTA_COMMISSION)
+    mmt = pd.DataFrame({
+        "PNR": "'" + ref, "Booking Id": "NH" + ref,
+        "Guest Name": fd["Name"].values[mmt_rows],
+        "Checkin Date": date_text(fd["check-in"].values[mmt_rows],
+                                  "%Y-%m-%d"),
+        "Checkout Date": date_text(fd["check-out"].values[mmt_rows],
+                                   "%Y-%m-%d"),
+        "Booking Status": "Confirmed", "Brand": "MMT",
+        "Booking Amount": bill[mmt_rows], "Bank Ref No": "'" + ref,
+        "Payments Date": date_text(paid_on, "%d-%m-%Y"),
+        "Commission Amount": commission, "Total Recovered": 0,
+        "Recoveries Made": 0, "Recoveries PNR": "", "Recoveries Date": "",
+        "Recoveries Type": "", "Amount Paid in Bank": bill[mmt_rows]
+        - commission, "Payments Made in Bank Account": 1})
+
+    ## Bank: PayTM settlements, InGo-MMT payouts, cash and expenses
+    n_cash = n_noise // 2
+    bank = pd.DataFrame({
+        "date": np.concatenate([
+            paytm["date"].values[settled] + np.timedelta64(1, "D"), paid_on,
+            rng.choice(days, n_noise)]),
+        "remark": np.concatenate([
+            "UPI/" + paytm["utr"].astype(str).values[settled].astype(object)
+            + "/PAYTM SETTLEMENT/paytm@ptybl",
+            "NEFT-" + ref + "-MAKEMYTRIP INDIA PVT LTD",
+            np.where(np.arange(n_noise) < n_cash, "BY CASH-UDUPI BRANCH",
+                     "NEFT-VENDOR-LINEN SERVICES")]),
+        "deposit": np.concatenate([
+            paytm["amount"].values[settled], bill[mmt_rows] - commission,
+            np.where(np.arange(n_noise) < n_cash,
+                     rng.integers(1, 50, n_noise) * 500, 0)]),
+    })
+    bank["withdrawal"] = np.where(bank["deposit"] > 0, 0,
+                                  rng.integers(1, 20, len(bank)) * 250)
+    bank = bank.sort_values("date", kind="stable").reset_index(drop=True)
+    balance = 100000 + (bank["deposit"] - bank["withdrawal"]).cumsum()
+    bank_statement = pd.DataFrame({
+        "No.": np.arange(1, len(bank) + 1),
+        "Tran. Id": "S" + (serial["bank"] + np.arange(len(bank)))
+        .astype(str).astype(object),
+        "Value Date": date_text(bank["date"].values, "%Y-%m-%d"),
+        "Transaction Date": date_text(bank["date"].values, "%Y-%m-%d"),
+        "Transaction Posted Date": date_text(bank["date"].values,
+                                             "%d-%m-%Y 10:30:00 AM"),
+        "Cheque. No./Ref. No.": "", "Transaction Remarks": bank["remark"],
+        "Withdrawal Amt (INR)": money_text(bank["withdrawal"]),
+        "Deposit Amt (INR)": money_text(bank["deposit"]),
+        "Balance (INR)": money_text(balance)})
+    serial["bank"] += len(bank)
+
+    front_desk = fd.drop(columns=["first", "initial", "rooms", "check-in",
+                                  "check-out"])
+    # Booking.com reservations are only looked up for bookings with a UPI
+    # match, as bcom_match does
+    upi_rows = np.unique(upi["row"].values)
+    # PayTM transactions are only kept when settled
+    found_rows = np.unique(in_paytm["row"].values[settled[:len(in_paytm)]])
+    truth = {"bookings": count, "upi_payments": len(upi),
+             "upi_bookings": len(upi_rows),
+             "paytm_payments": len(in_paytm),
+             "paytm_settled": int(settled[:len(in_paytm)].sum()),
+             "upi_bookings_matched": len(found_rows),
+             "bcom_reservations": len(bc_rows),
+             "bcom_matches": len(np.intersect1d(bc_rows, found_rows)),
+             "mmt_matches": len(mmt_rows),
+             "paytm_noise": n_noise, "bank_noise": n_noise}
+    return {'front_desk': front_desk, 'ptm_settle': ptm_settle,
+            'ptm_trans': ptm_trans, 'bank_statement': bank_statement,
+            'booking.com': bcom, 'ingo_mmt_data': mmt}, truth
+
+
+## Functions writing the sources
+
+def write_bank(frame, path, month):
+    """Write a bank statement between the header and footer lines."""
+    end = (month + np.timedelta64(32, "D")).astype("datetime64[M]") \
+        .astype("datetime64[D]") - np.timedelta64(1, "D")
+    head = [line.format(start=date_text(np.array([month]), "%d/%m/%Y")[0],
+                        end=date_text(np.array([end]), "%d/%m/%Y")[0])
+            for line in BANK_HEAD]
+    with open(path, "w", encoding="utf-8", newline="") as out_file:
+        out_file.write("\n".join(head) + "\n")
+        frame.to_csv(out_file, index=False, lineterminator="\n")
+        out_file.write("\n".join(BANK_FOOT) + "\n")
+
+
+def write_month(root, month, frames):
+    """
+    Write the sources of one month as one csv file per source.
+
+    ...
+
+    The files are named after the month, so listing a folder in path order
+    lists the months in order.
+    """
+    tag = date_text(np.array([month]), "%Y_%m")[0]
+    for source, frame in frames.items():
+        path = os.path.join(root, Layout[source], f"{tag}.csv")
+        if source == 'bank_statement':
+            write_bank(frame, path, month)
+        else:
+            frame.to_csv(path, index=False)
+
+
+def generate(root, months=1, bookings_per_month=500, properties=1, seed=0,
+             start="2023-01", rates=Rates, rooms=12):
+    """
+    Generate the inputs of one or more properties.
+
+    ...
+
+    A single property is written below root itself, several properties
+    below "root/property_<n>", each with its own dps_in and dps_out trees
+    and its own "synth_truth.json".
+
+    Parameters:
+    ----------
+    root: str
+        The folder receiving the inputs.
+
+    months: int, optional
+        The number of months generated from start.
+
+    bookings_per_month: int, optional
+        The bookings checking in during a month, per property.
+
+    properties: int, optional
+        The number of properties.
+
+    seed: int, optional
+        The seed, the same seed gives the same files.
+
+    start: str, optional
+        The first month, as "YYYY-MM".
+
+    rates: dict, optional
+        The probabilities of the planted matches and the noise, see Rates.
+
+    rooms: int, optional
+        The number of rooms of every property.
+
+    Returns:
+    -------
+    dict
+        The planted counts of every property, keyed by its root.
+
+    Examples:
+    --------
+    >>> generate('./synth', months=12, bookings_per_month=2000, seed=7)
+    {'./synth': {'bookings': 24000, 'upi_payments': 19871, ...}}
+    """
+    first = np.datetime64(start, "M")
+    truths = {}
+    for prop in range(properties):
+        prop_root = root if properties == 1 \
+            else os.path.join(root, f"property_{prop + 1:03d}")
+        for folder in list(Layout.values()) + OUT_DIRS:
+            os.makedirs(os.path.join(prop_root, folder), exist_ok=True)
+
+        serial = dict(phone=9000000000, utr=300000000000 + prop * 10 ** 9,
+                      tid=10 ** 9, bank=7000000, ota=4000000)
+        totals = {}
+        for number in range(months):
+            month = (first + number).astype("datetime64[D]")
+            rng = np.random.default_rng([seed, prop, number])
+            frames, truth = month_sources(rng, month, bookings_per_month,
+                                          serial, rates, rooms)
+            write_month(prop_root, month, frames)
+            for key, value in truth.items():
+                totals[key] = totals.get(key, 0) + value
+
+        with open(os.path.join(prop_root, TRUTH), "w",
+                  encoding="utf-8") as out_file:
+            json.dump(dict(totals, seed=seed, months=months, start=start),
+                      out_file, indent=1)
+        truths[prop_root] = totals
+    return truths
+
+
+### Parsing command line arguments passed while running script
+args = ArgumentParser(description="Generate synthetic DPS inputs")
+args.add_argument('root', type=str,
+                  help='Folder receiving the dps_in and dps_out trees')
+args.add_argument('-m', '--months', type=int, dest='months', default=1,
+                  help='Number of months generated')
+args.add_argument('-n', '--bookings', type=int, dest='bookings',
+                  default=500, help='Bookings per month and property')
+args.add_argument('-p', '--properties', type=int, dest='properties',
+                  default=1, help='Number of properties')
+args.add_argument('-s', '--seed', type=int, dest='seed', default=0,
+                  help='Seed of the random generators')
+args.add_argument('-st', '--start', type=str, dest='start',
+                  default='2023-01', help='First month, as YYYY-MM')
+args.add_argument('-r', '--rooms', type=int, dest='rooms', default=12,
+                  help='Rooms of every property')
+
+
+def main(argv=None):
+    """Generate the inputs asked for on the command line."""
+    PARSER = args.parse_args(argv)
+    truths = generate(PARSER.root, PARSER.months, PARSER.bookings,
+                      PARSER.properties, PARSER.seed, PARSER.start,
+                      rooms=PARSER.rooms)
+    for prop_root, truth in truths.items():
+        print(prop_root, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,15 +14,36 @@ import pandas as pd
 from fuzzy_match import algorithims
 
 ## inbuilt module
+import csv
 import glob
+import io
+import multiprocessing as mp
 import os
+import pickle
+import re
 import sys
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 # Global variables to skip the header and footer
-# of the bank statement
+# of the bank statement, used when its table header is not found
 SKIPHEAD = 16
 SKIPFOOT = 38
 
+# Column locating the header of the transactions table of the bank statement
+BANK_TABLE = "Tran. Id"
+
+# Version of the parsing rules, part of the key of the parsed-input cache:
+# bump it whenever the converters or parse_column change their output
+SCHEMA_VERSION = 3
+
+# Strings read as missing values in the columns parsed without a converter
+# or a schema rule, the default list of pandas
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN",
+             "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN",
+             "None", "n/a", "nan", "null"]
+
 ## Functions useful for performing record linkages
 
 def trigram_bool(first, second, threshold):
@@ -140,11 +161,909 @@ def dupli_list(x):
     return list(set(np.nan_to_num(np.array(x), nan=0.0).astype(int)))
 
 
+## Functions scoring many names at once with the trigram algorithm
+
+def normalize_name(name):
+    """
+    Normalize a name the way the trigram algorithm reads it
+
+    This function lower-cases the name and keeps its words separated by a
+    single space. Missing and empty names give an empty string.
+
+    Parameters:
+    ----------
+    name: str
+        The name to be normalized.
+
+    Returns:
+    -------
+    str
+        The normalized name.
+
+    Examples:
+    --------
+    >>> normalize_name('  ATHUL  Sasidharan.')
+    'athul sasidharan'
+    """
+    if name is pd.NA or not name:
+        return ""
+    return " ".join(word for word in re.split(r"\W+", str(name).lower())
+                    if word.strip())
+
+def trigram_set(name):
+    """
+    Trigrams of a name as computed by the trigram algorithm
+
+    This function splits the name into lower-case words, pads every word
+    with two spaces in front and one at the back and returns the set of
+    its trigrams, exactly as ``fuzzy_match.algorithims.trigram`` does
+    before comparing two strings.
+
+    Parameters:
+    ----------
+    name: str
+        The name to be split.
+
+    Returns:
+    -------
+    set
+        The trigrams of the name.
+
+    Examples:
+    --------
+    >>> sorted(trigram_set('Bala'))
+    ['  b', ' ba', 'ala', 'bal', 'la ']
+    """
+    words = [f"  {word} " for word in normalize_name(name).split()]
+    return {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+
+def trigram_index(names, cache=None):
+    """
+    Build the trigram profiles of the distinct names
+
+    ...
+
+    This function profiles every distinct name only once and stores the
+    profiles as a sparse binary matrix in CSR form: the trigram ids of
+    the distinct name ``k`` are ``indices[indptr[k]:indptr[k + 1]]``.
+
+    Parameters:
+    ----------
+    names: array-like
+        The names to be profiled.
+
+    cache: TrigramCache, optional
+        The cache holding the trigrams of names seen before.
+
+    Returns:
+    -------
+    tuple
+        The code of the distinct name for every input name, followed by
+        the ``indptr`` and ``indices`` arrays of the profiles.
+
+    Examples:
+    --------
+    >>> codes, indptr, indices = trigram_index(['Bala', 'Athul', 'Bala'])
+    >>> codes
+    array([0, 1, 0])
+    """
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object),
+                                  use_na_sentinel=False)
+    profile = trigram_set if cache is None else cache.profile
+    vocab, indices, indptr = {}, [], [0]
+    for name in uniques:
+        indices.extend(vocab.setdefault(gram, len(vocab))
+                       for gram in profile(name))
+        indptr.append(len(indices))
+
+    return (codes.astype(np.int64), np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64))
+
+def gather_rows(indptr, indices, rows):
+    """
+    Fetch the entries of some rows of a CSR matrix
+
+    Parameters:
+    ----------
+    indptr, indices: np.ndarray
+        The CSR matrix.
+
+    rows: np.ndarray
+        The rows to be fetched.
+
+    Returns:
+    -------
+    tuple
+        The position in ``rows`` and the column of every entry.
+
+    Examples:
+    --------
+    >>> gather_rows(np.array([0, 2, 3]), np.array([5, 7, 5]), np.array([1, 0]))
+    (array([0, 1, 1]), array([5, 5, 7]))
+    """
+    starts = indptr[rows]
+    lens = indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lens)
+    offset = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+    return owner, indices[starts[owner] + offset]
+
+def trigram_overlap(indptr, indices, rows_a, rows_b, cells=2 ** 22):
+    """
+    Count the shared trigrams of every pair of profiles
+
+    ...
+
+    This function computes the sparse product of the profiles ``rows_a``
+    with the transposed profiles ``rows_b``: the entries of ``rows_b`` are
+    sorted by trigram id once, and the entries of ``rows_a`` are joined to
+    them with binary searches. The product is produced in blocks of
+    ``rows_a`` so that a block holds about ``cells`` counts.
+
+    Parameters:
+    ----------
+    indptr, indices: np.ndarray
+        The CSR profiles built by ``trigram_index``.
+
+    rows_a, rows_b: np.ndarray
+        The profiles to be compared.
+
+    cells: int, optional
+        The size of the blocks.
+
+    Yields:
+    -------
+    tuple
+        The position in ``rows_a`` of the first row of the block and the
+        block of shared trigram counts, of shape (rows, len(rows_b)).
+    """
+    b_own, b_col = gather_rows(indptr, indices, rows_b)
+    order = np.argsort(b_col, kind="stable")
+    b_own, b_col = b_own[order], b_col[order]
+    n_b = len(rows_b)
+    step = max(1, cells // max(n_b, 1))
+
+    for low in range(0, len(rows_a), step):
+        block = rows_a[low:low + step]
+        a_own, a_col = gather_rows(indptr, indices, block)
+        start = np.searchsorted(b_col, a_col, side="left")
+        count = np.searchsorted(b_col, a_col, side="right") - start
+        pos = (np.repeat(start - (np.cumsum(count) - count), count)
+               + np.arange(count.sum()))
+        inter = np.bincount(np.repeat(a_own, count) * n_b + b_own[pos],
+                            minlength=len(block) * n_b)
+        yield low, inter.reshape(len(block), n_b)
+
+def trigram_score(inter, size_a, size_b):
+    """
+    Trigram similarity from the counts of shared and own trigrams
+
+    This function returns the ratio of shared to distinct trigrams rounded
+    to six places like ``algorithims.trigram``. Pairs of names without any
+    trigram score 0.
+
+    Parameters:
+    ----------
+    inter: np.ndarray
+        The number of shared trigrams.
+
+    size_a, size_b: np.ndarray
+        The number of trigrams of either name.
+
+    Returns:
+    -------
+    np.ndarray
+        The similarity between 0 and 1.
+
+    Examples:
+    --------
+    >>> trigram_score(np.array([2]), np.array([5]), np.array([3]))
+    array([0.333333])
+    """
+    union = size_a + size_b - inter
+    return np.round(np.where(union > 0, inter / np.maximum(union, 1), 0.0),
+                    6)
+
+def trigram_pairwise(first, second, cache=None):
+    """
+    Trigram similarity of aligned pairs of names
+
+    ...
+
+    This function scores ``first[i]`` against ``second[i]`` for every
+    ``i``. Every distinct name is profiled once and the shared trigrams of
+    all the distinct pairs are counted in one vectorized pass.
+    ``trigram_pairwise(first, second) > threshold`` gives the same result
+    as calling ``trigram_bool`` on every pair.
+
+    Parameters:
+    ----------
+    first: array-like
+        The first names to be compared.
+
+    second: array-like
+        The second names to be compared, as long as ``first``.
+
+    cache: TrigramCache, optional
+        The cache memoizing the trigrams of the names and the scores of
+        the pairs. Only the pairs missing from it are scored.
+
+    Returns:
+    -------
+    np.ndarray
+        The similarity of every pair.
+
+    Examples:
+    --------
+    >>> trigram_pairwise(['Athul'], ['Athul Sasidharan'])
+    array([0.352941])
+    """
+    first, second = list(first), list(second)
+    if cache is None:
+        return score_pairs(first, second)
+
+    scores = np.array([cache.known_score(a, b)
+                       for a, b in zip(first, second)], dtype=float)
+    missing = np.flatnonzero(np.isnan(scores))
+    if len(missing):
+        fresh = score_pairs([first[i] for i in missing],
+                            [second[i] for i in missing], cache)
+        scores[missing] = fresh
+        for i, score in zip(missing, fresh):
+            cache.store_score(first[i], second[i], score)
+
+    return scores
+
+def score_pairs(first, second, cache=None):
+    """
+    Vectorized core of ``trigram_pairwise``
+
+    Parameters:
+    ----------
+    first, second: list
+        The names to be compared pairwise.
+
+    cache: TrigramCache, optional
+        The cache holding the trigrams of names seen before.
+
+    Returns:
+    -------
+    np.ndarray
+        The similarity of every pair.
+    """
+    if not first:
+        return np.zeros(0)
+
+    codes, indptr, indices = trigram_index(first + second, cache)
+    n_names = len(indptr) - 1
+    pairs, inverse = np.unique(codes[:len(first)] * n_names
+                               + codes[len(first):], return_inverse=True)
+    rows_a, rows_b = pairs // n_names, pairs % n_names
+
+    # Every shared (pair, trigram) key shows up once from either side
+    n_gram = int(indices.max()) + 1 if len(indices) else 1
+    a_own, a_col = gather_rows(indptr, indices, rows_a)
+    b_own, b_col = gather_rows(indptr, indices, rows_b)
+    keys = np.sort(np.concatenate([a_own * n_gram + a_col,
+                                   b_own * n_gram + b_col]))
+    shared = keys[1:][keys[1:] == keys[:-1]] // n_gram
+    inter = np.bincount(shared, minlength=len(pairs))
+
+    sizes = np.diff(indptr)
+    return trigram_score(inter, sizes[rows_a], sizes[rows_b])[inverse]
+
+def trigram_matrix(first, second, cache=None):
+    """
+    Trigram similarity of every name against every other name
+
+    ...
+
+    This function returns the full similarity matrix between two arrays of
+    names, computed through the sparse product of their trigram profiles.
+    The matrix is dense, use ``trigram_topk`` when both arrays are long.
+
+    Parameters:
+    ----------
+    first: array-like
+        The names indexing the rows.
+
+    second: array-like
+        The names indexing the columns.
+
+    cache: TrigramCache, optional
+        The cache holding the trigrams of names seen before.
+
+    Returns:
+    -------
+    np.ndarray
+        The matrix of shape (len(first), len(second)).
+
+    Examples:
+    --------
+    >>> trigram_matrix(['Athul'], ['Athul Sasidharan', 'Bala'])
+    array([[0.352941, 0.      ]])
+    """
+    first, second = list(first), list(second)
+    codes, indptr, indices = trigram_index(first + second, cache)
+    rows_a, inv_a = np.unique(codes[:len(first)], return_inverse=True)
+    rows_b, inv_b = np.unique(codes[len(first):], return_inverse=True)
+
+    sizes = np.diff(indptr)
+    scores = np.zeros((len(rows_a), len(rows_b)))
+    for low, inter in trigram_overlap(indptr, indices, rows_a, rows_b):
+        block = rows_a[low:low + len(inter)]
+        scores[low:low + len(inter)] = trigram_score(
+            inter, sizes[block][:, None], sizes[rows_b][None, :])
+
+    return scores[np.ix_(inv_a, inv_b)]
+
+def trigram_topk(first, second, k=1, threshold=0.0, cache=None):
+    """
+    Best trigram matches of every name among other names
+
+    ...
+
+    This function compares every name of ``first`` with every name of
+    ``second`` through the sparse product of their trigram profiles and
+    keeps, for every name of ``first``, the ``k`` best names of
+    ``second`` whose similarity is above the threshold. Ties are broken
+    by position in ``second``.
+
+    Parameters:
+    ----------
+    first: array-like
+        The names to be matched, e.g. front-desk guest names.
+
+    second: array-like
+        The candidate names, e.g. OTA reservation names.
+
+    k: int, optional
+        The number of matches kept for every name.
+
+    threshold: float, optional
+        The similarity a match must exceed, as in ``trigram_bool``.
+
+    cache: TrigramCache, optional
+        The cache holding the trigrams of names seen before.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The columns "first" and "second" holding positions in the inputs
+        and "score" holding the similarity.
+
+    Examples:
+    --------
+    >>> trigram_topk(['Athul'], ['Bala', 'Athul Sasidharan'])
+       first  second     score
+    0      0       1  0.352941
+    """
+    first, second = list(first), list(second)
+    codes, indptr, indices = trigram_index(first + second, cache)
+    rows_a, inv_a = np.unique(codes[:len(first)], return_inverse=True)
+    rows_b, inv_b = np.unique(codes[len(first):], return_inverse=True)
+    k = min(k, len(second))
+    if k < 1:
+        rows_a = rows_a[:0]
+
+    sizes = np.diff(indptr)
+    pos_a, pos_b, best = [], [], []
+    for low, inter in trigram_overlap(indptr, indices, rows_a, rows_b):
+        block = rows_a[low:low + len(inter)]
+        union = sizes[block][:, None] + sizes[rows_b][None, :] - inter
+
+        # k best positions of "second" per name, ties by position: the
+        # six-place scores and the positions are packed in one integer key
+        key = np.rint(inter / np.maximum(union, 1) * 1e6) \
+            .astype(np.int64)[:, inv_b]
+        key *= len(second)
+        key -= np.arange(len(second))
+        top = np.argpartition(key, len(second) - k, axis=1)[:, -k:]
+        top_key = np.take_along_axis(key, top, axis=1)
+        order = np.argsort(-top_key, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_score = (np.take_along_axis(top_key, order, axis=1) + top) \
+            // len(second) / 1e6
+        keep = top_score > threshold
+        pos_a.append(np.nonzero(keep)[0] + low)
+        pos_b.append(top[keep])
+        best.append(top_score[keep])
+
+    found = pd.DataFrame({
+        "pos_a": np.concatenate(pos_a) if pos_a else np.zeros(0, int),
+        "second": np.concatenate(pos_b) if pos_b else np.zeros(0, int),
+        "score": np.concatenate(best) if best else np.zeros(0)})
+
+    # Expand the distinct names back to the positions of "first"
+    found = pd.merge(pd.DataFrame({"pos_a": inv_a.ravel(),
+                                   "first": np.arange(len(first))}),
+                     found, on="pos_a")
+
+    return found.sort_values(by=["first", "score", "second"],
+                             ascending=[True, False, True], kind="stable") \
+        [["first", "second", "score"]].reset_index(drop=True)
+
+
+## Cache shared by the matching stages comparing names
+
+class LRUCache:
+    """
+    Dictionary bounded in size, evicting the least recently used keys
+
+    ...
+
+    Attributes:
+    ----------
+    maxsize: int
+        The number of keys kept.
+
+    hits, misses: int
+        The number of lookups that found, or did not find, their key.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits, self.misses = 0, 0
+
+    def get(self, key, default=None):
+        """Return the value of the key and mark it as recently used."""
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Store the value, evicting the least recently used keys."""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def stats(self):
+        """Return the counters and the size of the cache."""
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.data), "maxsize": self.maxsize}
+
+
+class TrigramCache:
+    """
+    Memoized name normalization, trigram profiles and pair scores
+
+    ...
+
+    One instance is meant to be shared by all the matching stages of a run,
+    so that every guest name is normalized and profiled once and every
+    pair of names is scored once. All three caches are bounded and evict
+    the least recently used entries. The profiles and the scores can be
+    saved to disk and loaded by the next run, so repeat guests across
+    monthly runs are not profiled again.
+
+    Parameters:
+    ----------
+    path: str, optional
+        The file the cache is loaded from, if it exists, and saved to.
+
+    max_names: int, optional
+        The number of raw names kept with their normalized form.
+
+    max_profiles: int, optional
+        The number of trigram profiles kept.
+
+    max_pairs: int, optional
+        The number of pair scores kept.
+
+    Examples:
+    --------
+    >>> cache = TrigramCache()
+    >>> trigram_pairwise(['ATHUL'], ['Athul S'], cache=cache)
+    array([0.75])
+    >>> cache.stats()['pairs']
+    {'hits': 0, 'misses': 1, 'size': 1, 'maxsize': 1000000}
+    """
+
+    def __init__(self, path=None, max_names=100_000, max_profiles=100_000,
+                 max_pairs=1_000_000):
+        self.path = path
+        self.names = LRUCache(max_names)
+        self.profiles = LRUCache(max_profiles)
+        self.pairs = LRUCache(max_pairs)
+
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as cache_file:
+                saved = pickle.load(cache_file)
+            for key, value in saved["profiles"]:
+                self.profiles.put(key, value)
+            for key, value in saved["pairs"]:
+                self.pairs.put(key, value)
+
+    def normalize(self, name):
+        """Return the normalized form of the name."""
+        if not isinstance(name, str):
+            return normalize_name(name)
+        norm = self.names.get(name)
+        if norm is None:
+            norm = normalize_name(name)
+            self.names.put(name, norm)
+        return norm
+
+    def profile(self, name):
+        """Return the trigrams of the name."""
+        norm = self.normalize(name)
+        grams = self.profiles.get(norm)
+        if grams is None:
+            grams = frozenset(trigram_set(norm))
+            self.profiles.put(norm, grams)
+        return grams
+
+    def pair_key(self, first, second):
+        """Return the key of a pair, the score being symmetric."""
+        first, second = self.normalize(first), self.normalize(second)
+        return (first, second) if first <= second else (second, first)
+
+    def known_score(self, first, second):
+        """Return the memoized score of the pair or NaN."""
+        return self.pairs.get(self.pair_key(first, second), np.nan)
+
+    def store_score(self, first, second, score):
+        """Memoize the score of the pair."""
+        self.pairs.put(self.pair_key(first, second), float(score))
+
+    def stats(self):
+        """Return the hit and miss counters of the three caches."""
+        return {"names": self.names.stats(),
+                "profiles": self.profiles.stats(),
+                "pairs": self.pairs.stats()}
+
+    def save(self, path=None):
+        """Write the profiles and the pair scores to disk."""
+        path = self.path if path is None else path
+        with open(path, "wb") as cache_file:
+            pickle.dump({"profiles": list(self.profiles.data.items()),
+                         "pairs": list(self.pairs.data.items())},
+                        cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
 ## Base function called by wrapper functions for loading data from various
 ## sources
 
+def file_list(folder_path, FILE_NO=0):
+    """
+    List the files of a source folder in a stable order.
+
+    ...
+
+    Files are sorted by path so that the row order of the combined dataframe
+    does not depend on the order in which the filesystem lists them. If fewer
+    files than FILE_NO are present the user is asked whether to continue.
+
+    Parameters:
+    ----------
+    folder_path: str
+        The path of the containing directory.
+
+    FILE_NO: int or None, optional
+        The number of files to be processed, None for all of them.
+
+    Returns:
+    -------
+    list
+        The sorted paths of the files to be read.
+
+    Examples:
+    --------
+    >>> file_list('path_to_directory', None)
+    ['path_to_directory/a.csv', 'path_to_directory/b.csv']
+    """
+    paths = []
+    if isinstance(folder_path, str):
+        paths = sorted(glob.glob(os.path.join(folder_path, "*")))
+
+    if FILE_NO is None:
+        FILE_NO = len(paths)
+
+    if len(paths) < FILE_NO:
+        try:
+            print(f"Insufficient files. {len(paths)} are present in folder.\
+                  Do you want to continue? (Y/N)")
+            check = sys.stdin.readline().strip()
+            if check == '':
+                raise ValueError("Invalid Input")
+            if check.upper() == "Y":
+                pass
+            if check.upper() == "N":
+                raise SystemExit("Exiting the program")
+        except ValueError as inp:
+            print(inp)
+        except SystemExit as inp:
+            print(inp)
+            sys.exit()
+
+    return paths[:FILE_NO]
+
+
+def table_bounds(lines, marker):
+    """
+    Locate the table of a csv file wrapped in a preamble and a footer.
+
+    ...
+
+    The header of the table is the first line holding a cell equal to the
+    marker. The table ends at the first line after it that is blank or does
+    not have as many cells as the header.
+
+    Parameters:
+    ----------
+    lines: list
+        The lines of the file.
+
+    marker: str
+        The name of a column of the table, e.g. "Tran. Id".
+
+    Returns:
+    -------
+    tuple or None
+        The line of the header and the line after the last row of the
+        table, None when no line holds the marker.
+
+    Examples:
+    --------
+    >>> table_bounds(['Statement,,', 'No.,Tran. Id,Amt', '1,S1,10', '',
+    ...               'Legends'], 'Tran. Id')
+    (1, 3)
+    """
+    start = width = None
+    for number, cells in enumerate(csv.reader(lines)):
+        if start is None:
+            if marker in (cell.strip() for cell in cells):
+                start, width = number, len(cells)
+        elif len(cells) != width or not "".join(cells).strip():
+            return start, number
+    if start is None:
+        return None
+    return start, len(lines)
+
+
+def read_table(path, encode, marker):
+    """
+    Read the lines of the table of a csv file, see table_bounds.
+
+    Returns:
+    -------
+    io.StringIO or None
+        The header and the rows of the table, None when the marker is not
+        found.
+    """
+    with open(path, encoding=encode, newline="") as in_file:
+        lines = in_file.read().splitlines(keepends=True)
+    bounds = table_bounds(lines, marker)
+    if bounds is None:
+        return None
+    return io.StringIO("".join(lines[bounds[0]:bounds[1]]))
+
+
+def read_file(path, conv=None, encode=None, skphead=0, skpfoot=0,
+              schema=None, table=None, usecols=None):
+    """
+    Read a single csv or excel file into a dataframe.
+
+    ...
+
+    Kept at module level so that it can be sent to the worker processes of
+    the loader pool. A csv file with a schema is read with the columns of
+    the schema as raw strings, only the other columns getting the default
+    missing values, and the schema is applied afterwards. Excel files and
+    csv files without a schema are parsed with the converter functions.
+
+    A csv file with a table marker is cut down to its table before being
+    parsed, so the rows to skip are found whatever the length of the
+    preamble and the footer, and the C parser can be used: skipfooter
+    needs the python one. Without the marker in the file, skphead and
+    skpfoot are used.
+
+    Only the columns in usecols are parsed, the ones missing from a file
+    are ignored.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the file.
+
+    conv: dict, optional
+        The dictionary containing the converter functions.
+
+    encode: str, optional
+        The encoding of the file, used for csv files only.
+
+    skphead: int, optional
+        The number of rows to be skip.
+
+    skpfoot: int, optional
+        The number of rows to be skip from the bottom.
+
+    schema: dict, optional
+        The parsing rules of the columns, see parse_column.
+
+    table: str, optional
+        The name of a column of the table, locating its header.
+
+    usecols: list, optional
+        The columns to be read, None for all of them.
+
+    Returns:
+    -------
+    DataFrame
+        The dataframe read from the file.
+
+    Examples:
+    --------
+    >>> read_file('path_to_file.csv', conv=conv, encode='utf-8')
+    DataFrame
+    """
+    keep = None if usecols is None else set(usecols).__contains__
+    if not is_csv(path):
+        frame = pd.read_excel(path, converters=conv, skiprows=skphead,
+                              skipfooter=skpfoot, usecols=keep)
+        return date_columns(frame, schema)
+
+    source = read_table(path, encode, table) if table else None
+    if source is None:
+        source = path
+    else:
+        skphead = skpfoot = 0
+
+    if schema is None:
+        return pd.read_csv(source, converters=conv, encoding=encode,
+                           skiprows=skphead, skipfooter=skpfoot,
+                           usecols=keep)
+
+    header = pd.read_csv(source, encoding=encode, skiprows=skphead,
+                         nrows=0, usecols=keep).columns
+    if isinstance(source, io.StringIO):
+        source.seek(0)
+    frame = pd.read_csv(source, encoding=encode, skiprows=skphead,
+                        skipfooter=skpfoot, usecols=keep,
+                        keep_default_na=False,
+                        dtype={col: str for col in header if col in schema},
+                        na_values={col: NA_VALUES for col in header
+                                   if col not in schema})
+    return apply_schema(frame, schema)
+
+
+def is_csv(path):
+    """Check whether the file is read with the csv parser."""
+    return path.split(".")[-1] == "csv"
+
+
+def process_pool(workers):
+    """
+    Create the pool parsing csv files in separate processes.
+
+    ...
+
+    Worker processes are forked where the platform allows it, so they start
+    with the modules already imported instead of importing them again.
+    Elsewhere the files are parsed on threads.
+    """
+    if "fork" in mp.get_all_start_methods():
+        return ProcessPoolExecutor(workers, mp_context=mp.get_context("fork"))
+    return ThreadPoolExecutor(workers)
+
+
+def read_files(jobs, workers=None, cache=None):
+    """
+    Read many files concurrently and return the frames in job order.
+
+    ...
+
+    Csv files are parsed on a process pool and excel files on a thread pool.
+    Every file is submitted before any result is collected and the results
+    are collected in submission order, so the output does not depend on
+    which worker finishes first.
+
+    Parameters:
+    ----------
+    jobs: list
+        The (path, reader options) pairs, the options being the keyword
+        arguments of read_file.
+
+    workers: int, optional
+        The number of workers per pool, None for the number of CPUs. With one
+        worker the files are read sequentially.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files, evicted down to its size limit once all
+        the files are read.
+
+    Returns:
+    -------
+    list
+        The dataframes, one per job.
+
+    Examples:
+    --------
+    >>> read_files([('a.csv', {}), ('b.xlsx', {'skphead': 2})], workers=4)
+    [DataFrame, DataFrame]
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        frames = [load_file(path, options, cache) for path, options in jobs]
+    else:
+        frames = read_pooled(jobs, workers, cache)
+
+    if cache is not None:
+        cache.evict()
+    return frames
+
+
+def read_pooled(jobs, workers, cache=None):
+    """Read the csv files on processes and the excel files on threads."""
+    n_csv = sum(is_csv(path) for path, _ in jobs)
+    n_excel = len(jobs) - n_csv
+    procs = process_pool(min(workers, n_csv)) if n_csv else None
+    threads = ThreadPoolExecutor(min(workers, n_excel)) if n_excel else None
+    try:
+        futures = [(procs if is_csv(path) else threads).submit(
+                   load_file, path, options, cache) for path, options in jobs]
+        return [future.result() for future in futures]
+    finally:
+        for pool in (procs, threads):
+            if pool is not None:
+                pool.shutdown()
+
+
+def load_file(path, options, cache=None):
+    """
+    Read a single file, going through the parsed-input cache if given.
+
+    ...
+
+    The cache key covers the content of the file, SCHEMA_VERSION and the
+    reader options, so a hit is always a frame parsed the same way.
+
+    Parameters:
+    ----------
+    path: str
+        The path of the file.
+
+    options: dict
+        The keyword arguments of read_file.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    Returns:
+    -------
+    DataFrame
+        The dataframe read from the file or from the cache.
+
+    Examples:
+    --------
+    >>> load_file('path_to_file.csv', Readers['booking.com'], cache)
+    DataFrame
+    """
+    if cache is None:
+        return read_file(path, **options)
+
+    key = cache.key(path, options, SCHEMA_VERSION)
+    frame = cache.get(key)
+    if frame is None:
+        frame = read_file(path, **options)
+        cache.put(key, frame)
+    return frame
+
+
+def concat_frames(frames):
+    """Concatenate the frames read from one source in a single copy."""
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=0, ignore_index=True)
+
+
 def create_frame(folder_path, FILE_NO=0, conv=None, encode=None, skphead=0,
-                 skpfoot=0):
+                 skpfoot=0, workers=None, schema=None, cache=None,
+                 table=None, usecols=None):
     """
     Function takes the folder path and convert the datasets into
     dataframe.
@@ -153,7 +1072,8 @@ def create_frame(folder_path, FILE_NO=0, conv=None, encode=None, skphead=0,
     
     This function takes the following parameters and converts the datasets
     and converts it into respective dataframe by checking the extension of the
-    file. If their are multiple file it concatinates dataframe with axis=0.
+    file. If their are multiple file they are read concurrently and the
+    dataframes are concatinated once with axis=0, in the order of the files.
 
     Parameters:
     ----------
@@ -172,6 +1092,21 @@ def create_frame(folder_path, FILE_NO=0, conv=None, encode=None, skphead=0,
     skpfoot: int, optional
         The number of rows to be skip from the bottom.
 
+    workers: int, optional
+        The number of workers reading files, None for the number of CPUs.
+
+    schema: dict, optional
+        The parsing rules used in place of the converters for csv files.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    table: str, optional
+        The name of a column locating the header of the table in csv files.
+
+    usecols: list, optional
+        The columns to be read, None for all of them.
+
     Returns:
     -------
     DataFrame
@@ -182,45 +1117,15 @@ def create_frame(folder_path, FILE_NO=0, conv=None, encode=None, skphead=0,
     >>> create_frame('path_to_file.csv', conv=conv, encode='utf-8')
     DataFrame
     """
-    if isinstance(folder_path, str):
-        file_list = glob.glob(os.path.join(folder_path, "*"))
-  
-    if FILE_NO is None:
-        FILE_NO = len(file_list)
-
-    if len(file_list) < FILE_NO:
-        try:
-            print(f"Insufficient files. {len(file_list)} are present in folder.\
-                  Do you want to continue? (Y/N)")
-            check = sys.stdin.readline().strip()
-            if check == '':
-                raise ValueError("Invalid Input")
-            if check.upper() == "Y":
-                pass
-            if check.upper() == "N":
-                raise SystemExit("Exiting the program")
-        except ValueError as inp:
-            print(inp)
-        except SystemExit as inp:
-            print(inp)
-            sys.exit()
-    
-    conc_frame = pd.DataFrame()
-
-    for _, folder_paths in enumerate(file_list[:FILE_NO]):
-        print(folder_paths)
-        spt = folder_paths.split(".")
-        if spt[-1] == "csv":
-            combframe = pd.read_csv(folder_paths, converters=conv,
-                                    encoding=encode, skiprows=skphead,
-                                    skipfooter=skpfoot)
-        else:
-            combframe = pd.read_excel(folder_paths, converters=conv,
-                                      skiprows=skphead, skipfooter=skpfoot)
-        conc_frame = pd.concat([conc_frame, combframe], axis=0,
-                               ignore_index=True)
+    options = {"conv": conv, "encode": encode, "skphead": skphead,
+               "skpfoot": skpfoot, "schema": schema, "table": table,
+               "usecols": usecols}
+    paths = file_list(folder_path, FILE_NO)
+    for path in paths:
+        print(path)
 
-    return conc_frame
+    return concat_frames(read_files([(path, options) for path in paths],
+                                    workers, cache))
 
 
 ## Converter functions for corresponding wrapper functions for loading data
@@ -624,7 +1529,7 @@ Conv = {
         "Extras Payment Method": str,
         "Total Amount Paid": float64_wrapper,
         "Status": str,
-        "UPI Details": fd_upi_details,
+        "UPI Details": str,
     },
     'bank_statement': {
         "Deposit Amt (INR)": bs_dep_amt,
@@ -648,10 +1553,626 @@ Conv = {
 
 }
 
+## Vectorized parsing rules replacing the converter functions for csv files
+
+def parse_dates(values, format=None, errors="raise"):
+    """
+    Parse date strings into midnight datetime64 values.
+
+    ...
+
+    Every distinct string is parsed once and the results are spread back
+    over the column, exports repeating the same few hundred dates over
+    thousands of rows. The dates are kept as datetime64[ns] at midnight,
+    the day resolution pandas can hold, so comparing and joining them
+    compares integers.
+
+    Parameters:
+    ----------
+    values: pd.Series
+        The date strings, missing values becoming pd.NaT.
+
+    format: str, optional
+        The date format, None to infer the format of every string.
+
+    errors: str, optional
+        "raise" or "coerce" invalid dates to pd.NaT.
+
+    Returns:
+    -------
+    pd.Series
+        The datetime64[ns] dates.
+
+    Examples:
+    --------
+    >>> parse_dates(pd.Series(["01-02-2023", None]), "%d-%m-%Y")
+    0   2023-02-01
+    1          NaT
+    dtype: datetime64[ns]
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(uniques, format=format or "mixed",
+                            errors=errors).normalize()
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT),
+                     index=values.index, name=values.name)
+
+
+def parse_column(values, rule):
+    """
+    Parse a column of raw strings with one declarative rule.
+
+    ...
+
+    The column is read as strings by the C parser and every rule runs as a
+    single vectorized operation, producing the same values as the converter
+    functions of Conv. The rule is a dictionary with the keys:
+
+    - dtype: "str", "int32", "int64", "float64", "date", "list" or
+      "tokens".
+    - strip: the substring removed from every value before parsing, e.g.
+      "'" for quoted ids, "," for thousand separators or "INR" for prices.
+    - format: the date format, None to infer the format of every value.
+    - sep: the separators of "list" and "tokens" columns.
+
+    An empty cell stays "" for "str", becomes NaN for numbers and "list",
+    pd.NaT for "date" and an empty list for "tokens". Dates are parsed into
+    datetime64 by parse_dates.
+
+    Parameters:
+    ----------
+    values: pd.Series
+        The raw strings of the column.
+
+    rule: dict
+        The parsing rule of the column.
+
+    Returns:
+    -------
+    pd.Series
+        The parsed column.
+
+    Examples:
+    --------
+    >>> parse_column(pd.Series(["INR 1234.5", "INR 20"]),
+    ...              {"dtype": "float64", "strip": "INR"})
+    0    1234.5
+    1      20.0
+    dtype: float64
+    """
+    dtype = rule["dtype"]
+    if rule.get("strip"):
+        values = values.str.replace(rule["strip"], "", regex=False)
+
+    if dtype == "str":
+        return values
+
+    blank = values == ""
+    if dtype == "tokens":
+        sep = re.escape(rule.get("sep", ","))
+        return values.str.replace(" ", "", regex=False) \
+                     .str.findall(f"[^{sep}]+")
+
+    values = values.mask(blank)
+    if dtype == "list":
+        return values.str.replace(" ", "", regex=False) \
+                     .str.split(rule.get("sep", ","))
+    if dtype == "date":
+        return parse_dates(values, rule.get("format"))
+    if blank.any():
+        return values.astype("float64")
+    return values.astype(dtype)
+
+
+def date_columns(frame, schema):
+    """
+    Turn the dates returned by the converters into datetime64 values.
+
+    ...
+
+    Files parsed with the converter functions get datetime.date objects in
+    the date columns of the schema, these are converted to the midnight
+    datetime64 values parse_column returns.
+    """
+    for column, rule in (schema or {}).items():
+        if rule["dtype"] == "date" and column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column]).dt.normalize()
+    return frame
+
+
+def apply_schema(frame, schema):
+    """
+    Parse the columns of a dataframe read as strings with their rules.
+
+    Parameters:
+    ----------
+    frame: pd.DataFrame
+        The dataframe holding the raw strings of the schema columns.
+
+    schema: dict
+        The parsing rule of every column, columns missing from the
+        dataframe are ignored.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The same dataframe with the parsed columns.
+
+    Examples:
+    --------
+    >>> apply_schema(frame, Schema['booking.com'])
+    DataFrame
+    """
+    for column, rule in schema.items():
+        if column in frame.columns:
+            frame[column] = parse_column(frame[column], rule)
+    return frame
+
+
+def upi_payments(details, unit=1):
+    """
+    Parse the UPI details of the bookings into ragged payment arrays.
+
+    ...
+
+    A UPI detail string lists "date, payer; amount" entries separated by
+    "," or ";". The digit only entries are extracted with one regex over
+    the whole column and alternate between payment date and amount, as in
+    upi_date_time. The payments of all the bookings are held in flat
+    arrays: the payments of the booking at position i are the entries
+    offsets[i] to offsets[i + 1]. A trailing date without an amount is
+    left out.
+
+    Parameters:
+    ----------
+    details: pd.Series
+        The raw "UPI Details" strings of the front-desk dataset.
+
+    unit: int, optional
+        The amount of one rupee: 1 for rupees, PAISE for paise.
+
+    Returns:
+    -------
+    dict
+        "row_id": the index of every booking, "offsets": the int64 bounds of
+        the payments of every booking, "date": the datetime64 payment dates,
+        pd.NaT when invalid, and "amount": the int64 amounts.
+
+    Examples:
+    --------
+    >>> upi = upi_payments(pd.Series(["28022023,Bala;1470,06022023,Bala;1823",
+    ...                               ""]))
+    >>> upi["offsets"], upi["amount"]
+    (array([0, 2, 2]), array([1470, 1823]))
+    """
+    tokens = details.astype(str).str.replace(" ", "", regex=False) \
+        .str.extractall(r"(?<![^,;])(\d+)(?![^,;])")[0]
+    row = tokens.index.get_level_values(0)
+    pos = tokens.index.get_level_values(1)
+    rows = pd.Index(details.index)
+
+    # Pair the k-th date of a booking with its k-th amount
+    dates = pd.Series(tokens.values[pos % 2 == 0],
+                      index=[row[pos % 2 == 0], pos[pos % 2 == 0] // 2])
+    amounts = pd.Series(tokens.values[pos % 2 == 1],
+                        index=[row[pos % 2 == 1], pos[pos % 2 == 1] // 2])
+    dates = dates.loc[amounts.index]
+
+    counts = np.bincount(rows.get_indexer(amounts.index.get_level_values(0)),
+                         minlength=len(rows))
+    return {
+        "row_id": rows.values,
+        "offsets": np.concatenate([[0], np.cumsum(counts)]),
+        "date": parse_dates(dates.reset_index(drop=True), "%d%m%Y",
+                            errors="coerce").values,
+        "amount": pd.to_numeric(amounts).values.astype("int64") * unit,
+    }
+
+
+def bank_refs(remarks):
+    """
+    Extract the reference number of bank transactions from their remarks.
+
+    Examples:
+    --------
+    >>> bank_refs(pd.Series(["UPI/500001/x@ybl", "NEFT-N0123-MMT"]))
+    0    500001
+    1     N0123
+    dtype: object
+    """
+    return remarks.str.replace("-", "|").str.replace("/", "|") \
+        .str.split("|").str[1]
+
+
+# This dictonary holds the parsing rules of the csv exports, one per column
+# of the 'converter functions' in Conv. Excel files keep the converters since
+# their cells are not read as strings
+Schema = {
+    'front_desk': {
+        "Name": {"dtype": "str"},
+        "Phone": {"dtype": "str"},
+        "Nights": {"dtype": "int32"},
+        "Adults": {"dtype": "int32"},
+        "Mode of Booking": {"dtype": "str"},
+        "Rooms Booked": {"dtype": "list", "sep": ","},
+        "Room Bill (Incl. GST)": {"dtype": "float64"},
+        "Extra Person Charges (Incl. GST)": {"dtype": "float64"},
+        "Advance Paid": {"dtype": "float64"},
+        "Advance Payment Method": {"dtype": "str"},
+        "Check-in Payment Method": {"dtype": "str"},
+        "Paid at Check-out": {"dtype": "float64"},
+        "Paid at Check-in": {"dtype": "float64"},
+        "Check-out Payment Method": {"dtype": "str"},
+        "Extras Paid": {"dtype": "float64"},
+        "Extras Payment Method": {"dtype": "str"},
+        "Total Amount Paid": {"dtype": "float64"},
+        "Status": {"dtype": "str"},
+        "UPI Details": {"dtype": "str"},
+    },
+    'bank_statement': {
+        "Deposit Amt (INR)": {"dtype": "float64", "strip": ","},
+        "Transaction Date": {"dtype": "date"},
+        },
+    'booking.com': {
+        "Book Number": {"dtype": "str"},
+        "Check-in": {"dtype": "date"},
+        "Check-out": {"dtype": "date"},
+        "Price": {"dtype": "float64", "strip": "INR"},
+        "Commission Amount": {"dtype": "float64", "strip": "INR"},
+    },
+    'ingo_mmt_data': {
+        "PNR": {"dtype": "str", "strip": "'"},
+        "Checkin Date": {"dtype": "date"},
+        "Checkout Date": {"dtype": "date"},
+        "Payments Date": {"dtype": "date", "format": "%d-%m-%Y"},
+        "Bank Ref No": {"dtype": "str", "strip": "'"},
+        "Commission Amount": {"dtype": "float64", "strip": "INR"},
+    },
+
+}
+
+## Compact dtypes of the cleaned frames: low-cardinality text is held as
+## categoricals sharing one dictionary and counts in the narrowest dtype
+
+# This dictonary holds, for every frame, the low-cardinality text columns
+# stored as categoricals of the shared dictionary ("category"), the repeated
+# text columns stored as categoricals of their own ("text") and the count
+# columns downcast ("count")
+Compact = {
+    'front_desk': {
+        "category": ["Mode of Booking", "Status", "Advance Payment Method",
+                     "Check-in Payment Method", "Check-out Payment Method",
+                     "Extras Payment Method"],
+        "count": ["Adults", "Children", "Nights"],
+    },
+    'booking.com': {
+        "category": ["Status"],
+        "count": ["Rooms"],
+    },
+    'ingo_mmt_data': {
+        "category": ["Brand", "Booking Status"],
+        "count": [],
+    },
+    'paytm': {
+        "category": ["Status", "Channel"],
+        "text": ["Transaction_Date_settlement", "Transaction_Date_transaction",
+                 "Settled_Date"],
+        "count": [],
+    },
+    'bank_statement': {
+        "category": [],
+        "count": [],
+    },
+}
+
+
+def text_column(values):
+    """Check whether every value of a column is a string or missing."""
+    present = values.dropna()
+    return values.dtype == object \
+        and present.map(type).eq(str).all()
+
+
+def shared_categories(frames, compact=Compact):
+    """
+    Build the categorical dtype shared by the text columns of all frames.
+
+    ...
+
+    Sharing one dictionary keeps the codes of a value the same in every
+    frame, so categoricals of different sources compare and join on codes.
+
+    Parameters:
+    ----------
+    frames: dict
+        The dataframes keyed as compact.
+
+    compact: dict, optional
+        The columns to compact in every frame.
+
+    Returns:
+    -------
+    pd.CategoricalDtype
+        The sorted strings of all the text columns.
+
+    Examples:
+    --------
+    >>> shared_categories({'booking.com': bc_df})
+    CategoricalDtype(categories=['cancelled', 'ok'], ordered=False)
+    """
+    values = set()
+    for name, frame in frames.items():
+        for col in compact.get(name, {}).get("category", []):
+            if col in frame and text_column(frame[col]):
+                values.update(frame[col].dropna().unique())
+    return pd.CategoricalDtype(sorted(values))
+
+
+def compact_frame(frame, spec, dtype):
+    """
+    Store the text columns of a frame as categoricals and narrow its counts.
+
+    ...
+
+    Text columns get a dictionary of their own. Count columns without
+    missing values become the smallest integer dtype holding them, the
+    others float32, which holds small counts exactly.
+
+    Parameters:
+    ----------
+    frame: pd.DataFrame
+        The dataframe to compact.
+
+    spec: dict
+        The "category", "text" and "count" columns of the frame.
+
+    dtype: pd.CategoricalDtype
+        The dtype shared by the text columns, see shared_categories.
+
+    Returns:
+    -------
+    pd.DataFrame
+        The compacted dataframe.
+
+    Examples:
+    --------
+    >>> compact_frame(fd_frame, Compact['front_desk'], dtype)
+    DataFrame
+    """
+    frame = frame.copy()
+    for col in spec.get("category", []):
+        if col in frame and text_column(frame[col]):
+            frame[col] = frame[col].astype(dtype)
+    for col in spec.get("text", []):
+        if col in frame and text_column(frame[col]):
+            frame[col] = frame[col].astype("category")
+    for col in spec.get("count", []):
+        if col in frame and pd.api.types.is_numeric_dtype(frame[col]):
+            integer = pd.api.types.is_integer_dtype(frame[col])
+            frame[col] = pd.to_numeric(
+                frame[col], downcast="integer" if integer else "float")
+    return frame
+
+
+def compact_frames(frames, compact=Compact, report=False):
+    """
+    Compact the cleaned frames with one shared categorical dictionary.
+
+    Parameters:
+    ----------
+    frames: dict
+        The dataframes keyed as compact.
+
+    compact: dict, optional
+        The columns to compact in every frame.
+
+    report: bool, optional
+        Print the memory held by every frame before and after.
+
+    Returns:
+    -------
+    dict
+        The compacted dataframes.
+
+    Examples:
+    --------
+    >>> compact_frames({'front_desk': fd_frame, 'booking.com': bc_df})
+    {'front_desk': DataFrame, 'booking.com': DataFrame}
+    """
+    dtype = shared_categories(frames, compact)
+    compacted = {}
+    for name, frame in frames.items():
+        compacted[name] = compact_frame(frame, compact.get(name, {}), dtype)
+        if report:
+            before = frame.memory_usage(deep=True).sum() / 2**20
+            after = compacted[name].memory_usage(deep=True).sum() / 2**20
+            print(f"{name}: {before:.2f} MB -> {after:.2f} MB")
+    return compacted
+
+
+## Fixed-point money: amounts held as whole paise in nullable int64
+## columns, so equality joins and sums are exact integer operations
+
+# Paise in a rupee
+PAISE = 100
+
+# This dictonary holds the money columns of every source, converted to paise
+# when loaded, and the money columns of the outputs ("outputs"), converted
+# back to rupees when written
+Money = {
+    'front_desk': ["Room Bill (Incl. GST)", "Extra Person Charges (Incl. GST)",
+                   "Advance Paid", "Paid at Check-out", "Paid at Check-in",
+                   "Extras Paid", "Total Amount Paid"],
+    'ptm_settle': ["Amount"],
+    'ptm_trans': ["Amount"],
+    'bank_statement': ["Deposit Amt (INR)"],
+    'booking.com': ["Price", "Commission Amount"],
+    'ingo_mmt_data': ["Booking Amount", "Commission Amount"],
+    'outputs': ["Room Bill (Incl. GST)", "Extra Person Charges (Incl. GST)",
+                "Advance Paid", "Paid at Check-out", "Paid at Check-in",
+                "Extras Paid", "Total Amount Paid", "Room_Bill",
+                "paid_at_UPI", "room_bill", "total_amount_paid",
+                "paid_checkin", "paid_checkout", "paid_inbetween",
+                "paid_ota", "paid_upi", "paid_cash", "paid_act",
+                "paid_card"],
+}
+
+
+def to_paise(values):
+    """
+    Convert amounts in rupees to whole paise.
+
+    ...
+
+    Amounts read as text lose their quotes and thousand separators first,
+    amounts that are not numbers become pd.NA.
+
+    Parameters:
+    ----------
+    values: pd.Series
+        The amounts in rupees.
+
+    Returns:
+    -------
+    pd.Series
+        The amounts in paise as "Int64".
+
+    Examples:
+    --------
+    >>> to_paise(pd.Series([1470.5, None, "'1,823"])).tolist()
+    [147050, <NA>, 182300]
+    """
+    if values.dtype == object:
+        values = values.astype(str).str.replace(r"[',]", "", regex=True)
+    rupees = pd.to_numeric(values, errors="coerce")
+    return (rupees * PAISE).round().astype("Int64")
+
+
+def to_rupees(values):
+    """Convert amounts in paise back to float64 rupees, pd.NA to NaN."""
+    return pd.to_numeric(values, errors="coerce").astype("float64") / PAISE
+
+
+def round_money(values, unit=1):
+    """
+    Round amounts to whole rupees.
+
+    ...
+
+    The GST and commission rates of const give fractional amounts which
+    are rounded to whole rupees, in rupees or in paise.
+
+    Parameters:
+    ----------
+    values: pd.Series
+        The amounts.
+
+    unit: int, optional
+        The amount of one rupee: 1 for rupees, PAISE for paise.
+
+    Returns:
+    -------
+    pd.Series
+        The rounded amounts, "Int64" in paise.
+
+    Examples:
+    --------
+    >>> round_money(pd.Series([147050]) * 1.18, PAISE).tolist()
+    [173500]
+    """
+    rounded = (values / unit).round() * unit
+    return rounded if unit == 1 else rounded.astype("Int64")
+
+
+def paise_frames(frames, money=Money):
+    """
+    Hold the money columns of the sources in paise.
+
+    Parameters:
+    ----------
+    frames: dict
+        The dataframes of the sources keyed as in Money.
+
+    money: dict, optional
+        The money columns of every source.
+
+    Returns:
+    -------
+    dict
+        The dataframes with their money columns in paise.
+
+    Examples:
+    --------
+    >>> sources = paise_frames(load_sources(folder_paths, FILE_NO))
+    """
+    converted = {}
+    for name, frame in frames.items():
+        columns = [col for col in money.get(name, [])
+                   if col in frame.columns]
+        converted[name] = frame.assign(**{col: to_paise(frame[col])
+                                          for col in columns})
+    return converted
+
+
+def rupee_frame(frame, columns=Money['outputs']):
+    """Convert the money columns of an output frame back to rupees."""
+    return frame.assign(**{col: to_rupees(frame[col]) for col in columns
+                           if col in frame.columns})
+
+
+## Columns read from every source: the ones the cleaning and matching
+## stages reference, the others are never parsed. The front desk keeps all
+## its columns since they are written back in the front-office outputs. The
+## PayTM settlements keep the columns shared with the transactions so that
+## the merge of the two still suffixes them
+
+Usecols = {
+    'front_desk': None,
+    'ptm_settle': ["Transaction_ID", "Transaction_Date", "Amount", "UTR_No."],
+    'ptm_trans': ["Transaction_ID", "Transaction_Date", "Amount", "UTR_No."],
+    'bank_statement': ["Tran. Id", "Value Date", "Transaction Date",
+                       "Transaction Posted Date", "Transaction Remarks",
+                       "Deposit Amt (INR)"],
+    'booking.com': ["Book Number", "Booked by", "Check-in", "Check-out",
+                    "Rooms", "Status", "Price", "Commission Amount"],
+    'ingo_mmt_data': ["PNR", "Booking Id", "Guest Name", "Checkin Date",
+                      "Checkout Date", "Booking Status", "Brand",
+                      "Booking Amount", "Bank Ref No", "Payments Date",
+                      "Commission Amount"],
+}
+
+## Reader options of every source, shared by the wrapper functions and by
+## the loader reading all the sources together
+Readers = {
+    'front_desk': {"conv": Conv['front_desk'], "schema": Schema['front_desk'],
+                   "encode": "utf-8", "usecols": Usecols['front_desk']},
+    'ptm_settle': {"usecols": Usecols['ptm_settle']},
+    'ptm_trans': {"usecols": Usecols['ptm_trans']},
+    'bank_statement': {"conv": Conv['bank_statement'],
+                       "schema": Schema['bank_statement'], "encode": "utf-8",
+                       "skphead": SKIPHEAD, "skpfoot": SKIPFOOT,
+                       "table": BANK_TABLE,
+                       "usecols": Usecols['bank_statement']},
+    'booking.com': {"conv": Conv['booking.com'],
+                    "schema": Schema['booking.com'],
+                    "usecols": Usecols['booking.com']},
+    'ingo_mmt_data': {"conv": Conv['ingo_mmt_data'],
+                      "schema": Schema['ingo_mmt_data'],
+                      "usecols": Usecols['ingo_mmt_data']},
+}
+
+def reader_options(source, usecols=None):
+    """The reader options of a source, with the columns to read replaced."""
+    options = dict(Readers[source])
+    if usecols is not None:
+        options["usecols"] = usecols
+    return options
+
+
 ## Wrapper functions for loading data from various sources
 
 # front_desk data: Hospitality front desk
-def fd_data(folder_path, FILE_NO):
+def fd_data(folder_path, FILE_NO, workers=None, cache=None,
+            usecols=None):
     """
     Fetch Front Desk data transform the data using converter
     functions
@@ -661,6 +2182,15 @@ def fd_data(folder_path, FILE_NO):
     folder_path: str
         The path of the containing directory.
 
+    workers: int, optional
+        The number of workers reading files, None for the number of CPUs.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    usecols: list, optional
+        The columns to be read in place of Usecols['front_desk'].
+
     Returns:
     --------
     pd.DataFrame:
@@ -672,38 +2202,104 @@ def fd_data(folder_path, FILE_NO):
     DataFrame
     """
 
-    fd_frame = create_frame(folder_path, FILE_NO, conv=Conv['front_desk'],
-                            encode="utf-8")
+    fd_frame = create_frame(folder_path, FILE_NO, workers=workers,
+                            cache=cache,
+                            **reader_options('front_desk', usecols))
     return fd_frame
 
 
 # booking.com data: Booking.com/ Reservations
-def bc_data(folder_path, FILE_NO):
-    bc_frame = create_frame(folder_path, FILE_NO, conv=Conv['booking.com'])
+def bc_data(folder_path, FILE_NO, workers=None, cache=None,
+            usecols=None):
+    bc_frame = create_frame(folder_path, FILE_NO, workers=workers,
+                            cache=cache,
+                            **reader_options('booking.com', usecols))
     return bc_frame
 
 
 # bank statement data: handles only ICICI
-def bnk_state(folder_path, FILE_NO):
-    bank_statements = create_frame(folder_path, FILE_NO, encode="utf-8",
-                                   skphead=SKIPHEAD, skpfoot=SKIPFOOT,
-                                   conv=Conv['bank_statement'])
+def bnk_state(folder_path, FILE_NO, workers=None, cache=None,
+              usecols=None):
+    bank_statements = create_frame(folder_path, FILE_NO, workers=workers,
+                                   cache=cache,
+                                   **reader_options('bank_statement', usecols))
     return bank_statements
 
 
 # Paytm settlement data
-def ptm_settle(folder_path, FILE_NO):
-    paytm_settlement = create_frame(folder_path, FILE_NO)
+def ptm_settle(folder_path, FILE_NO, workers=None, cache=None,
+               usecols=None):
+    paytm_settlement = create_frame(folder_path, FILE_NO, workers=workers,
+                                    cache=cache,
+                                    **reader_options('ptm_settle', usecols))
     return paytm_settlement
 
 # Paytm transactions data
-def ptm_trans(folder_path, FILE_NO):
-    paytm_transactions = create_frame(folder_path, FILE_NO)
+def ptm_trans(folder_path, FILE_NO, workers=None, cache=None,
+              usecols=None):
+    paytm_transactions = create_frame(folder_path, FILE_NO, workers=workers,
+                                      cache=cache,
+                                      **reader_options('ptm_trans', usecols))
     return paytm_transactions
 
 
 # InGO-MMT data 
-def ingo_mmt_data(folder_path, FILE_NO):
-    ingo_mmt_data_ = create_frame(folder_path, FILE_NO,
-                                  conv=Conv['ingo_mmt_data'])
-    return ingo_mmt_data_
\ No newline at end of file
+def ingo_mmt_data(folder_path, FILE_NO, workers=None, cache=None,
+                  usecols=None):
+    ingo_mmt_data_ = create_frame(folder_path, FILE_NO, workers=workers,
+                                  cache=cache,
+                                  **reader_options('ingo_mmt_data', usecols))
+    return ingo_mmt_data_
+
+
+# All sources at once: the files of every source share one pool
+def load_sources(folder_paths, FILE_NO, workers=None, cache=None):
+    """
+    Fetch the data of several sources concurrently.
+
+    ...
+
+    The files of all the sources are submitted to the same pools, so a
+    source made of a single large file is read while the monthly exports of
+    the other sources are being parsed. Each source is concatenated once,
+    in the order of its files.
+
+    Parameters:
+    ----------
+    folder_paths: dict
+        The containing directory of every source, keyed by the names used in
+        Readers.
+
+    FILE_NO: int or None
+        The number of files to be processed per source, None for all.
+
+    workers: int, optional
+        The number of workers reading files, None for the number of CPUs.
+
+    cache: dps_cache.FrameCache, optional
+        The cache of parsed files.
+
+    Returns:
+    --------
+    dict:
+        The dataframe of every source, keyed like folder_paths.
+
+    Examples:
+    ---------
+    >>> load_sources({'front_desk': 'fd_dir', 'booking.com': 'bc_dir'}, None)
+    {'front_desk': DataFrame, 'booking.com': DataFrame}
+    """
+    jobs = []
+    for source, folder_path in folder_paths.items():
+        for path in file_list(folder_path, FILE_NO):
+            print(path)
+            jobs.append((source, path))
+
+    frames = read_files([(path, Readers[source]) for source, path in jobs],
+                        workers, cache)
+
+    per_source = {source: [] for source in folder_paths}
+    for (source, _), frame in zip(jobs, frames):
+        per_source[source].append(frame)
+    return {source: concat_frames(source_frames)
+            for source, source_frames in per_source.items()}